@@ -20,6 +20,10 @@ Options:
     --include-dev       Include dev dependencies in pubspec graph
     --key-packages LIST Comma-separated packages for per-module graphs
     --git-since DATE    Start date for git hotspots (default: 2025-01-01)
+    --jobs N / -j N     Worker processes for parsing and duplication (default: CPU count)
+    --no-cache          Ignore and do not update the analysis cache and indexes
+    --drop-sources      Release file sources after per-file analysis
+    --dup-engine NAME   Duplication engine: hash (default) or suffix-array
     --verbose / -v      Verbose output (default: on)
     --quiet / -q        Suppress output
     --help / -h         Show this help
@@ -231,6 +235,28 @@ def main():
         default=None,
         help="Start date for git hotspots (default: 2025-01-01)",
     )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for parsing, per-file metrics and duplication (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the analysis cache, clone, churn and ownership indexes and directory listing",
+    )
+    parser.add_argument(
+        "--drop-sources",
+        action="store_true",
+        help="Release file sources after per-file analysis (lower peak memory)",
+    )
+    parser.add_argument(
+        "--dup-engine",
+        choices=["hash", "suffix-array"],
+        default=None,
+        help="Duplication engine (default: hash; suffix-array for very large trees)",
+    )
 
     args = parser.parse_args()
 
@@ -253,6 +279,12 @@ def main():
         config.dcm.enabled = True
     if args.no_dcm:
         config.dcm.enabled = False
+    if args.no_cache:
+        config.cache.enabled = False
+    if args.drop_sources:
+        config.memory.drop_sources = True
+    if args.dup_engine:
+        config.duplication.engine = args.dup_engine
     if args.format:
         config.output.formats = [f.strip() for f in args.format.split(",")]
     if args.output:
@@ -306,6 +338,7 @@ def main():
         module_filter=args.module,
         metric_filter=metric_filter,
         verbose=verbose,
+        jobs=args.jobs,
     )
 
     # Write output
@@ -2,13 +2,9 @@
 
 from __future__ import annotations
 
-from typing import List
-
 from ..config import Thresholds
+from ..metrics.table import MetricsTable
 from ..models import (
-    ClassMetrics,
-    FileMetrics,
-    FunctionMetrics,
     ModuleSummary,
     TechnicalDebtSummary,
     ViolationCounts,
@@ -19,12 +15,13 @@ from .stats import compute_stats
 def aggregate_module(
     module_name: str,
     module_path: str,
-    function_metrics: List[FunctionMetrics],
-    class_metrics: List[ClassMetrics],
-    file_metrics: List[FileMetrics],
+    table: MetricsTable,
     thresholds: Thresholds,
 ) -> ModuleSummary:
-    """Aggregate all metrics for a single module into a summary."""
+    """Aggregate all metrics for a single module (*table*) into a summary."""
+    function_metrics = table.functions
+    class_metrics = table.classes
+    file_metrics = table.files
 
     summary = ModuleSummary(
         module=module_name,
@@ -91,6 +88,9 @@ def aggregate_module(
         summary.metrics_summary["tcc"] = compute_stats(
             [cm.tcc for cm in class_metrics]
         )
+        summary.metrics_summary["lcom4"] = compute_stats(
+            [cm.lcom4 for cm in class_metrics]
+        )
         summary.metrics_summary["woc"] = compute_stats(
             [cm.woc for cm in class_metrics]
         )
@@ -5,10 +5,8 @@ from __future__ import annotations
 from typing import List
 
 from ..config import Thresholds
+from ..metrics.table import MetricsTable
 from ..models import (
-    ClassMetrics,
-    FileMetrics,
-    FunctionMetrics,
     ModuleSummary,
     ProjectSummary,
     TechnicalDebtSummary,
@@ -20,12 +18,13 @@ from .stats import compute_stats
 
 def aggregate_project(
     module_summaries: List[ModuleSummary],
-    all_function_metrics: List[FunctionMetrics],
-    all_class_metrics: List[ClassMetrics],
-    all_file_metrics: List[FileMetrics],
+    table: MetricsTable,
     thresholds: Thresholds,
 ) -> ProjectSummary:
     """Aggregate all module summaries into a project-level summary."""
+    all_function_metrics = table.functions
+    all_class_metrics = table.classes
+    all_file_metrics = table.files
     summary = ProjectSummary(
         modules_count=len(module_summaries),
         files_count=sum(ms.files_count for ms in module_summaries),
@@ -69,6 +68,9 @@ def aggregate_project(
         summary.metrics_summary["tcc"] = compute_stats(
             [cm.tcc for cm in all_class_metrics]
         )
+        summary.metrics_summary["lcom4"] = compute_stats(
+            [cm.lcom4 for cm in all_class_metrics]
+        )
         summary.metrics_summary["wmc"] = compute_stats(
             [cm.wmc for cm in all_class_metrics]
         )
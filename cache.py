@@ -0,0 +1,223 @@
+"""Persistent cache of per-file analysis results.
+
+Stores each file's ``FileAnalysis`` (function / class / file metrics plus
+the class index entries) under the output directory, so unchanged files
+are neither parsed nor measured again on the next run.
+
+Entries are validated against the file's content key (its git blob id,
+see :func:`content_key`) and the module the file belongs to.  The whole
+cache is discarded when the fingerprint changes — cmc version, parser
+type, thresholds or the set of internal packages (which NOEI depends on).
+
+Only per-file data is cached.  Metrics that depend on other files (DIT,
+NOAM) are recomputed every run from the complete class index, so a
+change to an ancestor class in another file is always picked up.
+
+Next to it, the clone index keeps the duplication state of the previous
+run (per-file window hashes, repeated windows, clone class extents) so
+that clone matching only revisits files whose tokens changed.
+
+The git churn and ownership indexes (``ChurnIndex`` and
+``OwnershipIndex`` in ``package_analysis.git_analysis``) are saved there
+as well, with the commit they were read up to, so that later runs read
+only the commits added since.  Outside git, so is the
+directory listing (``discovery.DirectoryListing``), so that unchanged
+directories are not read again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import __version__
+from .config import MetricsConfig
+from .models import FileAnalysis
+
+# Bump whenever FileAnalysis or the per-file metric computation changes
+# in a way that makes previously cached records stale.
+CACHE_FORMAT = 12
+
+CACHE_FILE = "file_analysis.pickle"
+CLONE_INDEX_FILE = "clone_index.pickle"
+CHURN_INDEX_FILE = "churn_index.pickle"
+OWNERSHIP_INDEX_FILE = "ownership_index.pickle"
+DIR_LISTING_FILE = "dir_listing.pickle"
+
+
+def content_key(data: bytes) -> str:
+    """Git blob id of a file's bytes (what ``git hash-object`` prints).
+
+    For files whose working copy matches the git index this is the blob
+    id ``git ls-files -s`` reports (``discovery.SourceTree``), so their
+    key is known without reading them.
+    """
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def config_fingerprint(
+    config: MetricsConfig,
+    internal_packages: Iterable[str],
+    parser_type: str,
+) -> str:
+    """Fingerprint of everything besides file content that per-file results depend on."""
+    h = hashlib.sha256()
+    for part in (
+        str(CACHE_FORMAT),
+        __version__,
+        parser_type,
+        repr(config.thresholds),
+        ",".join(sorted(internal_packages)),
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def clone_index_fingerprint(min_tokens: int) -> str:
+    """Fingerprint of everything besides file tokens that the clone index depends on."""
+    h = hashlib.sha256()
+    for part in (str(CACHE_FORMAT), __version__, str(min_tokens)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """On-disk map of ``rel_path -> (content hash, module, FileAnalysis)``.
+
+    Cached records are handed out as-is, so :meth:`save` must be called
+    before the collector starts mutating metrics (TD, FPY, DIT, ...).
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries: Dict[str, Tuple[str, str, FileAnalysis]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen: Set[str] = set()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> "AnalysisCache":
+        """Load the cache at *path*; start empty if missing, corrupt or stale."""
+        cache = cls(path, fingerprint)
+        try:
+            with open(path, "rb") as fh:
+                data = pickle.load(fh)
+        except Exception:
+            return cache
+        if (
+            isinstance(data, dict)
+            and data.get("fingerprint") == fingerprint
+            and isinstance(data.get("entries"), dict)
+        ):
+            cache.entries = data["entries"]
+        return cache
+
+    def get(self, rel_path: str, module_name: str, digest: str) -> Optional[FileAnalysis]:
+        self._seen.add(rel_path)
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry[0] == digest and entry[1] == module_name:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return None
+
+    def put(self, rel_path: str, module_name: str, digest: str, analysis: FileAnalysis):
+        self._seen.add(rel_path)
+        self.entries[rel_path] = (digest, module_name, analysis)
+        self._dirty = True
+
+    def save(self, prune: bool = True) -> None:
+        """Write the cache back if anything changed.
+
+        With *prune*, entries for files not looked up in this run
+        (deleted or newly excluded files) are dropped.
+        """
+        if prune:
+            stale = [p for p in self.entries if p not in self._seen]
+            for p in stale:
+                del self.entries[p]
+            if stale:
+                self._dirty = True
+        if not self._dirty:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(
+                {"fingerprint": self.fingerprint, "entries": self.entries},
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class CloneIndex:
+    """On-disk duplication state of the previous run (hash engine).
+
+    ``files`` maps each path to ``(token digest, window hashes)``,
+    ``repeated`` maps every window hash seen at two or more places to its
+    ``(path, token offset)`` occurrences, and ``extents`` holds the clone
+    class extents found, as ``(((path, offset), ...), token count)``.
+    ``metrics.duplication.detect_duplicates`` reads and updates all three.
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.files: Dict[str, Tuple[str, object]] = {}
+        self.repeated: Dict[int, List[Tuple[str, int]]] = {}
+        self.extents: List[Tuple[Tuple[Tuple[str, int], ...], int]] = []
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> "CloneIndex":
+        """Load the index at *path*; start empty if missing, corrupt or stale."""
+        index = cls(path, fingerprint)
+        try:
+            with open(path, "rb") as fh:
+                data = pickle.load(fh)
+        except Exception:
+            return index
+        if (
+            isinstance(data, dict)
+            and data.get("fingerprint") == fingerprint
+            and isinstance(data.get("files"), dict)
+            and isinstance(data.get("repeated"), dict)
+            and isinstance(data.get("extents"), list)
+        ):
+            index.files = data["files"]
+            index.repeated = data["repeated"]
+            index.extents = data["extents"]
+        return index
+
+    def save(self) -> None:
+        """Write the index back unless no file was changed, added or removed."""
+        if not (self.misses or self.removed) and os.path.exists(self.path):
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(
+                {
+                    "fingerprint": self.fingerprint,
+                    "files": self.files,
+                    "repeated": self.repeated,
+                    "extents": self.extents,
+                },
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
@@ -5,46 +5,81 @@ from __future__ import annotations
 import os
 import sys
 import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Set
-
-from .config import MetricsConfig
-from .discovery import discover_modules, get_internal_packages, list_dart_files
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cache import (
+    CACHE_FILE,
+    CHURN_INDEX_FILE,
+    CLONE_INDEX_FILE,
+    DIR_LISTING_FILE,
+    OWNERSHIP_INDEX_FILE,
+    AnalysisCache,
+    CloneIndex,
+    clone_index_fingerprint,
+    config_fingerprint,
+    content_key,
+)
+from .config import MetricsConfig, Thresholds
+from .discovery import (
+    DirectoryListing,
+    SourceTree,
+    discover_modules,
+    get_internal_packages,
+    list_dart_files,
+)
 from .models import (
+    ClassEntry,
     ClassMetrics,
+    FileAnalysis,
     FileMetrics,
     FunctionMetrics,
     Module,
     ModuleSummary,
     ParsedFile,
     ProjectSummary,
+    SourceFacts,
 )
 from .parsers.dart_parser import is_tree_sitter_available, parse_file
 
 # DCM adapter is optional — import gracefully
 try:
-    from .parsers.dcm_adapter import is_dcm_available, merge_dcm_metrics, run_dcm_analyze
+    from .parsers.dcm_adapter import (
+        DCM_CACHE_DIR,
+        index_dcm_records,
+        is_dcm_available,
+        merge_dcm_metrics,
+        sources_digest,
+        start_dcm_analyze,
+    )
     _HAS_DCM_MODULE = True
 except ImportError:
     _HAS_DCM_MODULE = False
+    DCM_CACHE_DIR = "dcm"
     def is_dcm_available(cfg=None): return False
+    def index_dcm_records(*a, **kw): return None
     def merge_dcm_metrics(*a, **kw): return None
-    def run_dcm_analyze(*a, **kw): return None
+    def sources_digest(*a, **kw): return ""
+    def start_dcm_analyze(*a, **kw): return {}
 
 from .metrics.function_metrics import compute_function_metrics
 from .metrics.class_metrics import (
     ClassIndex,
-    build_class_index,
+    apply_inheritance_metrics,
     compute_class_metrics,
 )
 from .metrics.file_metrics import compute_file_metrics
 from .metrics.technical_debt import apply_technical_debt
-from .metrics.code_smells import compute_dead_code_for_module
+from .metrics.code_smells import compute_dead_code_for_module, find_private_identifiers
 from .metrics.fpy import compute_function_fpy, compute_class_fpy, compute_file_fpy
 from .metrics.rating import rate_module, rate_file
-from .metrics.risk_hotspots import compute_risk_hotspots
+from .metrics.risk_hotspots import compute_function_risk_hotspots, compute_risk_hotspots
 from .metrics.distributions import compute_distributions
-from .metrics.duplication import detect_duplicates
+from .metrics.duplication import detect_duplicates, tokenize_for_duplication
+from .metrics.near_duplicates import detect_near_duplicates, function_signatures
+from .metrics.table import MetricsTable
 from .metrics.history import (
     Snapshot, SnapshotDelta, build_snapshot, save_snapshot,
     get_latest_snapshot, load_snapshot, list_snapshots, compare_snapshots,
@@ -56,17 +91,18 @@ from .graphs.import_graph import build_import_graph, build_per_module_import_det
 from .graphs.pubspec_graph import build_pubspec_graph
 from .graphs.dsm import build_dsm, DSMResult
 from .graphs.models import DependencyGraph
+from .package_analysis.git_analysis import ChurnIndex, OwnershipIndex
+from .package_analysis.import_analysis import find_package_directives
 from .package_analysis.package_collector import collect_package_analysis
 from .package_analysis.models import PackageAnalysisResult
+from .package_analysis.temporal_coupling import compute_temporal_coupling
 
 
 class CollectorResult:
     """Container for all collected metrics."""
 
     def __init__(self):
-        self.all_function_metrics: List[FunctionMetrics] = []
-        self.all_class_metrics: List[ClassMetrics] = []
-        self.all_file_metrics: List[FileMetrics] = []
+        self.metrics = MetricsTable()
         self.module_summaries: List[ModuleSummary] = []
         self.project_summary: Optional[ProjectSummary] = None
         self.modules_analyzed: List[str] = []
@@ -80,21 +116,159 @@ class CollectorResult:
         # New analysis results
         self.module_ratings: Dict[str, tuple] = {}   # module -> (score, grade)
         self.risk_hotspots: list = []
+        self.function_risk_hotspots: list = []
+        self.temporal_coupling = None
         self.distributions: dict = {}
         self.dsm_result: Optional[DSMResult] = None
         self.duplication_result = None
+        self.near_duplicate_result = None
         self.snapshot: Optional[Snapshot] = None
         self.snapshot_delta: Optional[SnapshotDelta] = None
         self.history_snapshots: list = []
 
+    @property
+    def all_function_metrics(self) -> List[FunctionMetrics]:
+        return self.metrics.functions
+
+    @property
+    def all_class_metrics(self) -> List[ClassMetrics]:
+        return self.metrics.classes
+
+    @property
+    def all_file_metrics(self) -> List[FileMetrics]:
+        return self.metrics.files
+
+
+# ---------------------------------------------------------------------------
+# Per-file analysis (Phase 1)
+# ---------------------------------------------------------------------------
+
+# Per-process state for _analyze_file, set once by _init_worker so that
+# thresholds and package names are not pickled with every task.
+_worker_thresholds: Optional[Thresholds] = None
+_worker_internal_packages: Set[str] = set()
+
+
+def _init_worker(thresholds: Thresholds, internal_packages: Set[str]) -> None:
+    global _worker_thresholds, _worker_internal_packages
+    _worker_thresholds = thresholds
+    _worker_internal_packages = internal_packages
+
+
+def _analyze_file(
+    task: Tuple[str, str, str, str],
+) -> Tuple[Optional[FileAnalysis], Optional[str]]:
+    """Parse one file and compute its per-file metrics.
+
+    Returns ``(analysis, None)`` on success or ``(None, error_message)``.
+    Only compact records travel back to the parent process; the
+    ``ParsedFile`` itself is discarded here.  The source facts later
+    phases need are derived here too, so the source can be dropped.
+    """
+    fpath, rel_path, module_name, source = task
+    try:
+        pf = parse_file(fpath, source)
+        pf.path = rel_path  # Use relative path
+
+        fn_metrics = compute_function_metrics(pf, module_name, _worker_thresholds)
+        cls_metrics = compute_class_metrics(
+            pf, module_name, _worker_thresholds, None, _worker_internal_packages
+        )
+        file_met = compute_file_metrics(
+            pf, module_name, fn_metrics, _worker_thresholds, _worker_internal_packages
+        )
+        private_symbols, private_references = find_private_identifiers(pf.tokens)
+        dup_vocabulary, dup_ids, dup_lines = tokenize_for_duplication(source)
+        facts = SourceFacts(
+            package_directives=find_package_directives(source),
+            private_symbols=private_symbols,
+            private_references=private_references,
+            dup_vocabulary=dup_vocabulary,
+            dup_ids=dup_ids,
+            dup_lines=dup_lines,
+            function_signatures=function_signatures(pf, dup_vocabulary, dup_ids, dup_lines),
+        )
+    except Exception as e:
+        return None, str(e)
+
+    return FileAnalysis(
+        path=rel_path,
+        loc=pf.loc,
+        sloc=pf.sloc,
+        imports=pf.imports,
+        class_entries=[
+            ClassEntry(
+                name=cls.name,
+                superclass=cls.superclass,
+                method_names=[m.name for m in cls.methods],
+            )
+            for cls in pf.classes
+        ],
+        function_metrics=fn_metrics,
+        class_metrics=cls_metrics,
+        file_metrics=file_met,
+        facts=facts,
+    ), None
+
+
+def _read_source(fpath: str) -> Tuple[str, bytes]:
+    """Text of the file at *fpath*, newlines translated as in text mode, and its bytes."""
+    with open(fpath, "rb") as fh:
+        data = fh.read()
+    source = data.decode("utf-8")
+    if "\r" in source:
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+    return source, data
+
+
+def _resolve_jobs(jobs: Optional[int]) -> int:
+    """Number of worker processes; ``None`` or ``0`` means one per CPU."""
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _run_file_analysis(
+    tasks: List[Tuple[str, str, str, str]],
+    thresholds: Thresholds,
+    internal_packages: Set[str],
+    jobs: int,
+) -> List[Tuple[Optional[FileAnalysis], Optional[str]]]:
+    """Run :func:`_analyze_file` over *tasks*, in parallel when ``jobs > 1``.
+
+    Results are returned in task order, so output does not depend on
+    the number of workers.
+    """
+    if jobs > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (jobs * 8))
+        try:
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(thresholds, internal_packages),
+            ) as pool:
+                return list(pool.map(_analyze_file, tasks, chunksize=chunksize))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"  [!] Process pool unavailable ({e}), parsing serially",
+                  file=sys.stderr)
+
+    _init_worker(thresholds, internal_packages)
+    return [_analyze_file(task) for task in tasks]
+
 
 def collect_metrics(
     config: MetricsConfig,
     module_filter: Optional[str] = None,
     metric_filter: Optional[List[str]] = None,
     verbose: bool = True,
+    jobs: Optional[int] = None,
 ) -> CollectorResult:
-    """Main entry point: discover modules, parse files, compute metrics, produce output."""
+    """Main entry point: discover modules, parse files, compute metrics, produce output.
+
+    *jobs* is the number of worker processes used for parsing, per-file
+    metrics and duplication matching (default: one per CPU; ``1`` runs
+    in-process).
+    """
 
     start_time = time.time()
     result = CollectorResult()
@@ -107,8 +281,22 @@ def collect_metrics(
         print(f"[metrics] Project root: {root}")
         print(f"[metrics] Parser: {parser_type}")
 
+    abs_output_dir = config.output.directory
+    if not os.path.isabs(abs_output_dir):
+        abs_output_dir = os.path.join(config.root, abs_output_dir)
+    cache_dir = config.cache.directory
+    if not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(abs_output_dir, cache_dir)
+
     # 1. Discover modules
-    modules = discover_modules(config)
+    # Inside a git repository the files are listed once, with content keys;
+    # otherwise directories are read through a listing reused across runs.
+    tree = SourceTree.from_git(root) if config.discovery.use_git else None
+    listing: Optional[DirectoryListing] = None
+    listing_path = os.path.join(cache_dir, DIR_LISTING_FILE) if config.cache.enabled else None
+    if tree is None:
+        listing = DirectoryListing.load(listing_path) if listing_path else DirectoryListing()
+    modules = discover_modules(config, tree, listing)
     if module_filter:
         modules = [m for m in modules if m.name == module_filter or m.path == module_filter]
 
@@ -117,41 +305,152 @@ def collect_metrics(
         return result
 
     if verbose:
+        if tree is not None:
+            print(f"[metrics] Files listed by git: {len(tree.files)} "
+                  f"({len(tree.content_keys)} unchanged from the index)")
         print(f"[metrics] Modules found: {len(modules)}")
         for m in modules:
             print(f"  - {m.name} ({m.path})")
 
     internal_packages = get_internal_packages(modules)
 
-    # 2. Phase 1: Parse all files and build cross-file class index
+    # 2. Phase 1: Parse all files and compute per-file metrics
+    jobs = _resolve_jobs(jobs)
     if verbose:
-        print("\n[metrics] Phase 1: Parsing files...")
-
-    module_parsed_files: Dict[str, List[ParsedFile]] = {}
-    class_index = ClassIndex()
-    total_files = 0
+        print(f"\n[metrics] Phase 1: Parsing files ({jobs} jobs)...")
+
+    # Reuse cached analyses of unchanged files; only the rest is parsed.
+    cache: Optional[AnalysisCache] = None
+    if config.cache.enabled:
+        cache = AnalysisCache.load(
+            os.path.join(cache_dir, CACHE_FILE),
+            config_fingerprint(config, internal_packages, parser_type),
+        )
 
+    if tree is not None:
+        module_files = tree.module_files(modules, config)
+    else:
+        module_files = {
+            m.name: list_dart_files(root, m.path, config, listing) for m in modules
+        }
+        if listing_path:
+            try:
+                listing.save(listing_path)
+            except OSError as e:
+                print(f"  [!] Could not write directory listing: {e}", file=sys.stderr)
+        if verbose:
+            print(f"  Directories: {listing.hits} unchanged, {listing.misses} read")
+
+    # Files whose content key git already knows are read only if their
+    # analysis is not cached or their source is kept; the rest are read
+    # here to compute it.
+    keep_sources = not config.memory.drop_sources
+    tasks: List[Tuple[str, str, str, Optional[str]]] = []  # (abs path, rel path, module, source)
+    keys: List[str] = []
     for module in modules:
-        dart_files = list_dart_files(root, module.path, config)
-        parsed_files: List[ParsedFile] = []
-
-        for fpath in dart_files:
+        for fpath in sorted(module_files[module.name]):
+            rel_path = os.path.relpath(fpath, root)
+            key = tree.content_keys.get(rel_path.replace(os.sep, "/")) if tree else None
+            source = None
+            if key is None or keep_sources or cache is None:
+                try:
+                    source, data = _read_source(fpath)
+                except Exception as e:
+                    error_count += 1
+                    if verbose:
+                        print(f"  [!] Parse error {fpath}: {e}", file=sys.stderr)
+                    continue
+                if key is None:
+                    key = content_key(data)
+            tasks.append((fpath, rel_path, module.name, source))
+            keys.append(key)
+
+    # Optional DCM: all modules are started now, so DCM runs while the
+    # files are parsed; Phase 2 waits for each module's result.
+    dcm_runs: Dict[str, Future] = {}
+    use_dcm = _HAS_DCM_MODULE and config.dcm.enabled and is_dcm_available(config.dcm)
+    if use_dcm:
+        module_sources: Dict[str, List[Tuple[str, str]]] = {}
+        for (_, rel_path, module_name, _), key in zip(tasks, keys):
+            module_sources.setdefault(module_name, []).append((rel_path, key))
+        dcm_runs = start_dcm_analyze(
+            {m.name: os.path.join(root, m.path) for m in modules},
+            config.dcm,
+            jobs=config.dcm.jobs or os.cpu_count() or 1,
+            cache_dir=os.path.join(cache_dir, DCM_CACHE_DIR) if cache is not None else None,
+            digests={name: sources_digest(files) for name, files in module_sources.items()},
+        )
+        if verbose:
+            print(f"  DCM enabled, analyzing {len(dcm_runs)} modules in the background")
+
+    outcomes: List[Tuple[Optional[FileAnalysis], Optional[str]]] = [(None, None)] * len(tasks)
+    pending: List[int] = []
+    for i, (fpath, rel_path, module_name, source) in enumerate(tasks):
+        cached = cache.get(rel_path, module_name, keys[i]) if cache is not None else None
+        if cached is not None:
+            outcomes[i] = (cached, None)
+            continue
+        if source is None:
             try:
-                rel_path = os.path.relpath(fpath, root)
-                pf = parse_file(fpath)
-                pf.path = rel_path  # Use relative path
-                parsed_files.append(pf)
-                class_index.add_file(pf)
+                source = _read_source(fpath)[0]
             except Exception as e:
-                error_count += 1
-                if verbose:
-                    print(f"  [!] Parse error {fpath}: {e}", file=sys.stderr)
+                outcomes[i] = (None, str(e))
+                continue
+            tasks[i] = (fpath, rel_path, module_name, source)
+        pending.append(i)
 
-        module_parsed_files[module.name] = parsed_files
-        total_files += len(parsed_files)
+    fresh = _run_file_analysis(
+        [tasks[i] for i in pending], config.thresholds, internal_packages, jobs
+    )
+    for i, outcome in zip(pending, fresh):
+        outcomes[i] = outcome
+        if cache is not None and outcome[0] is not None:
+            _, rel_path, module_name, _ = tasks[i]
+            cache.put(rel_path, module_name, keys[i], outcome[0])
+
+    if cache is not None:
+        # Saved before Phase 2 mutates the records (DCM, DIT/NOAM, TD, FPY).
+        # A module-filtered run sees only part of the tree, so keep the rest.
+        try:
+            cache.save(prune=not module_filter)
+        except OSError as e:
+            print(f"  [!] Could not write analysis cache: {e}", file=sys.stderr)
+        if verbose:
+            print(f"  Cache: {cache.hits} reused, {cache.misses} analyzed")
+
+    # Build the cross-file class index and the lightweight parsed files
+    # that later phases (dead code, graphs, duplication) work on.  With
+    # memory.drop_sources they carry only the derived facts.
+    module_parsed_files: Dict[str, List[ParsedFile]] = {m.name: [] for m in modules}
+    module_analyses: Dict[str, List[FileAnalysis]] = {m.name: [] for m in modules}
+    class_index = ClassIndex(package_roots={m.name: m.path for m in modules})
+    total_files = 0
 
+    for (fpath, rel_path, module_name, source), (fa, error) in zip(tasks, outcomes):
+        if fa is None:
+            error_count += 1
+            if verbose:
+                print(f"  [!] Parse error {fpath}: {error}", file=sys.stderr)
+            continue
+        class_index.add_library(fa.path, fa.imports)
+        for entry in fa.class_entries:
+            class_index.add_class(
+                entry.name, fa.path, entry.superclass, entry.method_names, module_name,
+            )
+        module_analyses[module_name].append(fa)
+        module_parsed_files[module_name].append(ParsedFile(
+            path=fa.path, source=source if keep_sources else None,
+            imports=fa.imports, loc=fa.loc, sloc=fa.sloc, facts=fa.facts,
+        ))
+    # Parsed files hold the sources still needed; drop the task list's.
+    tasks.clear()
+    class_index.resolve()
+
+    for module in modules:
+        count = len(module_parsed_files[module.name])
+        total_files += count
         if verbose:
-            print(f"  {module.name}: {len(parsed_files)} files")
+            print(f"  {module.name}: {count} files")
 
     if verbose:
         print(f"  Total files: {total_files}")
@@ -161,37 +460,26 @@ def collect_metrics(
     if verbose:
         print("\n[metrics] Phase 2: Computing metrics...")
 
-    # Optional DCM data
-    dcm_data: Dict[str, Dict] = {}
-    use_dcm = _HAS_DCM_MODULE and config.dcm.enabled and is_dcm_available(config.dcm)
-    if use_dcm and verbose:
-        print("  DCM enabled, fetching data...")
-
     for module in modules:
         if verbose:
             print(f"  Processing: {module.name}...")
 
-        parsed_files = module_parsed_files.get(module.name, [])
-        if not parsed_files:
+        analyses = module_analyses.get(module.name, [])
+        if not analyses:
             continue
 
         # Optional: Get DCM data for this module
         module_dcm_data = None
-        if use_dcm:
-            abs_module_path = os.path.join(root, module.path)
-            module_dcm_data = run_dcm_analyze(abs_module_path, config.dcm)
-
-        module_function_metrics: List[FunctionMetrics] = []
-        module_class_metrics: List[ClassMetrics] = []
-        module_file_metrics: List[FileMetrics] = []
+        if module.name in dcm_runs:
+            module_dcm_data = dcm_runs[module.name].result()
 
-        for pf in parsed_files:
+        for fa in analyses:
             # Function metrics
-            fn_metrics = compute_function_metrics(pf, module.name, config.thresholds)
+            fn_metrics = fa.function_metrics
 
             # If DCM is available, merge its data
-            if module_dcm_data and pf.path in module_dcm_data:
-                dcm_records = module_dcm_data[pf.path]
+            if module_dcm_data and fa.path in module_dcm_data:
+                dcm_records = index_dcm_records(module_dcm_data[fa.path])
                 for fm in fn_metrics:
                     dcm_vals = merge_dcm_metrics(fm.function_name, fm.line_start, dcm_records)
                     if dcm_vals:
@@ -208,40 +496,27 @@ def collect_metrics(
                         if "sloc" in dcm_vals:
                             fm.sloc = dcm_vals["sloc"]
 
-            module_function_metrics.extend(fn_metrics)
+            # Class metrics: per-file part came from the worker, the
+            # cross-file part (DIT, NOAM) needs the complete class index.
+            for cm, entry in zip(fa.class_metrics, fa.class_entries):
+                apply_inheritance_metrics(cm, entry.method_names, class_index)
 
-            # Class metrics
-            cls_metrics = compute_class_metrics(
-                pf, module.name, config.thresholds, class_index, internal_packages
-            )
-            module_class_metrics.extend(cls_metrics)
+            result.metrics.add_file(fa.file_metrics, fn_metrics, fa.class_metrics)
 
-            # File metrics
-            file_met = compute_file_metrics(
-                pf, module.name, fn_metrics, config.thresholds, internal_packages
-            )
-            module_file_metrics.append(file_met)
+        module_table = result.metrics.module(module.name)
 
         # Apply technical debt
-        apply_technical_debt(
-            module_function_metrics,
-            module_class_metrics,
-            module_file_metrics,
-            config.thresholds,
-        )
+        apply_technical_debt(module_table, config.thresholds)
 
         # Compute FPY (First-Pass Yield)
-        for fm in module_function_metrics:
+        for fm in module_table.functions:
             fm.fpy = compute_function_fpy(fm, config.thresholds.fpy)
-        for cm in module_class_metrics:
+        for cm in module_table.classes:
             cm.fpy = compute_class_fpy(cm, config.thresholds.fpy)
-        for file_met in module_file_metrics:
-            file_met.fpy = compute_file_fpy(
-                file_met, module_function_metrics, module_class_metrics,
-                config.thresholds.fpy,
-            )
+        for file_met in module_table.files:
+            file_met.fpy = compute_file_fpy(file_met, module_table, config.thresholds.fpy)
             # Also compute file-level WMFP aggregation
-            file_fns = [fm for fm in module_function_metrics if fm.path == file_met.path]
+            file_fns = module_table.functions_in_file(file_met.path)
             file_met.wmfp = round(sum(fm.wmfp for fm in file_fns), 2)
             file_met.wmfp_density = round(
                 file_met.wmfp / file_met.sloc if file_met.sloc > 0 else 0.0, 3
@@ -251,16 +526,11 @@ def collect_metrics(
         module_summary = aggregate_module(
             module.name,
             module.path,
-            module_function_metrics,
-            module_class_metrics,
-            module_file_metrics,
+            module_table,
             config.thresholds,
         )
 
         # Accumulate
-        result.all_function_metrics.extend(module_function_metrics)
-        result.all_class_metrics.extend(module_class_metrics)
-        result.all_file_metrics.extend(module_file_metrics)
         result.module_summaries.append(module_summary)
         result.modules_analyzed.append(module.name)
 
@@ -282,9 +552,11 @@ def collect_metrics(
         if not parsed_files:
             continue
         dead_code_map = compute_dead_code_for_module(parsed_files)
-        for fm in result.all_file_metrics:
-            if fm.module == module.name and fm.path in dead_code_map:
-                fm.dead_code_estimate = dead_code_map[fm.path][0]
+        module_table = result.metrics.module(module.name)
+        for path, (dead_count, _) in dead_code_map.items():
+            fm = module_table.file(path)
+            if fm is not None:
+                fm.dead_code_estimate = dead_count
 
     # 4. Phase 3: Project-level aggregation
     if verbose:
@@ -292,9 +564,7 @@ def collect_metrics(
 
     result.project_summary = aggregate_project(
         result.module_summaries,
-        result.all_function_metrics,
-        result.all_class_metrics,
-        result.all_file_metrics,
+        result.metrics,
         config.thresholds,
     )
 
@@ -324,10 +594,59 @@ def collect_metrics(
                   f"{result.pubspec_graph.edge_count} edges")
 
     # 6. Phase 5: Package analysis
+    # Git history is read once and shared by git hotspots, risk hotspots
+    # and temporal coupling.
+    churn_index: Optional[ChurnIndex] = None
     if config.package_analysis.enabled:
         if verbose:
             print("\n[metrics] Phase 5: Package analysis...")
 
+        churn_path = os.path.join(cache_dir, CHURN_INDEX_FILE) if cache is not None else None
+        churn_index = ChurnIndex.from_git(
+            config.root,
+            config.package_analysis.git_since,
+            previous=ChurnIndex.load(churn_path) if churn_path else None,
+        )
+        if churn_path and churn_index.head:
+            try:
+                churn_index.save(churn_path)
+            except OSError as e:
+                print(f"  [!] Could not write churn index: {e}", file=sys.stderr)
+        if verbose:
+            print(f"  Git history: {churn_index.commits} commits "
+                  f"({churn_index.new_commits} read), "
+                  f"{len(churn_index.files)} files changed since "
+                  f"{config.package_analysis.git_since}")
+
+        # File age and authors, from one pass over the whole history
+        file_ownership = None
+        if config.package_analysis.ownership:
+            ownership_path = (
+                os.path.join(cache_dir, OWNERSHIP_INDEX_FILE) if cache is not None else None
+            )
+            ownership_index = OwnershipIndex.from_git(
+                config.root,
+                previous=OwnershipIndex.load(ownership_path) if ownership_path else None,
+            )
+            if ownership_path and ownership_index.head:
+                try:
+                    ownership_index.save(ownership_path)
+                except OSError as e:
+                    print(f"  [!] Could not write ownership index: {e}", file=sys.stderr)
+            file_ownership = {}
+            for fm in result.all_file_metrics:
+                own = ownership_index.files.get(fm.path)
+                if own is None:
+                    continue
+                file_ownership[fm.path] = own
+                fm.first_commit = own.first_commit
+                fm.last_commit = own.last_commit
+                fm.authors = len(own.authors)
+                fm.top_author_share = own.top_author_share
+            if verbose:
+                print(f"  Ownership: {len(file_ownership)} files with history "
+                      f"({ownership_index.new_commits} commits read)")
+
         for module in modules:
             parsed_files = module_parsed_files.get(module.name, [])
             if not parsed_files:
@@ -341,6 +660,8 @@ def collect_metrics(
                     git_since=config.package_analysis.git_since,
                     shotgun_top_n=config.package_analysis.shotgun_surgery_top_n,
                     git_top_n=config.package_analysis.git_hotspots_top_n,
+                    churn_index=churn_index,
+                    file_ownership=file_ownership,
                 )
                 result.package_analyses.append(pa_result)
                 if verbose:
@@ -352,6 +673,23 @@ def collect_metrics(
                 if verbose:
                     print(f"  [!] Analysis error {module.name}: {e}", file=sys.stderr)
 
+        if config.temporal_coupling.enabled:
+            tc = config.temporal_coupling
+            result.temporal_coupling = compute_temporal_coupling(
+                config.root,
+                {pf.path: name for name, pfs in module_parsed_files.items() for pf in pfs},
+                since=config.package_analysis.git_since,
+                max_commit_files=tc.max_commit_files,
+                min_co_changes=tc.min_co_changes,
+                top_n=tc.top_n,
+                churn_index=churn_index,
+            )
+            if verbose:
+                r = result.temporal_coupling
+                print(f"  Temporal coupling: {len(r.file_pairs)} file pairs, "
+                      f"{len(r.module_pairs)} module pairs "
+                      f"({r.commits_analyzed} commits, {r.commits_skipped} skipped as too large)")
+
     # Store modules and parsed files for output phase
     result.modules = modules
     result.module_parsed_files = module_parsed_files
@@ -388,10 +726,21 @@ def collect_metrics(
             config.root,
             since=config.package_analysis.git_since,
             top_n=30,
+            churn_index=churn_index,
         )
         if verbose:
             print(f"  Found {len(result.risk_hotspots)} risk hotspots")
 
+        if config.package_analysis.function_hotspots:
+            result.function_risk_hotspots = compute_function_risk_hotspots(
+                result.all_function_metrics,
+                config.root,
+                since=config.package_analysis.git_since,
+                top_n=50,
+            )
+            if verbose:
+                print(f"  Found {len(result.function_risk_hotspots)} function risk hotspots")
+
     # 10. Phase 9: DSM (Design Structure Matrix)
     if result.import_graph:
         if verbose:
@@ -407,24 +756,58 @@ def collect_metrics(
         print("\n[metrics] Phase 10: Duplication detection...")
 
     all_parsed: List[ParsedFile] = []
-    for pf_list in module_parsed_files.values():
+    module_of: Dict[str, str] = {}
+    for module_name, pf_list in module_parsed_files.items():
         all_parsed.extend(pf_list)
+        for pf in pf_list:
+            module_of[pf.path] = module_name
+
+    # The hash engine matches incrementally against the previous run's
+    # clone index; like the analysis cache, it needs the whole tree.
+    clone_index: Optional[CloneIndex] = None
+    if cache is not None and not module_filter and config.duplication.engine == "hash":
+        clone_index = CloneIndex.load(
+            os.path.join(cache_dir, CLONE_INDEX_FILE),
+            clone_index_fingerprint(config.duplication.min_tokens),
+        )
 
-    result.duplication_result = detect_duplicates(all_parsed)
+    result.duplication_result = detect_duplicates(
+        all_parsed,
+        min_tokens=config.duplication.min_tokens,
+        min_lines=config.duplication.min_lines,
+        module_of=module_of,
+        engine=config.duplication.engine,
+        clone_index=clone_index,
+        jobs=jobs,
+        spill=config.duplication.spill,
+    )
+    if clone_index is not None:
+        try:
+            clone_index.save()
+        except OSError as e:
+            print(f"  [!] Could not write clone index: {e}", file=sys.stderr)
     if verbose:
         dr = result.duplication_result
+        if clone_index is not None:
+            print(f"  Clone index: {clone_index.hits} files reused, {clone_index.misses} re-hashed")
         print(f"  Total tokens: {dr.total_tokens:,}")
         print(f"  Duplicated: {dr.duplicated_tokens:,} ({dr.duplication_pct:.1f}%)")
-        print(f"  Duplicate pairs: {len(dr.duplicate_pairs)}")
+        print(f"  Clone classes: {len(dr.clone_classes)}")
+
+    if config.near_duplicates.enabled:
+        result.near_duplicate_result = detect_near_duplicates(
+            all_parsed, threshold=config.near_duplicates.threshold,
+        )
+        if verbose:
+            nr = result.near_duplicate_result
+            print(f"  Near-duplicate functions: {len(nr.pairs)} pairs, "
+                  f"{len(nr.groups)} identical groups "
+                  f"(Jaccard >= {nr.threshold:.2f}, {nr.functions_analyzed:,} functions)")
 
     # 12. Phase 11: History snapshot & delta
     if verbose:
         print("\n[metrics] Phase 11: History & trends...")
 
-    abs_output_dir = config.output.directory
-    if not os.path.isabs(abs_output_dir):
-        abs_output_dir = os.path.join(config.root, abs_output_dir)
-
     # Load previous snapshot for delta
     prev_snapshot = get_latest_snapshot(abs_output_dir)
 
@@ -436,6 +819,7 @@ def collect_metrics(
         result.module_ratings,
         duplication_pct=dup_pct,
         repo_root=config.root,
+        git_head=churn_index.git_head if churn_index is not None and churn_index.head else None,
     )
 
     # Compare with previous
@@ -578,8 +962,7 @@ def write_output(
             written_files.append(
                 markdown_writer.write_module_summary_md(
                     ms,
-                    result.all_function_metrics,
-                    result.all_class_metrics,
+                    result.metrics.module(ms.module),
                     snapshot_dir,
                 )
             )
@@ -692,6 +1075,12 @@ def write_output(
             written_files.append(
                 markdown_writer.write_risk_hotspots_md(result.risk_hotspots, snapshot_dir)
             )
+    if result.function_risk_hotspots and "json" in formats:
+        written_files.append(
+            json_writer.write_function_risk_hotspots_json(
+                result.function_risk_hotspots, snapshot_dir
+            )
+        )
 
     # DSM
     if result.dsm_result:
@@ -715,6 +1104,18 @@ def write_output(
                 markdown_writer.write_duplication_md(result.duplication_result, snapshot_dir)
             )
 
+    # Near-duplicate functions
+    if result.near_duplicate_result and "json" in formats:
+        written_files.append(
+            json_writer.write_near_duplicates_json(result.near_duplicate_result, snapshot_dir)
+        )
+
+    # Temporal coupling
+    if result.temporal_coupling and "json" in formats:
+        written_files.append(
+            json_writer.write_temporal_coupling_json(result.temporal_coupling, snapshot_dir)
+        )
+
     # Distributions markdown
     if "markdown" in formats and result.distributions:
         written_files.append(
@@ -240,6 +240,7 @@ class DiscoveryConfig:
         "**/generated_plugin_registrant.dart",
     ])
     include_tests: bool = False
+    use_git: bool = True  # list files with `git ls-files` inside a git repository
 
 
 # ---------------------------------------------------------------------------
@@ -251,6 +252,7 @@ class DCMConfig:
     enabled: bool = False
     executable: str = "dcm"
     extra_args: list = field(default_factory=list)
+    jobs: int = 0  # concurrent DCM processes; 0 = one per CPU
 
 
 # ---------------------------------------------------------------------------
@@ -286,6 +288,63 @@ class PackageAnalysisConfig:
     git_since: str = "2025-01-01"
     git_hotspots_top_n: int = 15
     shotgun_surgery_top_n: int = 30
+    function_hotspots: bool = True  # function-level churn from `git log -p`
+    ownership: bool = True  # file age and authors from the whole history
+
+
+# ---------------------------------------------------------------------------
+# Temporal coupling config
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TemporalCouplingConfig:
+    enabled: bool = True
+    max_commit_files: int = 50  # larger commits (mass renames, reformats) are skipped
+    min_co_changes: int = 3  # minimum shared commits of a reported file pair
+    top_n: int = 100
+
+
+# ---------------------------------------------------------------------------
+# Analysis cache config
+# ---------------------------------------------------------------------------
+
+@dataclass
+class CacheConfig:
+    enabled: bool = True
+    directory: str = "cache"  # relative to the output directory
+
+
+# ---------------------------------------------------------------------------
+# Duplication config
+# ---------------------------------------------------------------------------
+
+@dataclass
+class DuplicationConfig:
+    min_tokens: int = 50
+    min_lines: int = 6
+    # "hash": rolling-hash window index; "suffix-array": suffix + LCP
+    # arrays over all tokens (O(n) integer memory, for very large trees)
+    engine: str = "hash"
+    # Hash engine: keep the window shards on disk between hashing and
+    # matching instead of in memory
+    spill: bool = False
+
+
+@dataclass
+class NearDuplicatesConfig:
+    enabled: bool = True
+    threshold: float = 0.8  # minimum estimated Jaccard similarity of a pair
+
+
+# ---------------------------------------------------------------------------
+# Memory config
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MemoryConfig:
+    # Release file sources after the per-file phase; dead code, package
+    # analysis and duplication then work from per-file derived facts
+    drop_sources: bool = False
 
 
 # ---------------------------------------------------------------------------
@@ -302,6 +361,11 @@ class MetricsConfig:
     output: OutputConfig = field(default_factory=OutputConfig)
     graphs: GraphConfig = field(default_factory=GraphConfig)
     package_analysis: PackageAnalysisConfig = field(default_factory=PackageAnalysisConfig)
+    temporal_coupling: TemporalCouplingConfig = field(default_factory=TemporalCouplingConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    duplication: DuplicationConfig = field(default_factory=DuplicationConfig)
+    near_duplicates: NearDuplicatesConfig = field(default_factory=NearDuplicatesConfig)
+    memory: MemoryConfig = field(default_factory=MemoryConfig)
 
 
 # ---------------------------------------------------------------------------
@@ -366,6 +430,16 @@ def load_config(config_path: Optional[str] = None, repo_root: Optional[str] = No
             _apply_dict(config.graphs, data["graphs"])
         if "package_analysis" in data:
             _apply_dict(config.package_analysis, data["package_analysis"])
+        if "temporal_coupling" in data:
+            _apply_dict(config.temporal_coupling, data["temporal_coupling"])
+        if "cache" in data:
+            _apply_dict(config.cache, data["cache"])
+        if "duplication" in data:
+            _apply_dict(config.duplication, data["duplication"])
+        if "near_duplicates" in data:
+            _apply_dict(config.near_duplicates, data["near_duplicates"])
+        if "memory" in data:
+            _apply_dict(config.memory, data["memory"])
 
     # Resolve root to absolute
     if not os.path.isabs(config.root):
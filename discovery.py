@@ -1,10 +1,25 @@
-"""Monorepo module discovery."""
+"""Monorepo module discovery.
+
+Inside a git repository the files are listed once with ``git ls-files``
+(:class:`SourceTree`), which honours ``.gitignore`` and gives the blob id
+of every file whose working copy matches the index.  Elsewhere, or with
+``discovery.use_git: false``, the tree is walked through a
+:class:`DirectoryListing`, which reads each directory once per run and,
+saved between runs, not at all while its mtime is unchanged.
+
+Exclude patterns are compiled once per pattern list into a single regex.
+"""
 
 from __future__ import annotations
 
 import fnmatch
 import os
-from typing import List
+import pickle
+import re
+import subprocess
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Pattern, Set, Tuple
 
 import yaml
 
@@ -12,24 +27,263 @@ from .config import MetricsConfig
 from .models import Module
 
 
-def discover_modules(config: MetricsConfig) -> List[Module]:
-    """Discover all Dart modules in the monorepo based on strategy."""
+# Directories never searched for modules and sources
+_PRUNED_DIRS = (".dart_tool", "build", ".pub", "node_modules")
+_PRUNED_SOURCE_DIRS = (".dart_tool", "build", ".pub")
+
+# Directories modified this recently are not kept in a saved listing:
+# a change within the same mtime tick would go unnoticed
+_MTIME_SLACK_NS = 2_000_000_000
+
+# Bump whenever the saved directory listing layout changes
+_LISTING_FORMAT = 1
+
+# ``git ls-files`` modes of submodule and symlink entries
+_GITLINK_MODE = "160000"
+_SYMLINK_MODE = "120000"
+
+
+class SourceTree:
+    """Files under the analyzed root, from a single ``git ls-files``.
+
+    ``files`` holds every tracked or untracked, not ignored, file as a
+    sorted ``/``-separated path relative to the root.  ``content_keys``
+    maps the files whose working copy matches the index to their git
+    blob id, which equals :func:`cache.content_key` of their bytes, so
+    unchanged files can be recognized without being read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: List[str] = []
+        self.content_keys: Dict[str, str] = {}
+
+    @classmethod
+    def from_git(cls, root: str) -> Optional["SourceTree"]:
+        """List *root* with ``git ls-files``; None outside a git work tree.
+
+        Also None when the tree contains submodules, whose files
+        ``git ls-files`` does not list together with untracked ones.
+        """
+        try:
+            r = subprocess.run(
+                [
+                    "git", "-C", root, "ls-files", "-z", "-s", "-t",
+                    "--cached", "--modified", "--others", "--exclude-standard",
+                ],
+                capture_output=True, timeout=120,
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            return None
+        if r.returncode != 0:
+            return None
+
+        tree = cls(root)
+        files = set()
+        changed = set()
+        for entry in r.stdout.decode("utf-8", "surrogateescape").split("\0"):
+            if not entry:
+                continue
+            tag = entry[0]
+            if tag == "?":  # untracked
+                files.add(entry[2:])
+                continue
+            info, _, path = entry[2:].partition("\t")
+            mode, blob, _ = info.split(" ", 2)
+            if mode == _GITLINK_MODE:
+                return None
+            if tag == "H":  # cached
+                files.add(path)
+                if mode != _SYMLINK_MODE:  # a symlink's blob is its target path
+                    tree.content_keys[path] = blob
+            elif tag in ("C", "M"):  # modified or deleted, unmerged
+                files.add(path)
+                changed.add(path)
+        for path in changed:
+            tree.content_keys.pop(path, None)
+            if not os.path.isfile(os.path.join(root, path)):
+                files.discard(path)  # deleted from the working tree
+        tree.files = sorted(files)
+        return tree
+
+    def module_files(
+        self,
+        modules: List[Module],
+        config: MetricsConfig,
+    ) -> Dict[str, List[str]]:
+        """Absolute paths of the Dart sources of each module, by module name.
+
+        A file belongs to the module with the longest path prefix of it
+        (so files of a nested package are not counted for its parent),
+        and is listed if it lies under the module's ``lib/`` (or
+        ``test/`` with ``include_tests``), as :func:`list_dart_files`
+        would list it.
+        """
+        module_by_dir: Dict[str, Module] = {}
+        for m in modules:
+            rel = os.path.normpath(m.path).replace(os.sep, "/")
+            module_by_dir[rel] = m
+        source_dirs = ("lib", "test") if config.discovery.include_tests else ("lib",)
+        exclude_files = config.discovery.exclude_files
+
+        result: Dict[str, List[str]] = {m.name: [] for m in modules}
+        for path in self.files:
+            if not path.endswith(".dart"):
+                continue
+            parts = path.split("/")
+            # Longest module prefix: try the deepest directory first
+            for depth in range(len(parts) - 1, -1, -1):
+                module = module_by_dir.get("/".join(parts[:depth]) or ".")
+                if module is not None:
+                    break
+            else:
+                continue
+            inner = parts[depth:-1]
+            if not inner or inner[0] not in source_dirs:
+                continue
+            if any(d in _PRUNED_SOURCE_DIRS for d in inner[1:]):
+                continue
+            if _is_file_excluded(path, exclude_files):
+                continue
+            result[module.name].append(os.path.join(self.root, path))
+        return result
+
+
+class DirectoryListing:
+    """Directory entries read with ``os.scandir``, reusable while the mtime holds.
+
+    :meth:`walk` works like ``os.walk`` (top-down, pruned by editing the
+    yielded ``dirs``, symlinked directories not entered).  ``entries``
+    maps each directory read to ``(mtime_ns, subdirectories, files)``,
+    so module discovery and the per-module source listing read every
+    directory once, and a listing saved with :meth:`save` lets the next
+    run stat a directory instead of reading it while it is unchanged.
+    A directory's mtime changes only with its own entries, so every
+    directory is still stat'ed.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen: Set[str] = set()
+        self._recent: Set[str] = set()
+
+    @classmethod
+    def load(cls, path: str) -> "DirectoryListing":
+        """Load a listing saved by :meth:`save`; empty if missing, corrupt or stale."""
+        listing = cls()
+        try:
+            with open(path, "rb") as fh:
+                data = pickle.load(fh)
+        except Exception:
+            return listing
+        if (
+            isinstance(data, dict)
+            and data.get("format") == _LISTING_FORMAT
+            and isinstance(data.get("entries"), dict)
+        ):
+            listing.entries = data["entries"]
+        return listing
+
+    def save(self, path: str) -> None:
+        """Write the directories read or checked in this run to *path*.
+
+        Skipped when every directory was reused and none was dropped.
+        """
+        entries = {
+            d: self.entries[d] for d in self._seen
+            if d in self.entries and d not in self._recent
+        }
+        if not self.misses and len(entries) == len(self.entries) and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(
+                {"format": _LISTING_FORMAT, "entries": entries},
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+
+    def listdir(self, path: str) -> Optional[Tuple[List[str], List[str]]]:
+        """``(subdirectories, files)`` of *path*; None if it cannot be read."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        self._seen.add(path)
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == mtime:
+            self.hits += 1
+            return cached[1], cached[2]
+
+        dirs: List[str] = []
+        files: List[str] = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                    elif not entry.is_symlink():
+                        dirs.append(entry.name)
+        except OSError:
+            return None
+        self.misses += 1
+        self.entries[path] = (mtime, dirs, files)
+        if time.time_ns() - mtime < _MTIME_SLACK_NS:
+            self._recent.add(path)
+        else:
+            self._recent.discard(path)
+        return dirs, files
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """``(dirpath, dirs, files)`` for *top* and its subdirectories, top-down."""
+        listed = self.listdir(top)
+        if listed is None:
+            return
+        dirs = list(listed[0])
+        yield top, dirs, listed[1]
+        for d in dirs:
+            yield from self.walk(os.path.join(top, d))
+
+
+def discover_modules(
+    config: MetricsConfig,
+    tree: Optional[SourceTree] = None,
+    listing: Optional[DirectoryListing] = None,
+) -> List[Module]:
+    """Discover all Dart modules in the monorepo based on strategy.
+
+    With *tree*, auto discovery looks for ``pubspec.yaml`` files in its
+    listing instead of walking the directory tree; otherwise the walk
+    goes through *listing* (a fresh one when omitted).
+    """
     strategy = config.discovery.strategy
     if strategy == "workspace":
-        return _discover_workspace(config)
+        return _discover_workspace(config, tree, listing)
     elif strategy == "manual":
         return _discover_manual(config)
     else:
-        return _discover_auto(config)
+        return _discover_auto(config, tree, listing)
 
 
-def _discover_workspace(config: MetricsConfig) -> List[Module]:
+def _discover_workspace(
+    config: MetricsConfig,
+    tree: Optional[SourceTree] = None,
+    listing: Optional[DirectoryListing] = None,
+) -> List[Module]:
     """Read workspace field from root pubspec.yaml."""
     root = config.root
     pubspec_path = os.path.join(root, "pubspec.yaml")
     if not os.path.isfile(pubspec_path):
         print(f"[discovery] root pubspec.yaml not found at {pubspec_path}, falling back to auto")
-        return _discover_auto(config)
+        return _discover_auto(config, tree, listing)
 
     with open(pubspec_path, "r", encoding="utf-8") as fh:
         data = yaml.safe_load(fh) or {}
@@ -37,7 +291,7 @@ def _discover_workspace(config: MetricsConfig) -> List[Module]:
     workspace_paths = data.get("workspace", [])
     if not workspace_paths:
         print("[discovery] workspace field is empty, falling back to auto")
-        return _discover_auto(config)
+        return _discover_auto(config, tree, listing)
 
     modules: List[Module] = []
     for rel_path in workspace_paths:
@@ -60,24 +314,48 @@ def _discover_manual(config: MetricsConfig) -> List[Module]:
     return modules
 
 
-def _discover_auto(config: MetricsConfig) -> List[Module]:
+def _discover_auto(
+    config: MetricsConfig,
+    tree: Optional[SourceTree] = None,
+    listing: Optional[DirectoryListing] = None,
+) -> List[Module]:
     """Recursively find all pubspec.yaml files."""
     root = config.root
     modules: List[Module] = []
 
-    for dirpath, dirs, files in os.walk(root):
-        # Prune hidden/build directories
+    if tree is not None:
+        for path in tree.files:
+            parts = path.split("/")
+            if parts[-1] != "pubspec.yaml":
+                continue
+            if any(d.startswith(".") or d in _PRUNED_DIRS for d in parts[:-1]):
+                continue
+            rel = "/".join(parts[:-1]) or "."
+            if _is_excluded_path(rel, config.discovery.exclude_patterns):
+                continue
+            module = _load_module(root, rel)
+            if module is not None:
+                modules.append(module)
+        return modules
+
+    patterns = config.discovery.exclude_patterns
+    if listing is None:
+        listing = DirectoryListing()
+    for dirpath, dirs, files in listing.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        prefix = "" if rel == "." else rel + "/"
+
+        # Prune hidden/build directories, and excluded ones with all they hold
         dirs[:] = [
             d for d in dirs
             if not d.startswith(".")
-            and d not in (".dart_tool", "build", ".pub", "node_modules")
+            and d not in _PRUNED_DIRS
+            and not _is_excluded_subtree(prefix + d, patterns)
         ]
 
         if "pubspec.yaml" not in files:
             continue
 
-        rel = os.path.relpath(dirpath, root)
-
         if _is_excluded_path(rel, config.discovery.exclude_patterns):
             continue
 
@@ -113,23 +391,52 @@ def _load_module(root: str, rel_path: str) -> Module | None:
     return Module(name=name, path=rel_path, is_flutter=is_flutter)
 
 
+@lru_cache(maxsize=32)
+def _compile_patterns(patterns: Tuple[str, ...]) -> Optional[Pattern]:
+    """Glob *patterns* as one compiled regex matching any of them; None if empty."""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns))
+
+
 def _is_excluded_path(rel_path: str, patterns: list) -> bool:
     """Check if a relative path matches any exclude pattern."""
+    regex = _compile_patterns(tuple(patterns))
+    if regex is None:
+        return False
     normalized = rel_path.replace(os.sep, "/")
-    for pattern in patterns:
-        if fnmatch.fnmatch(normalized, pattern):
-            return True
-        # Also check individual path components
-        parts = normalized.split("/")
-        for part in parts:
-            if fnmatch.fnmatch(part, pattern):
-                return True
-    return False
-
-
-def list_dart_files(root: str, module_path: str, config: MetricsConfig) -> List[str]:
+    if regex.match(normalized):
+        return True
+    # Also check individual path components
+    return any(regex.match(part) for part in normalized.split("/"))
+
+
+def _is_excluded_subtree(rel_dir: str, patterns: list) -> bool:
+    """Whether *rel_dir* and every path below it are excluded by *patterns*.
+
+    True when its last component matches a pattern (all paths below
+    contain it), or when a pattern ending in ``*`` matches it whole (the
+    ``*`` also matches whatever follows).  The walk prunes such
+    directories without looking inside.
+    """
+    regex = _compile_patterns(tuple(patterns))
+    if regex is None:
+        return False
+    if regex.match(rel_dir.rsplit("/", 1)[-1]):
+        return True
+    open_ended = _compile_patterns(tuple(p for p in patterns if p.endswith("*")))
+    return open_ended is not None and open_ended.match(rel_dir) is not None
+
+
+def list_dart_files(
+    root: str,
+    module_path: str,
+    config: MetricsConfig,
+    listing: Optional[DirectoryListing] = None,
+) -> List[str]:
     """List all Dart source files in a module, applying filters.
 
+    Directories are read through *listing* (a fresh one when omitted).
     Returns absolute paths.
     """
     abs_module = os.path.join(root, module_path) if not os.path.isabs(module_path) else module_path
@@ -137,16 +444,16 @@ def list_dart_files(root: str, module_path: str, config: MetricsConfig) -> List[
     test_dir = os.path.join(abs_module, "test")
 
     dirs_to_scan = [lib_dir]
-    if config.discovery.include_tests and os.path.isdir(test_dir):
+    if config.discovery.include_tests:
         dirs_to_scan.append(test_dir)
 
+    if listing is None:
+        listing = DirectoryListing()
     files: List[str] = []
     for scan_dir in dirs_to_scan:
-        if not os.path.isdir(scan_dir):
-            continue
-        for dirpath, dirs, filenames in os.walk(scan_dir):
+        for dirpath, dirs, filenames in listing.walk(scan_dir):
             # Prune build dirs
-            dirs[:] = [d for d in dirs if d not in (".dart_tool", "build", ".pub")]
+            dirs[:] = [d for d in dirs if d not in _PRUNED_SOURCE_DIRS]
 
             for f in filenames:
                 if not f.endswith(".dart"):
@@ -162,14 +469,16 @@ def list_dart_files(root: str, module_path: str, config: MetricsConfig) -> List[
 
 def _is_file_excluded(rel_path: str, patterns: list) -> bool:
     """Check if a file matches any exclusion pattern."""
+    patterns = tuple(patterns)
+    regex = _compile_patterns(patterns)
+    if regex is None:
+        return False
     normalized = rel_path.replace(os.sep, "/")
-    for pattern in patterns:
-        if fnmatch.fnmatch(normalized, pattern):
-            return True
-        # Also match just the filename
-        if fnmatch.fnmatch(os.path.basename(normalized), pattern.lstrip("*/")):
-            return True
-    return False
+    if regex.match(normalized):
+        return True
+    # Also match just the filename
+    name_regex = _compile_patterns(tuple(p.lstrip("*/") for p in patterns))
+    return name_regex.match(normalized.rsplit("/", 1)[-1]) is not None
 
 
 def get_internal_packages(modules: List[Module]) -> set:
@@ -1,15 +1,23 @@
-"""Class-level metrics: CBO, DIT, NOAM, NOII, NOM, NOOM, RFC, TCC, WOC, WMC."""
+"""Class-level metrics: CBO, DIT, NOAM, NOII, NOM, NOOM, RFC, TCC, LCOM4, WOC, WMC."""
 
 from __future__ import annotations
 
+import os
 import re
-from itertools import combinations
-from typing import Dict, List, Optional, Set
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 from ..config import Thresholds
-from ..models import ClassMetrics, ParsedClass, ParsedFile, ParsedFunction
-from ..parsers.dart_parser import strip_strings_and_comments
-from .function_metrics import compute_cyclomatic_complexity
+from ..models import ClassMetrics, ParsedClass, ParsedFile, ParsedFunction, ParsedImport
+from ..parsers.dart_lexer import (
+    COMMENT,
+    IDENTIFIER,
+    PUNCTUATION,
+    STRING,
+    WORD_KINDS,
+    TokenStream,
+)
+from .function_metrics import compute_cyclomatic_complexity, file_token_stream
 
 
 # ---------------------------------------------------------------------------
@@ -37,8 +45,7 @@ _RE_SINGLE_LETTER_GENERIC = re.compile(r'^[A-Z]$')
 # ALL_CAPS identifiers are typically constants/enum values, not types
 _RE_ALL_CAPS = re.compile(r'^[A-Z][A-Z0-9_]+$')
 
-_RE_TYPE_REFERENCE = re.compile(r"\b([A-Z][a-zA-Z0-9_]*)\b")
-_RE_INVOCATION = re.compile(r"\b(\w+)\s*\(")
+_RE_TYPE_REFERENCE = re.compile(r"[A-Z][a-zA-Z0-9_]*")
 
 
 # ---------------------------------------------------------------------------
@@ -83,74 +90,195 @@ _KNOWN_DIT: dict[str, int] = {
 # Cross-file class index
 # ---------------------------------------------------------------------------
 
-class ClassIndex:
-    """Index of all classes across files for cross-file analysis."""
-
-    def __init__(self):
-        self.classes: Dict[str, ParsedClass] = {}
-        self.class_files: Dict[str, str] = {}
-        self.inheritance: Dict[str, Optional[str]] = {}
+# A class is identified by (package, library path, class name)
+ClassKey = Tuple[str, str, str]
 
-    def add_file(self, parsed_file: ParsedFile):
-        for cls in parsed_file.classes:
-            self.classes[cls.name] = cls
-            self.class_files[cls.name] = parsed_file.path
-            self.inheritance[cls.name] = cls.superclass
+_NO_METHODS: FrozenSet[str] = frozenset()
 
-    def get_superclass(self, class_name: str) -> Optional[ParsedClass]:
-        super_name = self.inheritance.get(class_name)
-        return self.classes.get(super_name) if super_name else None
 
-    def get_dit(self, class_name: str) -> int:
-        """Compute Depth of Inheritance Tree.
+class ClassIndex:
+    """Index of all classes across files for cross-file analysis.
+
+    Classes are keyed by ``(package, library, name)``, the library being
+    the file path, so same-named classes of different packages do not
+    overwrite each other.  Once all files are added, :meth:`resolve`
+    binds every superclass name to a class (import-aware, see
+    :meth:`_resolve_superclass`) and computes DIT and the inherited
+    method names of the whole inheritance forest in one pass, parents
+    before children; lookups are then plain dictionary reads.  Adding a
+    class afterwards makes the next lookup resolve again.
+    """
 
-        Walks the inheritance chain within the codebase. For external
-        classes, uses ``_KNOWN_DIT`` lookup when available; otherwise
-        assumes depth = 1 for the external parent.
-        """
-        depth = 0
-        current = class_name
-        visited: set[str] = set()
-        while current in self.inheritance:
-            if current in visited:
-                break
-            visited.add(current)
-            parent = self.inheritance[current]
+    def __init__(self, package_roots: Optional[Dict[str, str]] = None):
+        # package name -> package directory, for ``package:`` imports
+        self.package_roots: Dict[str, str] = dict(package_roots or {})
+        self.classes: Dict[ClassKey, List[str]] = {}  # class -> method names
+        self.superclass_names: Dict[ClassKey, Optional[str]] = {}
+        self.libraries: Dict[str, List[ParsedImport]] = {}  # path -> imports
+        self.parents: Dict[ClassKey, Optional[ClassKey]] = {}
+        self._by_name: Dict[str, List[ClassKey]] = {}
+        self._dit: Dict[ClassKey, int] = {}
+        self._inherited: Dict[ClassKey, FrozenSet[str]] = {}
+        self._resolved = False
+
+    def add_file(self, parsed_file: ParsedFile, package: str = ""):
+        self.add_library(parsed_file.path, parsed_file.imports)
+        for cls in parsed_file.classes:
+            self.add_class(
+                cls.name, parsed_file.path, cls.superclass,
+                [m.name for m in cls.methods], package,
+            )
+
+    def add_library(self, path: str, imports: List[ParsedImport]):
+        self.libraries[path] = imports
+        self._resolved = False
+
+    def add_class(
+        self,
+        name: str,
+        path: str,
+        superclass: Optional[str],
+        method_names: List[str],
+        package: str = "",
+    ) -> ClassKey:
+        key = (package, path, name)
+        if key not in self.classes:
+            self._by_name.setdefault(name, []).append(key)
+        self.classes[key] = method_names
+        self.superclass_names[key] = superclass
+        self._resolved = False
+        return key
+
+    # -- resolution --------------------------------------------------------
+
+    def resolve(self) -> None:
+        """Bind superclasses and memoize DIT / inherited methods of every class."""
+        self.parents = {
+            key: self._resolve_superclass(key, name) if name else None
+            for key, name in self.superclass_names.items()
+        }
+        self._dit = {}
+        self._inherited = {}
+        for key in self.classes:
+            if key not in self._dit:
+                self._resolve_chain(key)
+        self._resolved = True
+
+    def _resolve_chain(self, key: ClassKey) -> None:
+        """Memoize *key* and its unresolved ancestors, topmost first."""
+        dit, inherited, parents = self._dit, self._inherited, self.parents
+        chain: List[ClassKey] = []
+        on_chain: Dict[ClassKey, int] = {}
+        current: Optional[ClassKey] = key
+        while current is not None and current not in dit and current not in on_chain:
+            on_chain[current] = len(chain)
+            chain.append(current)
+            current = parents[current]
+
+        if current is not None and current in on_chain:
+            # Inheritance cycle: every member sees the whole cycle
+            cycle = chain[on_chain[current]:]
+            del chain[on_chain[current]:]
+            methods = frozenset(name for member in cycle for name in self.classes[member])
+            for member in cycle:
+                dit[member] = len(cycle)
+                inherited[member] = methods
+
+        for member in reversed(chain):
+            parent = parents[member]
             if parent is None:
-                break
-            if parent not in self.inheritance:
-                # External class — try known DIT table
-                if parent in _KNOWN_DIT:
-                    depth += _KNOWN_DIT[parent] + 1
-                else:
-                    depth += 1  # at least 1 for the external parent
-                break
-            depth += 1
-            current = parent
-        return depth
-
-    def get_superclass_methods(self, class_name: str) -> set[str]:
-        methods: set[str] = set()
-        current = class_name
-        visited: set[str] = set()
-        while current in self.inheritance:
-            if current in visited:
-                break
-            visited.add(current)
-            parent_name = self.inheritance[current]
-            if parent_name and parent_name in self.classes:
-                parent_cls = self.classes[parent_name]
-                methods.update(m.name for m in parent_cls.methods)
-                current = parent_name
+                dit[member] = self._external_depth(self.superclass_names[member])
+                inherited[member] = _NO_METHODS
+                continue
+            dit[member] = dit[parent] + 1
+            parent_methods = inherited[parent]
+            own = self.classes[parent]
+            if all(name in parent_methods for name in own):
+                inherited[member] = parent_methods
             else:
-                break
-        return methods
+                inherited[member] = parent_methods.union(own)
 
+    @staticmethod
+    def _external_depth(superclass: Optional[str]) -> int:
+        """DIT of a class whose superclass is not in the codebase (or absent).
 
-def build_class_index(parsed_files: List[ParsedFile]) -> ClassIndex:
-    index = ClassIndex()
+        Uses the ``_KNOWN_DIT`` lookup when available; otherwise assumes
+        depth = 1 for the external parent.
+        """
+        if not superclass:
+            return 0
+        return _KNOWN_DIT.get(superclass, 0) + 1
+
+    def _resolve_superclass(self, key: ClassKey, name: str) -> Optional[ClassKey]:
+        """The class *name* refers to in the library of class *key*, or None if external.
+
+        Among the project's classes of that name (other than *key*), the
+        first one found in: the same library, the libraries it imports,
+        the packages it imports from (their public API may re-export the
+        class), its own package, the whole project.  Ties go to the
+        smallest key, so the result does not depend on file order.
+        """
+        name = name.rsplit(".", 1)[-1]  # import prefix
+        candidates = [k for k in self._by_name.get(name, ()) if k != key]
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        package, path, _ = key
+        imports = self.libraries.get(path, ())
+        imported = self._imported_libraries(path, imports)
+        imported_packages = {imp.package_name for imp in imports if imp.is_package}
+        for visible in (
+            lambda k: k[1] == path,
+            lambda k: k[1] in imported,
+            lambda k: k[0] in imported_packages,
+            lambda k: k[0] == package,
+        ):
+            narrowed = [k for k in candidates if visible(k)]
+            if narrowed:
+                return min(narrowed)
+        return min(candidates)
+
+    def _imported_libraries(self, path: str, imports: List[ParsedImport]) -> Set[str]:
+        """Paths of the project libraries imported by the library at *path*."""
+        libraries: Set[str] = set()
+        for imp in imports:
+            if imp.is_relative:
+                libraries.add(os.path.normpath(os.path.join(os.path.dirname(path), imp.uri)))
+            elif imp.is_package and imp.package_name in self.package_roots:
+                library = imp.uri.split("/", 1)[1] if "/" in imp.uri else ""
+                libraries.add(os.path.normpath(
+                    os.path.join(self.package_roots[imp.package_name], "lib", library)
+                ))
+        return libraries
+
+    # -- lookups -----------------------------------------------------------
+
+    def get_dit(self, key: ClassKey) -> int:
+        """Depth of Inheritance Tree of class *key* (0 if unknown).
+
+        Follows the inheritance chain within the codebase; an external
+        ancestor adds its ``_KNOWN_DIT`` depth (or 1) on top.
+        """
+        if not self._resolved:
+            self.resolve()
+        return self._dit.get(key, 0)
+
+    def get_superclass_methods(self, key: ClassKey) -> FrozenSet[str]:
+        """Names of the methods class *key* inherits from classes in the codebase."""
+        if not self._resolved:
+            self.resolve()
+        return self._inherited.get(key, _NO_METHODS)
+
+
+def build_class_index(
+    parsed_files: List[ParsedFile],
+    package: str = "",
+    package_roots: Optional[Dict[str, str]] = None,
+) -> ClassIndex:
+    index = ClassIndex(package_roots)
     for pf in parsed_files:
-        index.add_file(pf)
+        index.add_file(pf, package)
+    index.resolve()
     return index
 
 
@@ -162,66 +290,89 @@ def compute_class_metrics(
     parsed_file: ParsedFile,
     module_name: str,
     thresholds: Thresholds,
-    class_index: ClassIndex,
+    class_index: Optional[ClassIndex],
     internal_packages: Set[str],
 ) -> List[ClassMetrics]:
+    """Compute class metrics for every class in *parsed_file*.
+
+    DIT and NOAM depend on other files and are only filled in when
+    *class_index* is given; otherwise apply them later with
+    :func:`apply_inheritance_metrics` once the index is complete.
+    """
     results: List[ClassMetrics] = []
+    file_tokens = file_token_stream(parsed_file)
 
     for cls in parsed_file.classes:
+        body_tokens = [file_tokens.slice(m.body_start, m.body_end) for m in cls.methods]
         nom = len(cls.methods)
-        superclass_methods = class_index.get_superclass_methods(cls.name)
-        noam = sum(1 for m in cls.methods if m.name not in superclass_methods)
         noom = sum(1 for m in cls.methods if m.is_override)
         noii = len(cls.interfaces)
-        dit = class_index.get_dit(cls.name)
-        wmc = sum(compute_cyclomatic_complexity(m.body_text) for m in cls.methods)
-        cbo = _compute_cbo(cls)
-        rfc = _compute_rfc(cls)
-        tcc = _compute_tcc(cls)
+        wmc = sum(
+            m.cyclo if m.cyclo is not None else compute_cyclomatic_complexity(tokens)
+            for m, tokens in zip(cls.methods, body_tokens)
+        )
+        cbo = _compute_cbo(cls, file_tokens.slice(cls.start, cls.end))
+        rfc = _compute_rfc(cls, body_tokens)
+        tcc, lcom4 = _compute_cohesion(cls, body_tokens)
         woc = _compute_woc(cls)
         loc = cls.line_end - cls.line_start + 1
 
-        results.append(ClassMetrics(
+        cm = ClassMetrics(
             path=parsed_file.path,
             module=module_name,
             class_name=cls.name,
             line_start=cls.line_start,
             line_end=cls.line_end,
             cbo=cbo,
-            dit=dit,
-            noam=noam,
             noii=noii,
             nom=nom,
             noom=noom,
             rfc=rfc,
             tcc=round(tcc, 3),
+            lcom4=lcom4,
             woc=round(woc, 3),
             wmc=wmc,
             loc=loc,
-        ))
+        )
+        if class_index is not None:
+            apply_inheritance_metrics(cm, [m.name for m in cls.methods], class_index)
+        results.append(cm)
 
     return results
 
 
+def apply_inheritance_metrics(
+    cm: ClassMetrics,
+    method_names: List[str],
+    class_index: ClassIndex,
+) -> None:
+    """Fill in the cross-file metrics (DIT, NOAM) of *cm* in-place."""
+    key = (cm.module, cm.path, cm.class_name)
+    superclass_methods = class_index.get_superclass_methods(key)
+    cm.noam = sum(1 for name in method_names if name not in superclass_methods)
+    cm.dit = class_index.get_dit(key)
+
+
 # ---------------------------------------------------------------------------
 # CBO — Coupling Between Object Classes
 # ---------------------------------------------------------------------------
 
-def _compute_cbo(cls: ParsedClass) -> int:
+def _compute_cbo(cls: ParsedClass, tokens: TokenStream) -> int:
     """Count unique external types referenced by the class.
 
     Improvements over naive approach:
-    - Strips strings and comments before scanning (no false positives from URLs etc.)
+    - Only looks at identifier tokens (no false positives from strings, URLs etc.)
     - Filters single-letter generics (T, K, V, E, R, S)
     - Filters ALLCAPS identifiers (likely enum constants, not types)
     - Expanded primitive/built-in type exclusion list
     """
-    # Strip strings AND comments to avoid catching types from string content
-    cleaned = strip_strings_and_comments(cls.full_text)
-
     referenced_types: set[str] = set()
-    for match in _RE_TYPE_REFERENCE.finditer(cleaned):
-        type_name = match.group(1)
+    for kind, text in zip(tokens.kinds, tokens.texts):
+        if kind != IDENTIFIER:
+            continue
+        if not _RE_TYPE_REFERENCE.fullmatch(text):
+            continue
+        type_name = text
         if type_name == cls.name:
             continue
         if type_name in _PRIMITIVE_TYPES:
@@ -245,88 +396,153 @@ _RFC_SKIP_CALLS = frozenset({
     "true", "false", "null",
 })
 
-def _compute_rfc(cls: ParsedClass) -> int:
+def _compute_rfc(cls: ParsedClass, method_bodies: List[TokenStream]) -> int:
     own_methods = {m.name for m in cls.methods}
     external_calls: set[str] = set()
 
-    for method in cls.methods:
-        body = strip_strings_and_comments(method.body_text)
-        for match in _RE_INVOCATION.finditer(body):
-            call_name = match.group(1)
-            if call_name in _RFC_SKIP_CALLS:
+    for body in method_bodies:
+        # A call is a word directly followed by '(' (comments in between allowed)
+        call_name = None
+        for kind, text in zip(body.kinds, body.texts):
+            if kind == COMMENT:
                 continue
-            if call_name not in own_methods:
+            if (call_name is not None and kind == PUNCTUATION and text == '('
+                    and call_name not in _RFC_SKIP_CALLS
+                    and call_name not in own_methods):
                 external_calls.add(call_name)
+            call_name = text if kind in WORD_KINDS else None
 
     return len(own_methods) + len(external_calls)
 
 
 # ---------------------------------------------------------------------------
-# TCC — Tight Class Cohesion
+# TCC — Tight Class Cohesion, LCOM4 — Lack of Cohesion of Methods
 # ---------------------------------------------------------------------------
 
-def _compute_tcc(cls: ParsedClass) -> float:
-    """TCC = connected pairs / total pairs.
+# Private names that may be fields, and simple ``$name`` interpolations
+_RE_PRIVATE_FIELD = re.compile(r'_[a-z]\w*')
+_RE_INTERPOLATED_NAME = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)')
 
-    Includes regular methods, getters and setters in the analysis
-    (getters/setters access fields and contribute to cohesion).
-    Only excludes static methods and constructors.
-    """
-    if len(cls.methods) < 2:
-        return 1.0
 
-    # Determine all instance fields
-    class_fields = set(cls.fields) if cls.fields else set()
+def _compute_cohesion(cls: ParsedClass, body_tokens: List[TokenStream]) -> Tuple[float, int]:
+    """TCC and LCOM4 of *cls* (*body_tokens* is parallel to ``cls.methods``).
 
-    # Augment from this.x and _x patterns if parser missed some
-    if not class_fields:
-        for m in cls.methods:
-            if m.body_text:
-                for match in re.finditer(r"\bthis\.(\w+)", m.body_text):
-                    class_fields.add(match.group(1))
-                for match in re.finditer(r"\b(_[a-z]\w*)\b", m.body_text):
-                    name = match.group(1)
-                    # Exclude private method calls: _method(
-                    if not re.search(r'\b' + re.escape(name) + r'\s*\(', m.body_text):
-                        class_fields.add(name)
+    Each instance method's field accesses are collected once from its
+    identifier tokens into an integer bitset (bit *k* = the *k*-th
+    field); calls and references to other instance methods go into a
+    second bitset.
 
-    if not class_fields:
-        return 0.0
+    TCC = connected pairs / total pairs, where two methods are connected
+    when their field bitsets intersect.  Includes regular methods,
+    getters and setters in the analysis (getters/setters access fields
+    and contribute to cohesion).  Only excludes static methods and
+    constructors.
 
-    # Instance methods (non-static) — include getters and setters
-    instance_methods = [
-        m for m in cls.methods
-        if not m.is_static
-    ]
-
-    if len(instance_methods) < 2:
-        return 1.0
-
-    # For each method, find which fields it accesses
-    method_fields: list[set[str]] = []
-    for method in instance_methods:
-        body = method.body_text or ''
-        used: set[str] = set()
-        for f in class_fields:
-            if re.search(r'\b' + re.escape(f) + r'\b', body):
-                used.add(f)
+    LCOM4 = number of connected components of the graph of instance
+    methods linked by a shared field or a call, found with union-find
+    over the same bitsets.  1 is a cohesive class; more suggests the
+    class could be split.
+    """
+    class_fields = set(cls.fields) if cls.fields else _guess_fields(body_tokens)
+    field_bits = {name: 1 << b for b, name in enumerate(sorted(class_fields))}
+
+    instance = [(m, tokens) for m, tokens in zip(cls.methods, body_tokens) if not m.is_static]
+    method_bits: Dict[str, int] = {}
+    for k, (m, _) in enumerate(instance):
+        method_bits[m.name] = method_bits.get(m.name, 0) | 1 << k
+
+    # For each method, the fields it accesses and the methods it uses
+    field_masks: List[int] = []
+    call_masks: List[int] = []
+    for m, tokens in instance:
+        fields = calls = 0
+        for kind, text in zip(tokens.kinds, tokens.texts):
+            if kind == IDENTIFIER:
+                fields |= field_bits.get(text, 0)
+                calls |= method_bits.get(text, 0)
+            elif kind == STRING and '$' in text and text[0] != 'r':
+                for name in _RE_INTERPOLATED_NAME.findall(text):
+                    fields |= field_bits.get(name, 0)
+                    calls |= method_bits.get(name, 0)
         # Getters/setters implicitly access their backing field
-        if method.is_getter or method.is_setter:
-            backing = '_' + method.name
-            if backing in class_fields:
-                used.add(backing)
-            if method.name in class_fields:
-                used.add(method.name)
-        method_fields.append(used)
-
-    total_pairs = 0
-    connected_pairs = 0
-    for i, j in combinations(range(len(method_fields)), 2):
-        total_pairs += 1
-        if method_fields[i] & method_fields[j]:
-            connected_pairs += 1
+        if m.is_getter or m.is_setter:
+            fields |= field_bits.get('_' + m.name, 0) | field_bits.get(m.name, 0)
+        field_masks.append(fields)
+        call_masks.append(calls)
+
+    lcom4 = _count_components(field_masks, call_masks)
 
-    return connected_pairs / total_pairs if total_pairs > 0 else 0.0
+    if len(cls.methods) < 2:
+        return 1.0, lcom4
+    if not class_fields:
+        return 0.0, lcom4
+    n = len(instance)
+    if n < 2:
+        return 1.0, lcom4
+
+    # Methods with the same bitset are connected to each other (unless
+    # it is empty) and to the same other methods, so pairs are counted
+    # per distinct bitset
+    masks = list(Counter(field_masks).items())
+    connected_pairs = 0
+    for a, (mask_a, count_a) in enumerate(masks):
+        if not mask_a:
+            continue
+        connected_pairs += count_a * (count_a - 1) // 2
+        for mask_b, count_b in masks[a + 1:]:
+            if mask_a & mask_b:
+                connected_pairs += count_a * count_b
+
+    return connected_pairs / (n * (n - 1) // 2), lcom4
+
+
+def _guess_fields(body_tokens: List[TokenStream]) -> Set[str]:
+    """Fields of a class the parser found none for: ``this.x`` targets,
+    and ``_x`` names that are never called in the method using them."""
+    fields: Set[str] = set()
+    for tokens in body_tokens:
+        code = [
+            (kind, text) for kind, text in zip(tokens.kinds, tokens.texts)
+            if kind != COMMENT
+        ]
+        private: Set[str] = set()
+        called: Set[str] = set()
+        for i, (kind, text) in enumerate(code):
+            if kind != IDENTIFIER:
+                continue
+            if i >= 2 and code[i - 1][1] == '.' and code[i - 2][1] == 'this':
+                fields.add(text)
+            if text[0] == '_' and _RE_PRIVATE_FIELD.fullmatch(text):
+                if i + 1 < len(code) and code[i + 1][1] == '(':
+                    called.add(text)
+                else:
+                    private.add(text)
+        fields |= private - called
+    return fields
+
+
+def _count_components(field_masks: List[int], call_masks: List[int]) -> int:
+    """Connected components of methods linked by shared field bits or call bits."""
+    parent = list(range(len(field_masks)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    field_owner: Dict[int, int] = {}  # field bit -> first method using it
+    for k, (fields, calls) in enumerate(zip(field_masks, call_masks)):
+        while fields:
+            low = fields & -fields
+            fields ^= low
+            parent[find(k)] = find(field_owner.setdefault(low, k))
+        while calls:
+            low = calls & -calls
+            calls ^= low
+            parent[find(k)] = find(low.bit_length() - 1)
+
+    return sum(1 for k in range(len(parent)) if parent[k] == k)
 
 
 # ---------------------------------------------------------------------------
@@ -6,142 +6,153 @@ import re
 from typing import Dict, List, Set, Tuple
 
 from ..models import ParsedFile
+from ..parsers.dart_lexer import (
+    COMMENT,
+    IDENTIFIER,
+    KEYWORD,
+    NUMBER,
+    OPERATOR,
+    STRING,
+    WORD_KINDS,
+    TokenStream,
+    tokenize,
+)
 
 # ---------------------------------------------------------------------------
 # Regex patterns
 # ---------------------------------------------------------------------------
 
-_RE_STATIC = re.compile(r'\bstatic\b')
-
-# Number literals (excluding 0, 1, -1 and common constants)
-_RE_NUMBER = re.compile(r'(?<![\w.])(-?\d+\.?\d*(?:[eE][+-]?\d+)?)(?![\w.])')
-
-# String literals (single and double quoted, non-triple)
-_RE_STRING_SQ = re.compile(r"'(?:\\.|[^'\\])*'")
-_RE_STRING_DQ = re.compile(r'"(?:\\.|[^"\\])*"')
-_RE_TRIPLE_SQ = re.compile(r"'''.*?'''", re.DOTALL)
-_RE_TRIPLE_DQ = re.compile(r'""".*?"""', re.DOTALL)
-
-# Line/block comments
-_RE_LINE_COMMENT = re.compile(r'//.*')
-_RE_BLOCK_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
-
-# Private symbols (_name)
-_RE_PRIVATE_DEF = re.compile(r'\b(_[A-Za-z][A-Za-z0-9_]*)\b')
+# Private symbols (_name), and their simple ``$_name`` interpolation in strings
+_RE_PRIVATE_NAME = re.compile(r'_[A-Za-z][A-Za-z0-9_]*')
+_RE_PRIVATE_INTERPOLATION = re.compile(r'\$(_[A-Za-z][A-Za-z0-9_]*)')
 
 # Trivial numbers that are NOT magic
 _TRIVIAL_NUMBERS = frozenset({0, 0.0, 1, 1.0, -1, -1.0, 2, 2.0})
 
 
-def _strip_comments(source: str) -> str:
-    """Remove comments from source code."""
-    s = _RE_BLOCK_COMMENT.sub('', source)
-    s = _RE_LINE_COMMENT.sub('', s)
-    return s
-
-
-def _strip_comments_and_strings(source: str) -> str:
-    """Remove comments and string literals from source."""
-    s = _strip_comments(source)
-    # Triple-quoted first (greedy match)
-    s = _RE_TRIPLE_SQ.sub('""', s)
-    s = _RE_TRIPLE_DQ.sub('""', s)
-    s = _RE_STRING_SQ.sub('""', s)
-    s = _RE_STRING_DQ.sub('""', s)
-    return s
-
-
 # ---------------------------------------------------------------------------
 # Individual smell detectors
 # ---------------------------------------------------------------------------
 
-def count_static_members(source: str) -> int:
+def count_static_members(tokens: TokenStream) -> int:
     """Count static members in the source code."""
-    cleaned = _strip_comments_and_strings(source)
-    return len(_RE_STATIC.findall(cleaned))
+    return sum(
+        1 for kind, text in zip(tokens.kinds, tokens.texts)
+        if kind == KEYWORD and text == 'static'
+    )
 
 
-def count_string_literals(source: str) -> int:
+def count_string_literals(tokens: TokenStream) -> int:
     """Count non-trivial string literals (excluding empty strings).
 
-    Counts strings that are not empty or single-character.
-    Looks at code WITH comments stripped but WITH strings present.
+    Counts strings that are not empty or single-character; triple-quoted
+    strings count when they are not blank.  Interpolated strings
+    (``'...${x}...'``) always count.
     """
-    s = _strip_comments(source)
     count = 0
-    # Triple-quoted strings
-    for m in _RE_TRIPLE_SQ.finditer(s):
-        content = m.group()[3:-3]
-        if content.strip():
-            count += 1
-    for m in _RE_TRIPLE_DQ.finditer(s):
-        content = m.group()[3:-3]
-        if content.strip():
+    for kind, text in zip(tokens.kinds, tokens.texts):
+        if kind != STRING or text[0] == '}':
+            continue  # not a literal, or the rest of an interpolated one
+        if text.endswith('${'):
             count += 1
-    # Remove triple strings before counting singles
-    s = _RE_TRIPLE_SQ.sub('', s)
-    s = _RE_TRIPLE_DQ.sub('', s)
-    # Single/double quoted
-    for m in _RE_STRING_SQ.finditer(s):
-        content = m.group()[1:-1]
-        if len(content) > 1:  # skip empty and single-char
-            count += 1
-    for m in _RE_STRING_DQ.finditer(s):
-        content = m.group()[1:-1]
-        if len(content) > 1:
+            continue
+        literal = text[1:] if text[0] == 'r' else text
+        if literal[:3] in ("'''", '"""'):
+            if literal[3:-3].strip():
+                count += 1
+        elif len(literal[1:-1]) > 1:
             count += 1
     return count
 
 
-def count_magic_numbers(source: str) -> int:
+def count_magic_numbers(tokens: TokenStream) -> int:
     """Count magic number occurrences (non-trivial numeric literals).
 
-    Excludes 0, 1, -1, 2 and numbers inside annotations, const declarations.
+    Excludes 0, 1, -1, 2, numbers glued to identifiers or member access
+    and numbers in const declarations.
     """
-    cleaned = _strip_comments_and_strings(source)
+    source = tokens.source
     count = 0
-    for m in _RE_NUMBER.finditer(cleaned):
-        try:
-            val = float(m.group())
-        except ValueError:
-            continue
-        if val in _TRIVIAL_NUMBERS:
-            continue
-        # Check if it's in a const/enum context — simple heuristic
-        start = max(0, m.start() - 80)
-        prefix = cleaned[start:m.start()]
-        # Skip if preceded by const, @, =const, enum value
-        if 'const ' in prefix.split('\n')[-1]:
-            continue
-        count += 1
+    prev_kind = -1
+    prev_text = ''
+    prev_end = -1
+
+    for kind, text, start, end in zip(tokens.kinds, tokens.texts, tokens.starts, tokens.ends):
+        if kind == NUMBER:
+            literal = text
+            glued = prev_end == start and (prev_text[-1:] == '.' or prev_kind in WORD_KINDS)
+            if prev_end == start and prev_kind == OPERATOR and prev_text == '-':
+                literal = '-' + text
+            nxt = source[end:end + 1]
+            if not glued and not (nxt == '.' or nxt.isalnum() or nxt == '_'):
+                try:
+                    val = float(literal)
+                except ValueError:
+                    val = None
+                if val is not None and val not in _TRIVIAL_NUMBERS:
+                    # Skip numbers in a const declaration on the same line
+                    line_start = source.rfind('\n', 0, start) + 1
+                    prefix = source[max(line_start, start - 80):start]
+                    if 'const ' not in prefix:
+                        count += 1
+        if kind != COMMENT:
+            prev_kind = kind
+            prev_text = text
+            prev_end = end
+
     return count
 
 
-def find_private_symbols(source: str) -> Set[str]:
-    """Find all private symbol definitions in source code."""
-    cleaned = _strip_comments_and_strings(source)
-    return set(_RE_PRIVATE_DEF.findall(cleaned))
+def find_private_identifiers(tokens: TokenStream) -> Tuple[Set[str], Set[str]]:
+    """Private identifiers of a file, in one pass over its token stream.
+
+    Returns ``(symbols, references)``: *symbols* are the ``_name``
+    identifiers in code; *references* adds the names interpolated into
+    strings as ``$_name``.  Comments are ignored.
+    """
+    symbols: Set[str] = set()
+    references: Set[str] = set()
+    for kind, text in zip(tokens.kinds, tokens.texts):
+        if kind == IDENTIFIER:
+            if text[0] == '_' and _RE_PRIVATE_NAME.fullmatch(text):
+                symbols.add(text)
+        elif kind == STRING and '$_' in text and text[0] != 'r':
+            references.update(_RE_PRIVATE_INTERPOLATION.findall(text))
+    references |= symbols
+    return symbols, references
+
+
+def build_identifier_index(
+    file_references: Dict[str, Set[str]],
+) -> Dict[str, Set[str]]:
+    """Invert ``path -> private identifiers`` into ``identifier -> paths``."""
+    index: Dict[str, Set[str]] = {}
+    for path, references in file_references.items():
+        for name in references:
+            paths = index.get(name)
+            if paths is None:
+                index[name] = {path}
+            else:
+                paths.add(path)
+    return index
 
 
 def estimate_dead_code(
     file_path: str,
     file_private_symbols: Set[str],
-    all_sources: Dict[str, str],
+    identifier_index: Dict[str, Set[str]],
 ) -> Tuple[int, List[str]]:
     """Estimate dead code by finding private symbols used only in their defining file.
 
+    *identifier_index* maps each private identifier to the files that
+    reference it (see :func:`build_identifier_index`).
+
     Returns (count, list_of_potentially_dead_symbols).
     """
-    dead_symbols: List[str] = []
-    for symbol in file_private_symbols:
-        usage_count = 0
-        for path, source in all_sources.items():
-            if symbol in source:
-                usage_count += 1
-                if usage_count > 1:
-                    break
-        if usage_count <= 1:
-            dead_symbols.append(symbol)
+    dead_symbols = sorted(
+        symbol for symbol in file_private_symbols
+        if len(identifier_index.get(symbol, ())) <= 1
+    )
     return len(dead_symbols), dead_symbols
 
 
@@ -155,11 +166,13 @@ def compute_code_smells(parsed_file: ParsedFile) -> Dict[str, int]:
     Returns dict with keys:
         static_members, hardcoded_strings, magic_numbers
     """
-    source = parsed_file.source
+    tokens = parsed_file.tokens
+    if tokens is None:
+        tokens = tokenize(parsed_file.source)
     return {
-        "static_members": count_static_members(source),
-        "hardcoded_strings": count_string_literals(source),
-        "magic_numbers": count_magic_numbers(source),
+        "static_members": count_static_members(tokens),
+        "hardcoded_strings": count_string_literals(tokens),
+        "magic_numbers": count_magic_numbers(tokens),
     }
 
 
@@ -168,21 +181,31 @@ def compute_dead_code_for_module(
 ) -> Dict[str, Tuple[int, List[str]]]:
     """Compute dead code estimates across all files in a module.
 
+    Private identifiers come from each file's precomputed ``facts``, or
+    from its token stream when there are none.
+
     Returns dict: file_path -> (dead_count, dead_symbol_list)
     """
-    # Build source map
-    all_sources: Dict[str, str] = {pf.path: pf.source for pf in parsed_files}
-
-    # Find private symbols per file
+    # Find private symbols and references per file
     file_privates: Dict[str, Set[str]] = {}
+    file_references: Dict[str, Set[str]] = {}
     for pf in parsed_files:
-        file_privates[pf.path] = find_private_symbols(pf.source)
+        if pf.facts is not None:
+            symbols = pf.facts.private_symbols
+            references = pf.facts.private_references
+        else:
+            tokens = pf.tokens if pf.tokens is not None else tokenize(pf.source)
+            symbols, references = find_private_identifiers(tokens)
+        file_privates[pf.path] = symbols
+        file_references[pf.path] = references
+
+    identifier_index = build_identifier_index(file_references)
 
     # Estimate dead code per file
     results: Dict[str, Tuple[int, List[str]]] = {}
     for pf in parsed_files:
         count, symbols = estimate_dead_code(
-            pf.path, file_privates[pf.path], all_sources
+            pf.path, file_privates[pf.path], identifier_index
         )
         results[pf.path] = (count, symbols)
 
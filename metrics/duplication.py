@@ -1,17 +1,29 @@
 """Code duplication detection using token-based rolling hash.
 
 Tokenizes Dart source code, then uses a rolling hash (Rabin-Karp style)
-to find duplicated blocks of tokens across files. Reports duplicate
-pairs with their locations and token counts.
+to find duplicated blocks of tokens across files.  Matching windows are
+merged into clone classes: maximal token sequences shared by two or
+more locations, reported with their locations and token counts.  With
+several worker processes, hashing and matching are split into shards by
+window hash prefix.  For very large token counts a suffix array engine
+finds the same kind of classes in O(n) integer memory.
 """
 
 from __future__ import annotations
 
 import hashlib
+import os
 import re
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from ..models import ParsedFile
 
@@ -40,19 +52,21 @@ class DuplicateBlock:
 
 
 @dataclass
-class DuplicatePair:
-    """A pair of duplicate blocks."""
-    block_a: DuplicateBlock
-    block_b: DuplicateBlock
+class CloneClass:
+    """A token sequence shared by two or more locations.
+
+    Every location holds the same ``token_count`` normalized tokens;
+    ``line_count`` is the longest line span among them.
+    """
     token_count: int
     line_count: int
+    locations: List[DuplicateBlock] = field(default_factory=list)
 
     def to_dict(self) -> dict:
         return {
-            "block_a": self.block_a.to_dict(),
-            "block_b": self.block_b.to_dict(),
             "token_count": self.token_count,
             "line_count": self.line_count,
+            "locations": [b.to_dict() for b in self.locations],
         }
 
 
@@ -63,8 +77,12 @@ class DuplicationResult:
     total_tokens: int = 0
     duplicated_tokens: int = 0
     duplication_pct: float = 0.0
-    duplicate_pairs: List[DuplicatePair] = field(default_factory=list)
+    clone_classes: List[CloneClass] = field(default_factory=list)
     per_file: Dict[str, float] = field(default_factory=dict)  # path -> dup %
+    # Cross-module clone matrix: cell (i, j) = clone classes with
+    # locations in both modules, diagonal = classes within one module
+    modules: List[str] = field(default_factory=list)
+    clone_matrix: List[List[int]] = field(default_factory=list)
 
     def to_dict(self) -> dict:
         return {
@@ -72,9 +90,13 @@ class DuplicationResult:
             "total_tokens": self.total_tokens,
             "duplicated_tokens": self.duplicated_tokens,
             "duplication_pct": round(self.duplication_pct, 2),
-            "duplicate_pairs_count": len(self.duplicate_pairs),
-            "duplicate_pairs": [p.to_dict() for p in self.duplicate_pairs[:100]],
+            "clone_classes_count": len(self.clone_classes),
+            "clone_classes": [c.to_dict() for c in self.clone_classes],
             "files_with_duplicates": len(self.per_file),
+            "clone_matrix": {
+                "modules": self.modules,
+                "matrix": self.clone_matrix,
+            },
         }
 
 
@@ -85,61 +107,68 @@ class DuplicationResult:
 # Simple Dart tokenizer — splits on whitespace, punctuation, operators
 _TOKEN_RE = re.compile(
     r"""
-    (?:'[^']*')                    |  # single-quoted strings
-    (?:"[^"]*")                    |  # double-quoted strings
-    (?:///.*$)                     |  # doc comments
-    (?://.*$)                      |  # line comments
-    (?:/\*[\s\S]*?\*/)             |  # block comments
-    (?:\d+\.?\d*(?:e[+-]?\d+)?)   |  # numbers
-    (?:[a-zA-Z_$]\w*)              |  # identifiers
-    (?:[+\-*/~%^&|<>=!?.]+)       |  # operators
-    (?:[{}()\[\];,:@#])               # punctuation
+    (?P<str>'[^']*')               |  # single-quoted strings
+    (?P<dstr>"[^"]*")              |  # double-quoted strings
+    (?P<doc>///.*$)                |  # doc comments
+    (?P<line>//.*$)                |  # line comments
+    (?P<block>/\*[\s\S]*?\*/)       |  # block comments
+    (?P<num>\d+\.?\d*(?:e[+-]?\d+)?) |  # numbers
+    (?P<id>[a-zA-Z_$]\w*)          |  # identifiers
+    (?P<op>[+\-*/~%^&|<>=!?.]+)   |  # operators
+    (?P<punct>[{}()\[\];,:@#])        # punctuation
     """,
     re.VERBOSE | re.MULTILINE,
 )
 
 
-@dataclass
-class _Token:
-    """A simple token with its line number."""
-    value: str
-    line: int
+_COMMENT_GROUPS = frozenset({"doc", "line", "block"})
 
+_RE_NEWLINE = re.compile(r"\n")
 
-def _tokenize(source: str) -> List[_Token]:
+
+def tokenize_for_duplication(source: str) -> Tuple[List[str], array, array]:
     """Tokenize Dart source code.
 
     Strips comments and string literals (normalizes them to placeholders)
     to detect structural duplication regardless of naming.
+
+    Returns ``(vocabulary, ids, lines)``: the distinct normalized token
+    values of the file, each token as an index into that vocabulary, and
+    the line of each token (looked up in the file's newline offsets).
     """
-    tokens: List[_Token] = []
+    vocabulary: List[str] = []
+    vocabulary_ids: Dict[str, int] = {}
+    ids = array("H")
+    lines = array("I")
+    newlines = [m.start() for m in _RE_NEWLINE.finditer(source)]
     for match in _TOKEN_RE.finditer(source):
-        text = match.group(0)
-        # Compute line number
-        line = source[:match.start()].count("\n") + 1
+        kind = match.lastgroup
+        text = match.group()
 
         # Normalize: skip comments
-        if text.startswith("//") or text.startswith("/*"):
+        if kind in _COMMENT_GROUPS:
             continue
         # Normalize strings to placeholder
-        if (text.startswith("'") and text.endswith("'")) or \
-           (text.startswith('"') and text.endswith('"')):
-            tokens.append(_Token("$STR", line))
-            continue
+        if kind == "str" or kind == "dstr":
+            value = "$STR"
         # Normalize numbers to placeholder
-        if text[0].isdigit():
-            tokens.append(_Token("$NUM", line))
-            continue
+        elif kind == "num":
+            value = "$NUM"
         # Normalize identifiers to placeholder (keep keywords)
-        if text[0].isalpha() or text[0] == '_':
-            if text in _DART_KEYWORDS:
-                tokens.append(_Token(text, line))
-            else:
-                tokens.append(_Token("$ID", line))
-            continue
-        tokens.append(_Token(text, line))
+        elif kind == "id" and text[0] != "$":
+            value = text if text in _DART_KEYWORDS else "$ID"
+        elif kind == "op" and text.startswith("/*"):
+            continue  # unclosed block comment
+        else:
+            value = text
+        token_id = vocabulary_ids.get(value)
+        if token_id is None:
+            token_id = vocabulary_ids[value] = len(vocabulary)
+            vocabulary.append(value)
+        ids.append(token_id)
+        lines.append(bisect_left(newlines, match.start()) + 1)
 
-    return tokens
+    return vocabulary, ids, lines
 
 
 _DART_KEYWORDS = frozenset({
@@ -162,16 +191,718 @@ _DART_KEYWORDS = frozenset({
 # Duplication detection via rolling hash
 # ---------------------------------------------------------------------------
 
-def _token_hash(tokens: List[str], start: int, length: int) -> str:
-    """Compute a hash for a token subsequence."""
-    seq = " ".join(tokens[start:start + length])
-    return hashlib.md5(seq.encode(), usedforsecurity=False).hexdigest()
+# Polynomial rolling hash over token IDs, modulo 2**64.  Equal hashes are
+# confirmed on the token arrays, so collisions never produce a pair.
+_HASH_BASE = 1_000_003
+_HASH_MASK = (1 << 64) - 1
+
+
+def rolling_hashes(ids: array, window: int) -> List[int]:
+    """Hash of every *window*-token slice of *ids*, in O(1) per step."""
+    n = len(ids)
+    if n < window:
+        return []
+    h = 0
+    for k in range(window):
+        h = (h * _HASH_BASE + ids[k]) & _HASH_MASK
+    hashes = [h]
+    drop = pow(_HASH_BASE, window - 1, 1 << 64)
+    for i in range(window, n):
+        h = ((h - ids[i - window] * drop) * _HASH_BASE + ids[i]) & _HASH_MASK
+        hashes.append(h)
+    return hashes
+
+
+def stable_token_values(vocabulary: List[str]) -> List[int]:
+    """CRC-32 of each token value: token IDs that are the same in every process and run."""
+    return [zlib.crc32(v.encode("utf-8")) for v in vocabulary]
+
+
+def window_hashes(vocabulary: List[str], ids: array, window: int) -> array:
+    """Hashes of a file's *window*-token slices (``array('Q')``), comparable across runs."""
+    stable = stable_token_values(vocabulary)
+    return array("Q", rolling_hashes([stable[t] for t in ids], window))
+
+
+def token_digest(vocabulary: List[str], ids: array) -> str:
+    """Hash of a file's normalized token sequence."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update("\0".join(vocabulary).encode("utf-8"))
+    h.update(b"\0")
+    h.update(ids.tobytes() if isinstance(ids, array) else array("H", ids).tobytes())
+    return h.hexdigest()
+
+
+class _FileTokens:
+    """Normalized tokens of the files being compared, by file index.
+
+    Each file's tokens index its own vocabulary; :meth:`global_ids`
+    maps them onto project-wide token IDs (on first use), so windows
+    of different files can be compared byte for byte.
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.vocabularies: List[List[str]] = []
+        self.ids: List[array] = []
+        self.lines: List[array] = []
+        self.token_ids: Dict[str, int] = {}
+        self._global_ids: List[Optional[array]] = []
+
+    def add(self, path: str, vocabulary: List[str], ids: array, lines: array) -> None:
+        self.paths.append(path)
+        self.vocabularies.append(vocabulary)
+        self.ids.append(ids)
+        self.lines.append(lines)
+        self._global_ids.append(None)
+
+    def global_map(self, f: int) -> List[int]:
+        """Project-wide token ID of each vocabulary entry of file *f*."""
+        token_ids = self.token_ids
+        return [token_ids.setdefault(v, len(token_ids)) for v in self.vocabularies[f]]
+
+    def global_ids(self, f: int) -> array:
+        ids = self._global_ids[f]
+        if ids is None:
+            to_global = self.global_map(f)
+            ids = self._global_ids[f] = array("I", [to_global[t] for t in self.ids[f]])
+        return ids
+
+    def set_global_ids(self, f: int, ids: array) -> None:
+        self._global_ids[f] = ids
+
+
+def _split_by_tokens(
+    occurrences: List[Tuple[int, int]],
+    file_ids: Callable[[int], array],
+    window: int,
+) -> List[List[Tuple[int, int]]]:
+    """Split occurrences sharing a hash into groups of identical windows.
+
+    Groups are in order of first occurrence; those of a single window are
+    dropped, so a hash collision never yields a false duplicate.
+    """
+    groups: Dict[bytes, List[Tuple[int, int]]] = {}
+    for occ in occurrences:
+        key = file_ids(occ[0])[occ[1]:occ[1] + window].tobytes()
+        groups.setdefault(key, []).append(occ)
+    return [group for group in groups.values() if len(group) >= 2]
+
+
+def _common_group(group_of: List[array], members: List[Tuple[int, int]], shift: int) -> int:
+    """Group shared by every member's window moved by *shift* tokens, or -1."""
+    gid = -1
+    for f, pos in members:
+        p = pos + shift
+        windows = group_of[f]
+        if p < 0 or p >= len(windows):
+            return -1
+        g = windows[p]
+        if g < 0 or (gid >= 0 and g != gid):
+            return -1
+        gid = g
+    return gid
+
+
+def _clone_extents(
+    groups: List[List[Tuple[int, int]]],
+    group_of: List[array],
+    window: int,
+    start_groups: Optional[Iterable[int]] = None,
+):
+    """Yield ``(members, length)`` of every maximal clone class.
+
+    A class starts from each group that does not continue the previous
+    window's group with exactly the same members, and is extended left
+    and right while all of its members keep matching (other locations
+    may join a window; they form classes of their own).  Classes reached
+    from several starts are yielded once.  *start_groups* limits the
+    search to classes starting from the given groups.
+    """
+    seen: Set[Tuple[Tuple[Tuple[int, int], ...], int]] = set()
+    for gid in range(len(groups)) if start_groups is None else start_groups:
+        members = groups[gid]
+        left = _common_group(group_of, members, -1)
+        if left >= 0 and len(groups[left]) == len(members):
+            continue  # same members one token earlier: not a start
+        lo = -1
+        while _common_group(group_of, members, lo) >= 0:
+            lo -= 1
+        hi = 1
+        while _common_group(group_of, members, hi) >= 0:
+            hi += 1
+        starts = tuple(sorted((f, pos + lo + 1) for f, pos in members))
+        length = window + hi - lo - 2
+        if (starts, length) in seen:
+            continue
+        seen.add((starts, length))
+        yield starts, length
+
+
+def _hash_extents(
+    tokens: _FileTokens,
+    window: int,
+    clone_index=None,
+    jobs: int = 1,
+    spill: bool = False,
+) -> list:
+    """Clone class extents found through a rolling-hash window index.
+
+    With a ``cache.CloneIndex`` from the previous run, the window hashes
+    of files whose tokens did not change are reused, and when at most
+    half of the files changed only the classes involving changed files
+    are searched again (:func:`_update_extents`).  The index is then
+    brought up to date with this run.  Otherwise all files are matched,
+    sharded over *jobs* worker processes (or spilled to disk) when
+    asked to (:func:`_sharded_extents`).
+    """
+    paths = tokens.paths
+    known = clone_index.files if clone_index is not None else {}
+    digests: List[str] = []
+    file_hashes: List[Optional[array]] = []
+    changed: List[int] = []
+    for f, path in enumerate(paths):
+        digest = token_digest(tokens.vocabularies[f], tokens.ids[f])
+        entry = known.get(path)
+        if entry is not None and entry[0] == digest:
+            file_hashes.append(entry[1])
+        else:
+            file_hashes.append(None)
+            changed.append(f)
+        digests.append(digest)
+
+    incremental = bool(known) and len(changed) <= len(paths) // 2
+    sharded = not incremental and (jobs > 1 or spill)
+    if not sharded:
+        for f in changed:
+            file_hashes[f] = window_hashes(tokens.vocabularies[f], tokens.ids[f], window)
+
+    if incremental:
+        extents = _update_extents(tokens, file_hashes, changed, window, clone_index)
+    elif sharded:
+        extents, repeated = _sharded_extents(tokens, file_hashes, window, jobs, spill)
+    else:
+        extents, hash_index = _indexed_extents(tokens, file_hashes, window)
+        repeated = {h: occ for h, occ in hash_index.items() if len(occ) >= 2}
+        hash_index.clear()
+
+    if clone_index is not None:
+        clone_index.hits = len(paths) - len(changed)
+        clone_index.misses = len(changed)
+        clone_index.removed = len(known) - clone_index.hits
+        if not incremental:
+            clone_index.repeated = {
+                h: [(paths[f], i) for f, i in occurrences]
+                for h, occurrences in repeated.items()
+            }
+        clone_index.files = {path: (digests[f], file_hashes[f]) for f, path in enumerate(paths)}
+        clone_index.extents = [
+            (tuple((paths[f], pos) for f, pos in starts), length)
+            for starts, length in extents
+        ]
+    return extents
+
+
+def _indexed_extents(
+    tokens: _FileTokens,
+    file_hashes: List[array],
+    window: int,
+) -> Tuple[list, Dict[int, List[Tuple[int, int]]]]:
+    """Clone class extents of all files, and the window index they came from."""
+    # Build hash index: hash -> [(file index, token_start_idx)]
+    hash_index: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for f, hashes in enumerate(file_hashes):
+        for i, h in enumerate(hashes):
+            hash_index[h].append((f, i))
+
+    # Number the groups of identical windows; group_of[f][i] is the
+    # group of the window at token i of file f, or -1
+    groups: List[List[Tuple[int, int]]] = []
+    group_of = [array("i", [-1]) * len(hashes) for hashes in file_hashes]
+    for occurrences in hash_index.values():
+        if len(occurrences) < 2:
+            continue
+        for group in _split_by_tokens(occurrences, tokens.global_ids, window):
+            gid = len(groups)
+            groups.append(group)
+            for f, i in group:
+                group_of[f][i] = gid
+
+    return list(_clone_extents(groups, group_of, window)), hash_index
+
+
+_NO_GROUPS = array("i")
+
+
+def _update_extents(
+    tokens: _FileTokens,
+    file_hashes: List[array],
+    changed: List[int],
+    window: int,
+    clone_index,
+) -> list:
+    """Clone class extents, updated from the previous run's for the *changed* files.
+
+    Only the occurrence lists of windows that a changed or removed file
+    had or has are edited.  Files sharing such a window with them are
+    affected too; classes with no affected member are kept as they are,
+    and the others are searched again from the groups holding a window
+    of an affected file.
+    """
+    paths = tokens.paths
+    position = {path: f for f, path in enumerate(paths)}
+    changed_paths = {paths[f] for f in changed}
+    stale = changed_paths | (clone_index.files.keys() - position.keys())
+
+    # Windows whose occurrences may differ from the previous run
+    touched: Set[int] = set()
+    for path in stale:
+        entry = clone_index.files.get(path)
+        if entry is not None:
+            touched.update(entry[1])
+    new_hashes: Set[int] = set()
+    for f in changed:
+        new_hashes.update(file_hashes[f])
+    touched |= new_hashes
+
+    repeated = clone_index.repeated
+    for h in touched:
+        occurrences = repeated.get(h)
+        if occurrences is not None:
+            repeated[h] = [occ for occ in occurrences if occ[0] not in stale]
+    # A window seen only once before may have its twin in an unchanged file
+    missing = {h for h in new_hashes if h not in repeated}
+    if missing:
+        for f, path in enumerate(paths):
+            hashes = file_hashes[f]
+            if path in changed_paths or missing.isdisjoint(hashes):
+                continue
+            for i, h in enumerate(hashes):
+                if h in missing:
+                    repeated.setdefault(h, []).append((path, i))
+    for f in changed:
+        path = paths[f]
+        for i, h in enumerate(file_hashes[f]):
+            repeated.setdefault(h, []).append((path, i))
+
+    affected = set(stale)
+    for h in touched:
+        occurrences = repeated.get(h)
+        if occurrences is None:
+            continue
+        affected.update(path for path, _ in occurrences)
+        if len(occurrences) < 2:
+            del repeated[h]
+
+    extents = [
+        (tuple(sorted((position[path], pos) for path, pos in starts)), length)
+        for starts, length in clone_index.extents
+        if not any(path in affected for path, _ in starts)
+    ]
+
+    # Groups of the windows of affected files (with all their members)
+    groups: List[List[Tuple[int, int]]] = []
+    group_of = [_NO_GROUPS] * len(paths)
+    start_groups: List[int] = []
+    resolved: Set[int] = set()
+    for path in sorted(affected & position.keys()):
+        for h in file_hashes[position[path]]:
+            if h in resolved:
+                continue
+            resolved.add(h)
+            occurrences = repeated.get(h)
+            if occurrences is None:
+                continue
+            members = [(position[p], i) for p, i in occurrences]
+            for group in _split_by_tokens(members, tokens.global_ids, window):
+                gid = len(groups)
+                groups.append(group)
+                for f, i in group:
+                    windows = group_of[f]
+                    if windows is _NO_GROUPS:
+                        windows = group_of[f] = array("i", [-1]) * len(file_hashes[f])
+                    windows[i] = gid
+                if any(paths[f] in affected for f, _ in group):
+                    start_groups.append(gid)
+
+    extents.extend(_clone_extents(groups, group_of, window, start_groups))
+    return extents
+
+
+# ---------------------------------------------------------------------------
+# Sharded, parallel matching
+# ---------------------------------------------------------------------------
+
+# Most windows one shard may hold: the shard count grows with the token
+# count, so a shard's hash index stays bounded in memory
+SHARD_WINDOWS = 1 << 21
+
+# State of the current worker process (set by the pool initializers, or
+# in this process when running serially)
+_worker: dict = {}
+
+
+def _map_in_pool(fn, tasks: list, jobs: int, initializer, initargs: tuple):
+    """Yield ``fn(task)`` for each task, in order, from a pool of *jobs* processes.
+
+    Runs in-process when ``jobs == 1``, and continues in-process if the
+    pool cannot be started or breaks.
+    """
+    done = 0
+    if jobs > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=jobs, initializer=initializer, initargs=initargs,
+            ) as pool:
+                for outcome in pool.map(fn, tasks):
+                    yield outcome
+                    done += 1
+            return
+        except (OSError, BrokenProcessPool) as e:
+            print(f"  [!] Process pool unavailable ({e}), matching serially",
+                  file=sys.stderr)
+    initializer(*initargs)
+    for task in tasks[done:]:
+        yield fn(task)
+
+
+def _init_hash_worker(window: int, shift: int, shards: int) -> None:
+    _worker.clear()
+    _worker.update(window=window, shift=shift, shards=shards)
+
+
+def _hash_files(task: list):
+    """Hash a chunk of files and split its windows by shard.
+
+    *task* holds ``(file index, vocabulary, ids, global map, hashes or
+    None)`` per file.  Returns the computed ``(file index, hashes)``,
+    every file's project-wide token IDs, and per shard the ``(hashes,
+    file indexes, offsets)`` arrays of the chunk's windows in it.
+    """
+    window, shift = _worker["window"], _worker["shift"]
+    parts = [(array("Q"), array("I"), array("I")) for _ in range(_worker["shards"])]
+    computed: List[Tuple[int, array]] = []
+    global_ids: List[Tuple[int, array]] = []
+    for f, vocabulary, ids, to_global, hashes in task:
+        if hashes is None:
+            hashes = window_hashes(vocabulary, ids, window)
+            computed.append((f, hashes))
+        global_ids.append((f, array("I", [to_global[t] for t in ids])))
+        for i, h in enumerate(hashes):
+            part = parts[h >> shift]
+            part[0].append(h)
+            part[1].append(f)
+            part[2].append(i)
+    return computed, global_ids, parts
+
+
+def _init_match_worker() -> None:
+    _worker.clear()
+
+
+def _match_shard(shard):
+    """Occurrences of every window hash seen at least twice in one shard.
+
+    *shard* is its ``(hashes, file indexes, offsets)`` arrays, or the
+    path prefix of the files they were spilled to.  Only the shard is
+    held: the candidates are verified against the tokens by the caller.
+    """
+    if isinstance(shard, str):
+        shard = tuple(_read_spilled(f"{shard}.{part}", code) for part, code in _SPILL_PARTS)
+    index: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for h, f, i in zip(*shard):
+        index[h].append((f, i))
+    return [(h, occurrences) for h, occurrences in index.items() if len(occurrences) >= 2]
+
+
+# Spill file suffix and array type of each part of a shard
+_SPILL_PARTS = (("hash", "Q"), ("file", "I"), ("pos", "I"))
+
+
+def _read_spilled(path: str, typecode: str) -> array:
+    values = array(typecode)
+    with open(path, "rb") as fh:
+        values.frombytes(fh.read())
+    return values
+
+
+def _init_extent_worker(groups: List[List[Tuple[int, int]]], group_of: List[array], window: int) -> None:
+    _worker.clear()
+    _worker.update(groups=groups, group_of=group_of, window=window)
+
+
+def _extend_groups(start_groups: List[int]) -> list:
+    return list(_clone_extents(_worker["groups"], _worker["group_of"], _worker["window"], start_groups))
+
+
+def _sharded_extents(
+    tokens: _FileTokens,
+    file_hashes: List[Optional[array]],
+    window: int,
+    jobs: int,
+    spill: bool,
+) -> Tuple[list, Dict[int, List[Tuple[int, int]]]]:
+    """Clone class extents of all files, matched shard by shard in *jobs* processes.
+
+    Files are hashed in parallel (entries of *file_hashes* that are None
+    are filled in) and their windows split into shards by hash prefix.
+    Each shard is indexed on its own, optionally from disk (*spill*), by
+    a worker holding only that shard's windows; the hashes it finds
+    repeated are verified against the tokens here, which this process
+    holds anyway, and numbered in shard order.  The classes are then
+    extended in parallel from the groups and a window-to-group map that
+    covers only files with repeated windows.  Results do not depend on
+    *jobs*.
+
+    Returns the extents and the occurrences of every repeated window.
+    """
+    n_files = len(tokens.paths)
+    n_windows = sum(max(len(ids) - window + 1, 0) for ids in tokens.ids)
+    shards = 1
+    while shards < jobs or shards * SHARD_WINDOWS < n_windows:
+        shards *= 2
+    shift = 64 - shards.bit_length() + 1
+
+    # 1. Hash the files in chunks, collecting (or spilling) the shards
+    chunks = max(1, min(n_files, jobs * 4))
+    tasks = [
+        [
+            (f, tokens.vocabularies[f], tokens.ids[f], tokens.global_map(f), file_hashes[f])
+            for f in range(c * n_files // chunks, (c + 1) * n_files // chunks)
+        ]
+        for c in range(chunks)
+    ]
+    spill_dir = tempfile.TemporaryDirectory(prefix="cmc-dup-") if spill else None
+    try:
+        shard_parts = [(array("Q"), array("I"), array("I")) for _ in range(shards)]
+        for computed, global_ids, parts in _map_in_pool(
+            _hash_files, tasks, jobs, _init_hash_worker, (window, shift, shards),
+        ):
+            for f, hashes in computed:
+                file_hashes[f] = hashes
+            for f, ids in global_ids:
+                tokens.set_global_ids(f, ids)
+            for s, part in enumerate(parts):
+                if not part[0]:
+                    continue
+                if spill_dir is None:
+                    for values, chunk_values in zip(shard_parts[s], part):
+                        values.extend(chunk_values)
+                    continue
+                for (suffix, _), chunk_values in zip(_SPILL_PARTS, part):
+                    with open(os.path.join(spill_dir.name, f"{s}.{suffix}"), "ab") as fh:
+                        chunk_values.tofile(fh)
+        del tasks
+
+        # 2. Match each shard; number the groups in shard order
+        if spill_dir is None:
+            shard_tasks = shard_parts
+        else:
+            shard_tasks = [os.path.join(spill_dir.name, str(s)) for s in range(shards)]
+            for s in range(shards):
+                for suffix, _ in _SPILL_PARTS:
+                    open(f"{shard_tasks[s]}.{suffix}", "ab").close()
+        repeated: Dict[int, List[Tuple[int, int]]] = {}
+        groups: List[List[Tuple[int, int]]] = []
+        group_of = [_NO_GROUPS] * n_files
+        for matches in _map_in_pool(
+            _match_shard, shard_tasks, jobs, _init_match_worker, (),
+        ):
+            for h, occurrences in matches:
+                repeated[h] = occurrences
+                for group in _split_by_tokens(occurrences, tokens.global_ids, window):
+                    gid = len(groups)
+                    groups.append(group)
+                    for f, i in group:
+                        windows = group_of[f]
+                        if windows is _NO_GROUPS:
+                            windows = group_of[f] = array("i", [-1]) * len(file_hashes[f])
+                        windows[i] = gid
+        del shard_tasks, shard_parts
+    finally:
+        if spill_dir is not None:
+            spill_dir.cleanup()
+
+    # 3. Extend the classes from interleaved slices of the groups
+    slices = max(1, min(len(groups), jobs * 4))
+    extents: Dict[Tuple[Tuple[Tuple[int, int], ...], int], None] = {}
+    for found in _map_in_pool(
+        _extend_groups,
+        [range(s, len(groups), slices) for s in range(slices)],
+        jobs, _init_extent_worker, (groups, group_of, window),
+    ):
+        extents.update(dict.fromkeys(found))
+    return list(extents), repeated
+
+
+# ---------------------------------------------------------------------------
+# Duplication detection via suffix array
+# ---------------------------------------------------------------------------
+
+def _suffix_array(text: array) -> Tuple[array, array]:
+    """Suffix array of *text* by prefix doubling, and its inverse.
+
+    Suffixes are bucketed by their first token (a counting sort), then
+    each round sorts every bucket of suffixes that still share a rank by
+    the rank *k* tokens further on and doubles *k*.  A suffix's rank is
+    the start of its bucket, so buckets can be refined one at a time and
+    singletons drop out of later rounds.  *text* must end in a token
+    that occurs nowhere else.
+
+    Returns ``(sa, rank)`` with ``rank[sa[r]] == r``.
+    """
+    n = len(text)
+    counts = array("i", [0]) * (max(text) + 2)
+    for t in text:
+        counts[t + 1] += 1
+    for t in range(1, len(counts)):
+        counts[t] += counts[t - 1]
+    buckets: List[Tuple[int, int]] = [
+        (counts[t], counts[t + 1])
+        for t in range(len(counts) - 1)
+        if counts[t + 1] - counts[t] > 1
+    ]
+    rank = array("i", [0]) * n
+    sa = array("i", [0]) * n
+    fill = array("i", counts)
+    for i, t in enumerate(text):
+        rank[i] = counts[t]
+        sa[fill[t]] = i
+        fill[t] += 1
+    del counts, fill
+
+    k = 1
+    while buckets:
+        next_buckets: List[Tuple[int, int]] = []
+        for lo, hi in buckets:
+            # Sort key and suffix packed into one int: (rank[i + k] + 1) * n + i
+            entries = sorted(
+                (rank[i + k] + 1) * n + i if i + k < n else i for i in sa[lo:hi]
+            )
+            start = 0
+            start_key = entries[0] // n
+            for j, entry in enumerate(entries):
+                key, i = divmod(entry, n)
+                if key != start_key:
+                    if j - start > 1:
+                        next_buckets.append((lo + start, lo + j))
+                    start = j
+                    start_key = key
+                sa[lo + j] = i
+                rank[i] = lo + start
+            if len(entries) - start > 1:
+                next_buckets.append((lo + start, hi))
+        buckets = next_buckets
+        k *= 2
+    return sa, rank
+
+
+def _lcp_array(text: array, sa: array, rank: array) -> array:
+    """Kasai's LCP array: ``lcp[r]`` = common prefix of suffixes ``sa[r-1]`` and ``sa[r]``."""
+    n = len(text)
+    lcp = array("i", [0]) * n
+    h = 0
+    for i in range(n):
+        r = rank[i]
+        if r == 0:
+            h = 0
+            continue
+        j = sa[r - 1]
+        while text[i + h] == text[j + h]:
+            h += 1
+        lcp[r] = h
+        if h:
+            h -= 1
+    return lcp
+
+
+# Left-token summary of an LCP interval: no suffix yet, or suffixes
+# preceded by different tokens (any token >= 0 means "all preceded by it")
+_LEFT_NONE = -2
+_LEFT_DIVERSE = -1
+
+
+def _merge_left(a: int, b: int) -> int:
+    if a == _LEFT_NONE or a == b:
+        return b
+    if b == _LEFT_NONE:
+        return a
+    return _LEFT_DIVERSE
+
+
+def _suffix_array_extents(file_ids: List[array], window: int):
+    """Clone class extents found through a suffix array over all tokens.
+
+    Files are concatenated with a distinct separator after each, so no
+    match crosses a file boundary.  Every LCP interval of at least
+    *window* tokens is a token sequence repeated at the interval's
+    suffixes; it is a clone class when it is also maximal to the left,
+    i.e. its occurrences are not all preceded by the same token.
+    """
+    first_separator = max(max(ids) for ids in file_ids) + 1
+    text = array("I")
+    file_starts: List[int] = []
+    for f, ids in enumerate(file_ids):
+        file_starts.append(len(text))
+        text.extend(ids)
+        text.append(first_separator + f)
+    sa, rank = _suffix_array(text)
+    lcp = _lcp_array(text, sa, rank)
+    del rank
+    n = len(text)
+
+    def left_of(r: int) -> int:
+        p = sa[r]
+        if p == 0 or text[p - 1] >= first_separator:
+            return _LEFT_DIVERSE
+        return text[p - 1]
+
+    def extent(lo: int, hi: int, length: int):
+        starts = []
+        for r in range(lo, hi + 1):
+            p = sa[r]
+            f = bisect_right(file_starts, p) - 1
+            starts.append((f, p - file_starts[f]))
+        starts.sort()
+        return tuple(starts), length
+
+    # Bottom-up walk over the LCP intervals: stack of [lcp, lb, left]
+    stack = [[0, 0, _LEFT_NONE]]
+    for i in range(1, n + 1):
+        depth = lcp[i] if i < n else 0
+        leaf = left_of(i - 1)
+        if depth > stack[-1][0]:
+            stack.append([depth, i - 1, leaf])
+            continue
+        stack[-1][2] = _merge_left(stack[-1][2], leaf)
+        while depth < stack[-1][0]:
+            length, lb, left = stack.pop()
+            if length >= window and left == _LEFT_DIVERSE:
+                yield extent(lb, i - 1, length)
+            if depth <= stack[-1][0]:
+                stack[-1][2] = _merge_left(stack[-1][2], left)
+            else:
+                stack.append([depth, lb, left])
+                break
+
+
+# ---------------------------------------------------------------------------
+# Clone classes
+# ---------------------------------------------------------------------------
+
+# Names accepted for the ``engine`` argument of :func:`detect_duplicates`
+ENGINES = ("hash", "suffix-array")
 
 
 def detect_duplicates(
     parsed_files: List[ParsedFile],
     min_tokens: int = MIN_TOKENS,
     min_lines: int = MIN_LINES,
+    module_of: Optional[Dict[str, str]] = None,
+    engine: str = "hash",
+    clone_index=None,
+    jobs: int = 1,
+    spill: bool = False,
 ) -> DuplicationResult:
     """Detect code duplicates across files using token-based comparison.
 
@@ -179,116 +910,119 @@ def detect_duplicates(
         parsed_files: List of parsed Dart files.
         min_tokens: Minimum tokens for a duplicate block.
         min_lines: Minimum lines for a duplicate block.
+        module_of: Optional ``path -> module name`` map; when given, the
+            result carries the cross-module clone matrix.
+        engine: ``"hash"`` (rolling-hash window index) or
+            ``"suffix-array"`` (suffix and LCP arrays; O(n) integer
+            memory, for very large token counts).
+        clone_index: Optional ``cache.CloneIndex`` of the previous run
+            (hash engine only); files whose tokens are unchanged are not
+            hashed or matched again, and the index is updated in place.
+        jobs: Worker processes for hashing and matching all files with
+            the hash engine (windows are split into shards by hash prefix).
+        spill: Keep the shards on disk instead of in memory between
+            hashing and matching (hash engine).
 
     Returns:
-        DuplicationResult with pairs and statistics.
+        DuplicationResult with clone classes and statistics.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown duplication engine: {engine!r}")
     result = DuplicationResult(total_files=len(parsed_files))
 
-    # Tokenize all files
-    file_tokens: List[Tuple[str, List[_Token]]] = []
+    # Tokenize all files (or reuse the tokens from the per-file phase)
+    tokens = _FileTokens()
     for pf in parsed_files:
-        tokens = _tokenize(pf.source)
-        if tokens:
-            file_tokens.append((pf.path, tokens))
-            result.total_tokens += len(tokens)
-
-    if not file_tokens:
-        return result
-
-    # Build hash index: hash -> [(file_path, token_start_idx, line_start, line_end)]
-    hash_index: Dict[str, List[Tuple[str, int, int, int]]] = defaultdict(list)
-
-    for path, tokens in file_tokens:
-        token_values = [t.value for t in tokens]
-        n = len(token_values)
-        if n < min_tokens:
-            continue
-
-        # Slide window of min_tokens size
-        for i in range(n - min_tokens + 1):
-            h = _token_hash(token_values, i, min_tokens)
-            line_start = tokens[i].line
-            line_end = tokens[min(i + min_tokens - 1, n - 1)].line
-            # Only add if the block spans enough lines
-            if line_end - line_start + 1 >= min_lines:
-                hash_index[h].append((path, i, line_start, line_end))
+        if pf.facts is not None:
+            vocabulary, ids, lines = pf.facts.dup_vocabulary, pf.facts.dup_ids, pf.facts.dup_lines
+        else:
+            vocabulary, ids, lines = tokenize_for_duplication(pf.source)
+        if ids:
+            tokens.add(pf.path, vocabulary, ids, lines)
+            result.total_tokens += len(ids)
+    paths, file_lines = tokens.paths, tokens.lines
 
-    # Find duplicate pairs
-    seen_pairs: Set[Tuple[str, int, str, int]] = set()
-    duplicated_file_tokens: Dict[str, Set[int]] = defaultdict(set)
+    if not paths:
+        extents = []
+    elif engine == "suffix-array":
+        extents = _suffix_array_extents([tokens.global_ids(f) for f in range(len(paths))], min_tokens)
+    else:
+        extents = _hash_extents(tokens, min_tokens, clone_index, jobs, spill)
+    # Same order whichever way the extents were found
+    extents = sorted(extents)
 
-    for h, occurrences in hash_index.items():
-        if len(occurrences) < 2:
+    # Turn the extents into clone classes, keeping the locations that
+    # neither overlap an earlier one in the same file nor span too few lines
+    duplicated = [bytearray(len(ids)) for ids in tokens.ids]
+    for starts, length in extents:
+        locations: List[DuplicateBlock] = []
+        kept: List[Tuple[int, int]] = []
+        for f, pos in starts:
+            if kept and kept[-1][0] == f and pos < kept[-1][1] + length:
+                continue
+            line_start = file_lines[f][pos]
+            line_end = file_lines[f][pos + length - 1]
+            if line_end - line_start + 1 < min_lines:
+                continue
+            kept.append((f, pos))
+            locations.append(DuplicateBlock(
+                path=paths[f],
+                line_start=line_start,
+                line_end=line_end,
+                token_count=length,
+            ))
+        if len(locations) < 2:
             continue
 
-        # Group by file to avoid self-overlapping matches as much as possible
-        for i in range(len(occurrences)):
-            for j in range(i + 1, len(occurrences)):
-                path_a, idx_a, line_a_start, line_a_end = occurrences[i]
-                path_b, idx_b, line_b_start, line_b_end = occurrences[j]
-
-                # Skip if same file and overlapping
-                if path_a == path_b and abs(idx_a - idx_b) < min_tokens:
-                    continue
+        result.clone_classes.append(CloneClass(
+            token_count=length,
+            line_count=max(b.line_end - b.line_start + 1 for b in locations),
+            locations=locations,
+        ))
+        # Track duplicated tokens per file
+        for f, pos in kept:
+            duplicated[f][pos:pos + length] = b"\x01" * length
 
-                # Deduplicate
-                pair_key = (path_a, idx_a, path_b, idx_b)
-                reverse_key = (path_b, idx_b, path_a, idx_a)
-                if pair_key in seen_pairs or reverse_key in seen_pairs:
-                    continue
-                seen_pairs.add(pair_key)
-
-                line_count = max(
-                    line_a_end - line_a_start + 1,
-                    line_b_end - line_b_start + 1,
-                )
-
-                result.duplicate_pairs.append(DuplicatePair(
-                    block_a=DuplicateBlock(
-                        path=path_a,
-                        line_start=line_a_start,
-                        line_end=line_a_end,
-                        token_count=min_tokens,
-                    ),
-                    block_b=DuplicateBlock(
-                        path=path_b,
-                        line_start=line_b_start,
-                        line_end=line_b_end,
-                        token_count=min_tokens,
-                    ),
-                    token_count=min_tokens,
-                    line_count=line_count,
-                ))
-
-                # Track duplicated tokens per file
-                for k in range(min_tokens):
-                    duplicated_file_tokens[path_a].add(idx_a + k)
-                    duplicated_file_tokens[path_b].add(idx_b + k)
-
-                # Limit pairs to prevent memory explosion
-                if len(result.duplicate_pairs) >= 500:
-                    break
-            if len(result.duplicate_pairs) >= 500:
-                break
-        if len(result.duplicate_pairs) >= 500:
-            break
-
-    # Sort pairs by token count (desc) then by path
-    result.duplicate_pairs.sort(
-        key=lambda p: (-p.token_count, p.block_a.path, p.block_a.line_start)
+    # Sort classes by token count (desc) then by path
+    result.clone_classes.sort(
+        key=lambda c: (-c.token_count, c.locations[0].path, c.locations[0].line_start)
     )
 
     # Compute per-file duplication percentage
-    file_token_counts = {path: len(tokens) for path, tokens in file_tokens}
-    for path, dup_indices in duplicated_file_tokens.items():
-        total = file_token_counts.get(path, 1)
-        result.per_file[path] = round(len(dup_indices) / total * 100, 2)
+    total_dup = 0
+    for f, marks in enumerate(duplicated):
+        count = marks.count(1)
+        if count:
+            result.per_file[paths[f]] = round(count / len(marks) * 100, 2)
+            total_dup += count
 
     # Overall duplication
-    total_dup = sum(len(indices) for indices in duplicated_file_tokens.values())
     result.duplicated_tokens = total_dup
     if result.total_tokens > 0:
         result.duplication_pct = total_dup / result.total_tokens * 100
 
+    if module_of is not None:
+        _build_clone_matrix(result, module_of)
+
     return result
+
+
+def _build_clone_matrix(result: DuplicationResult, module_of: Dict[str, str]) -> None:
+    """Fill ``modules`` and ``clone_matrix`` of *result*."""
+    modules = sorted(set(module_of.values()))
+    index = {name: i for i, name in enumerate(modules)}
+    matrix = [[0] * len(modules) for _ in modules]
+    for clone in result.clone_classes:
+        counts: Dict[int, int] = defaultdict(int)
+        for block in clone.locations:
+            m = index.get(module_of.get(block.path))
+            if m is not None:
+                counts[m] += 1
+        for a, count_a in counts.items():
+            if count_a >= 2:
+                matrix[a][a] += 1
+            for b in counts:
+                if a != b:
+                    matrix[a][b] += 1
+    result.modules = modules
+    result.clone_matrix = matrix
@@ -9,10 +9,9 @@ Range: 0.0 (all gates failed) to 1.0 (all gates passed).
 
 from __future__ import annotations
 
-from typing import List
-
 from ..config import FPYConfig
 from ..models import ClassMetrics, FileMetrics, FunctionMetrics
+from .table import MetricsTable
 
 
 def compute_function_fpy(
@@ -59,8 +58,7 @@ def compute_class_fpy(
 
 def compute_file_fpy(
     file_metric: FileMetrics,
-    function_metrics: List[FunctionMetrics],
-    class_metrics: List[ClassMetrics],
+    table: MetricsTable,
     config: FPYConfig,
 ) -> float:
     """Compute FPY for a file.
@@ -68,17 +66,18 @@ def compute_file_fpy(
     Combines function, class, and file-level quality gates:
         FPY_file = alpha * FPY_functions + beta * FPY_classes + gamma * FPY_smells
 
-    Where alpha, beta, gamma are configurable weights.
+    Where alpha, beta, gamma are configurable weights.  The file's
+    function and class records are looked up in *table*.
     """
     # Function FPY (average across all functions in this file)
-    file_functions = [fm for fm in function_metrics if fm.path == file_metric.path]
+    file_functions = table.functions_in_file(file_metric.path)
     if file_functions:
         fn_fpy = sum(fm.fpy for fm in file_functions) / len(file_functions)
     else:
         fn_fpy = 1.0
 
     # Class FPY (average across all classes in this file)
-    file_classes = [cm for cm in class_metrics if cm.path == file_metric.path]
+    file_classes = table.classes_in_file(file_metric.path)
     if file_classes:
         cls_fpy = sum(cm.fpy for cm in file_classes) / len(file_classes)
     else:
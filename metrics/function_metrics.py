@@ -3,12 +3,22 @@
 from __future__ import annotations
 
 import math
-import re
 from typing import List
 
 from ..config import Thresholds
 from ..models import FunctionMetrics, HalsteadData, ParsedFile, ParsedFunction
-from ..parsers.dart_parser import strip_comments, strip_strings_and_comments
+from ..parsers.dart_lexer import (
+    COMMENT,
+    IDENTIFIER,
+    KEYWORD,
+    NUMBER,
+    OPERATOR,
+    PUNCTUATION,
+    STRING,
+    WORD_KINDS,
+    TokenStream,
+    tokenize,
+)
 from .wmfp import compute_wmfp, count_arithmetic_ops, count_assignments
 
 
@@ -16,30 +26,19 @@ from .wmfp import compute_wmfp, count_arithmetic_ops, count_assignments
 # Decision keywords / operators for cyclomatic complexity
 # ---------------------------------------------------------------------------
 
-_DECISION_KEYWORDS = re.compile(
-    r"\b(?:if|for|while|do|case|catch)\b"
-)
+_DECISION_KEYWORDS = frozenset({"if", "for", "while", "do", "case", "catch"})
 
-_LOGICAL_OPERATORS = re.compile(
-    r"&&|\|\||\?\?"
-)
+# ``??=`` is a null check as well
+_LOGICAL_OPERATORS = frozenset({"&&", "||", "??", "??="})
+
+# Characters after ``Type?`` that mark it as a nullable type, not a ternary
+_NULLABLE_FOLLOWERS = frozenset(" \t\r\n\f\v)>,;[]")
 
 
 # ---------------------------------------------------------------------------
-# Halstead — operators sorted by length for longest-match tokenisation
+# Halstead — keyword operators (other operators come from the lexer)
 # ---------------------------------------------------------------------------
 
-_DART_MULTI_CHAR_OPS = sorted([
-    ">>>=", "<<=", ">>=", "~/=",
-    ">>>", "??=", "...",
-    "~/", "<<", ">>", "==", "!=", ">=", "<=",
-    "&&", "||", "??", "?.", "!.", "..",
-    "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=",
-    "=>", "is!", "as",
-], key=len, reverse=True)
-
-_DART_SINGLE_CHAR_OPS = frozenset("+-*/%=<>!&|^~?:.")
-
 _DART_KEYWORD_OPERATORS = frozenset({
     "if", "else", "for", "while", "do", "switch", "case", "default",
     "break", "continue", "return", "throw", "try", "catch", "finally",
@@ -47,14 +46,9 @@ _DART_KEYWORD_OPERATORS = frozenset({
     "await", "async", "yield", "sync",
     "assert", "import", "export", "class", "extends", "implements",
     "with", "abstract", "mixin", "enum", "typedef",
+    "is", "as", "in",
 })
 
-# Delimiters — NOT counted as operators
-_DELIMITERS = frozenset("{}()[];,@#")
-
-_RE_IDENTIFIER = re.compile(r"[a-zA-Z_]\w*")
-_RE_NUMBER = re.compile(r"\d+\.?\d*(?:[eE][+-]?\d+)?")
-
 
 # ---------------------------------------------------------------------------
 # Control-flow keywords for nesting
@@ -75,7 +69,12 @@ def compute_function_metrics(
     module_name: str,
     thresholds: Thresholds,
 ) -> List[FunctionMetrics]:
-    """Compute metrics for all functions/methods in a parsed file."""
+    """Compute metrics for all functions/methods in a parsed file.
+
+    Everything except LOC is computed from slices of the file's token
+    stream, so the source is lexed once per file.  CC and MNL come from
+    the syntax tree instead when the parser counted them (tree-sitter).
+    """
     results: List[FunctionMetrics] = []
 
     all_functions: List[ParsedFunction] = list(parsed_file.top_level_functions)
@@ -83,20 +82,28 @@ def compute_function_metrics(
         all_functions.extend(cls.methods)
 
     rel_path = parsed_file.path
+    file_tokens = file_token_stream(parsed_file)
 
     for fn in all_functions:
-        cyclo = compute_cyclomatic_complexity(fn.body_text)
-        halvol_data = compute_halstead(fn.full_text)
+        full_tokens = file_tokens.slice(fn.start, fn.end)
+        body_tokens = file_tokens.slice(fn.body_start, fn.body_end)
+
+        cyclo = fn.cyclo
+        if cyclo is None:
+            cyclo = compute_cyclomatic_complexity(body_tokens)
+        halvol_data = compute_halstead(full_tokens)
         halvol = halvol_data.volume
         loc = _count_lines(fn.full_text)
-        sloc = _count_sloc(fn.full_text)
+        sloc = len(full_tokens.code_lines(include_strings=True))
         mi = compute_maintainability_index(cyclo, halvol, loc)
-        mnl = compute_max_nesting(fn.body_text)
+        mnl = fn.max_nesting
+        if mnl is None:
+            mnl = compute_max_nesting(body_tokens)
         nop = len(fn.parameters)
 
         # WMFP
-        arith_ops = count_arithmetic_ops(fn.body_text)
-        assigns = count_assignments(fn.body_text)
+        arith_ops = count_arithmetic_ops(body_tokens)
+        assigns = count_assignments(body_tokens)
         comment_lines = max(0, loc - sloc)
         wmfp = compute_wmfp(
             cyclo=cyclo,
@@ -133,43 +140,48 @@ def compute_function_metrics(
     return results
 
 
+def file_token_stream(parsed_file: ParsedFile) -> TokenStream:
+    """Token stream of *parsed_file*, lexing the source if the parser did not."""
+    if parsed_file.tokens is None:
+        parsed_file.tokens = tokenize(parsed_file.source)
+    return parsed_file.tokens
+
+
 # ---------------------------------------------------------------------------
 # Cyclomatic Complexity
 # ---------------------------------------------------------------------------
 
-def compute_cyclomatic_complexity(body: str) -> int:
+def compute_cyclomatic_complexity(body: TokenStream) -> int:
     """Compute McCabe cyclomatic complexity of a function body.
 
     CC = 1 + decision keywords + logical operators + ternary '?'.
-    Uses state-machine string/comment stripping for accuracy.
+    A ``?`` glued to a preceding word and followed by whitespace or one
+    of ``)>,;[]`` is a nullable type (``String? name``), not a ternary.
     """
-    if not body:
-        return 1
-
-    cleaned = strip_strings_and_comments(body)
-
+    source = body.source
     cc = 1
-    cc += len(_DECISION_KEYWORDS.findall(cleaned))
-    cc += len(_LOGICAL_OPERATORS.findall(cleaned))
-
-    # Ternary ? detection — remove ?., ?? and nullable-type ? first
-    # 1) Replace ?. with XX
-    tmp = re.sub(r'\?\.', 'XX', cleaned)
-    # 2) Replace ?? with XX (already counted above)
-    tmp = tmp.replace('??', 'XX')
-    # 3) Remove nullable type annotations: SomeType? (word boundary + ?)
-    #    Pattern: a type name (capitalized or not) immediately followed by ?
-    #    that is then followed by whitespace, ), >, , or ;
-    tmp = re.sub(r'(\w)\?(?=[\s)>,;\]\[])', r'\1X', tmp)
-    # 4) Count remaining standalone ?
-    ternary_count = 0
-    for i, c in enumerate(tmp):
-        if c == '?':
-            # Must not be followed by another ? or .
-            nxt = tmp[i + 1] if i + 1 < len(tmp) else ''
-            if nxt not in ('.', '?', '='):
-                ternary_count += 1
-    cc += ternary_count
+    prev_kind = -1
+    prev_end = -1
+
+    for kind, text, start, end in zip(body.kinds, body.texts, body.starts, body.ends):
+        if kind in WORD_KINDS:
+            if text in _DECISION_KEYWORDS:
+                cc += 1
+        elif kind == OPERATOR:
+            if text in _LOGICAL_OPERATORS:
+                cc += 1
+            elif text == '?':
+                nxt = source[end] if end < len(source) else ''
+                nullable = (
+                    prev_end == start
+                    and prev_kind in (IDENTIFIER, KEYWORD, NUMBER)
+                    and nxt in _NULLABLE_FOLLOWERS
+                )
+                if not nullable and nxt != '=':
+                    cc += 1
+        if kind != COMMENT and kind != STRING:
+            prev_kind = kind
+            prev_end = end
 
     return cc
 
@@ -178,75 +190,26 @@ def compute_cyclomatic_complexity(body: str) -> int:
 # Halstead Volume
 # ---------------------------------------------------------------------------
 
-def compute_halstead(source: str) -> HalsteadData:
+def compute_halstead(tokens: TokenStream) -> HalsteadData:
     """Compute Halstead complexity metrics.
 
-    Uses longest-match tokenisation for multi-char operators.
-    Delimiters ({, }, (, ), [, ], ;, ,) are excluded.
+    Operators are the lexer's operator tokens plus keyword operators;
+    operands are the remaining identifiers and number literals.
+    Delimiters ({, }, (, ), [, ], ;, ,), strings and comments are excluded.
     """
-    cleaned = strip_strings_and_comments(source)
-
     operators: dict[str, int] = {}
     operands: dict[str, int] = {}
 
-    pos = 0
-    n = len(cleaned)
-
-    while pos < n:
-        c = cleaned[pos]
-
-        # Skip whitespace
-        if c.isspace():
-            pos += 1
-            continue
-
-        # Skip delimiters (not operators)
-        if c in _DELIMITERS:
-            pos += 1
-            continue
-
-        # Try identifier / keyword
-        if c.isalpha() or c == '_':
-            m = _RE_IDENTIFIER.match(cleaned, pos)
-            if m:
-                word = m.group(0)
-                if word in _DART_KEYWORD_OPERATORS:
-                    operators[word] = operators.get(word, 0) + 1
-                elif word == 'is' or word == 'as' or word == 'in':
-                    operators[word] = operators.get(word, 0) + 1
-                else:
-                    operands[word] = operands.get(word, 0) + 1
-                pos = m.end()
-                continue
-
-        # Try number literal
-        if c.isdigit():
-            m = _RE_NUMBER.match(cleaned, pos)
-            if m:
-                operands[m.group(0)] = operands.get(m.group(0), 0) + 1
-                pos = m.end()
-                continue
-
-        # Try multi-char operator (longest match)
-        matched = False
-        for op in _DART_MULTI_CHAR_OPS:
-            if cleaned[pos:pos + len(op)] == op:
-                operators[op] = operators.get(op, 0) + 1
-                pos += len(op)
-                matched = True
-                break
-
-        if matched:
-            continue
-
-        # Single-char operator
-        if c in _DART_SINGLE_CHAR_OPS:
-            operators[c] = operators.get(c, 0) + 1
-            pos += 1
-            continue
-
-        # Unknown character — skip
-        pos += 1
+    for kind, text in zip(tokens.kinds, tokens.texts):
+        if kind in WORD_KINDS:
+            if text in _DART_KEYWORD_OPERATORS:
+                operators[text] = operators.get(text, 0) + 1
+            else:
+                operands[text] = operands.get(text, 0) + 1
+        elif kind == NUMBER:
+            operands[text] = operands.get(text, 0) + 1
+        elif kind == OPERATOR:
+            operators[text] = operators.get(text, 0) + 1
 
     n1 = sum(operators.values())
     n2 = sum(operands.values())
@@ -276,62 +239,43 @@ def compute_maintainability_index(cyclo: int, halvol: float, loc: int) -> float:
 # Maximum Nesting Level (control-flow only)
 # ---------------------------------------------------------------------------
 
-_RE_WORD_BEFORE_BRACE = re.compile(r'(\w+)\s*$')
-
-def compute_max_nesting(body: str) -> int:
+def compute_max_nesting(body: TokenStream) -> int:
     """Compute max nesting of control-flow structures only.
 
     Only counts braces following control-flow keywords (if, for, while,
-    do, switch, try, catch, finally, else).  Map/Set literals, lambdas,
-    and class bodies are ignored.
+    do, switch, try, catch, finally, else) or a closing paren.  Map/Set
+    literals, lambdas, and class bodies are ignored.
     """
-    if not body:
-        return 0
-
-    cleaned = strip_strings_and_comments(body)
-
     max_depth = 0
     cf_depth = 0          # control-flow depth
-    total_depth = 0       # total brace depth
     # Stack: True if this brace level is a control-flow block
     is_cf_stack: list[bool] = []
+    prev_kind = -1
+    prev_text = ''
 
-    i = 0
-    n = len(cleaned)
-
-    while i < n:
-        c = cleaned[i]
-
-        if c == '{':
-            total_depth += 1
-            # Check if this brace is preceded by a control-flow keyword
-            preceding = cleaned[max(0, i - 60):i].rstrip()
-            # Handle "else {", "else if (...) {", etc.
-            word_m = _RE_WORD_BEFORE_BRACE.search(preceding)
-            is_cf = False
-            if word_m:
-                word = word_m.group(1)
-                if word in _NESTING_KEYWORDS:
-                    is_cf = True
-            else:
-                # Check for ) { pattern (closing paren of if/for/while/catch)
-                if preceding.endswith(')'):
-                    is_cf = True
+    for kind, text in zip(body.kinds, body.texts):
+        if kind == COMMENT or kind == STRING:
+            continue
 
+        if kind == PUNCTUATION and text == '{':
+            if prev_kind in WORD_KINDS:
+                is_cf = prev_text in _NESTING_KEYWORDS
+            else:
+                is_cf = prev_text == ')'
             is_cf_stack.append(is_cf)
             if is_cf:
                 cf_depth += 1
                 if cf_depth > max_depth:
                     max_depth = cf_depth
 
-        elif c == '}':
+        elif kind == PUNCTUATION and text == '}':
             if is_cf_stack:
                 was_cf = is_cf_stack.pop()
                 if was_cf:
                     cf_depth = max(0, cf_depth - 1)
-            total_depth = max(0, total_depth - 1)
 
-        i += 1
+        prev_kind = kind
+        prev_text = text
 
     return max_depth
 
@@ -344,8 +288,3 @@ def _count_lines(text: str) -> int:
     if not text:
         return 0
     return len(text.splitlines())
-
-
-def _count_sloc(text: str) -> int:
-    cleaned = strip_comments(text)
-    return sum(1 for line in cleaned.splitlines() if line.strip())
@@ -9,12 +9,12 @@ from __future__ import annotations
 import glob
 import json
 import os
-import subprocess
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
 from ..models import ModuleSummary, ProjectSummary, StatsSummary
+from ..package_analysis.git_analysis import read_git_head
 
 
 # ---------------------------------------------------------------------------
@@ -146,6 +146,7 @@ def build_snapshot(
     module_ratings: Dict[str, Tuple[float, str]],
     duplication_pct: float = 0.0,
     repo_root: str = ".",
+    git_head: Optional[Tuple[str, str]] = None,
 ) -> Snapshot:
     """Build a snapshot from current analysis results.
 
@@ -155,14 +156,17 @@ def build_snapshot(
         module_ratings: Dict of module_name -> (score, grade).
         duplication_pct: Overall duplication percentage.
         repo_root: Git repository root for commit/branch info.
+        git_head: ``(commit, branch)`` already read for *repo_root*
+            (``ChurnIndex.git_head``); read from git when omitted.
 
     Returns:
         Snapshot object.
     """
+    git_commit, git_branch = git_head if git_head is not None else read_git_head(repo_root)
     snap = Snapshot(
         timestamp=datetime.now(timezone.utc).isoformat(),
-        git_commit=_git_rev(repo_root),
-        git_branch=_git_branch(repo_root),
+        git_commit=git_commit,
+        git_branch=git_branch,
         project_loc=project_summary.loc_total,
         project_sloc=project_summary.sloc_total,
         project_files=project_summary.files_count,
@@ -499,31 +503,3 @@ def _make_delta_row(
         pct_change=pct,
         indicator=indicator,
     )
-
-
-# ---------------------------------------------------------------------------
-# Git helpers
-# ---------------------------------------------------------------------------
-
-def _git_rev(repo_root: str) -> str:
-    """Get current git commit short hash."""
-    try:
-        r = subprocess.run(
-            ["git", "-C", repo_root, "rev-parse", "--short", "HEAD"],
-            capture_output=True, text=True, timeout=5,
-        )
-        return r.stdout.strip() if r.returncode == 0 else ""
-    except Exception:
-        return ""
-
-
-def _git_branch(repo_root: str) -> str:
-    """Get current git branch name."""
-    try:
-        r = subprocess.run(
-            ["git", "-C", repo_root, "rev-parse", "--abbrev-ref", "HEAD"],
-            capture_output=True, text=True, timeout=5,
-        )
-        return r.stdout.strip() if r.returncode == 0 else ""
-    except Exception:
-        return ""
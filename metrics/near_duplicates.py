@@ -0,0 +1,334 @@
+"""Near-miss (Type-3) clone detection over function bodies.
+
+Copy-paste-and-tweak code shares most, but not all, of its tokens, so it
+is invisible to exact clone detection.  Here each function body is taken
+as the set of its k-token shingles (normalized tokens from
+:func:`metrics.duplication.tokenize_for_duplication`) and summarized by a
+MinHash signature in the per-file phase.  Functions with identical
+signatures (generated code, repeated boilerplate) are reported as one
+group each.  Locality-sensitive hashing (banding) over the distinct
+signatures yields candidate pairs in roughly linear time; candidates
+whose estimated Jaccard similarity reaches the threshold are reported.
+"""
+
+from __future__ import annotations
+
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..models import FunctionSignature, ParsedFile
+from .duplication import rolling_hashes, stable_token_values, tokenize_for_duplication
+
+
+# Minimum number of body tokens for a function to be compared
+MIN_TOKENS = 50
+# Tokens per shingle
+SHINGLE_SIZE = 5
+# MinHash signature length
+NUM_HASHES = 64
+# Default Jaccard similarity threshold
+THRESHOLD = 0.8
+# Band buckets with more distinct signatures are skipped: they hold a
+# shared idiom, not copies, and would cost quadratic pair enumeration
+MAX_BUCKET = 200
+
+
+@dataclass
+class NearDuplicateFunction:
+    """One function of a near-duplicate pair."""
+    path: str
+    class_name: Optional[str]
+    function_name: str
+    line_start: int
+    line_end: int
+    token_count: int
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "class_name": self.class_name,
+            "function_name": self.function_name,
+            "line_start": self.line_start,
+            "line_end": self.line_end,
+            "token_count": self.token_count,
+        }
+
+
+@dataclass
+class NearDuplicatePair:
+    """Two functions whose shingle sets are estimated to be similar."""
+    function_a: NearDuplicateFunction
+    function_b: NearDuplicateFunction
+    similarity: float  # estimated Jaccard similarity
+
+    def to_dict(self) -> dict:
+        return {
+            "function_a": self.function_a.to_dict(),
+            "function_b": self.function_b.to_dict(),
+            "similarity": round(self.similarity, 3),
+        }
+
+
+@dataclass
+class NearDuplicateGroup:
+    """Functions with identical signatures: copies up to renaming."""
+    functions: List[NearDuplicateFunction]
+
+    def to_dict(self) -> dict:
+        return {
+            "size": len(self.functions),
+            "functions": [f.to_dict() for f in self.functions],
+        }
+
+
+@dataclass
+class NearDuplicationResult:
+    """Complete near-duplicate analysis result."""
+    threshold: float = THRESHOLD
+    bands: int = 0
+    rows: int = 0
+    functions_analyzed: int = 0
+    candidate_pairs: int = 0
+    skipped_buckets: int = 0
+    # Functions with the same signature; pairs name one function per group
+    groups: List[NearDuplicateGroup] = field(default_factory=list)
+    pairs: List[NearDuplicatePair] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "shingle_size": SHINGLE_SIZE,
+            "num_hashes": NUM_HASHES,
+            "bands": self.bands,
+            "rows": self.rows,
+            "functions_analyzed": self.functions_analyzed,
+            "candidate_pairs": self.candidate_pairs,
+            "skipped_buckets": self.skipped_buckets,
+            "groups_count": len(self.groups),
+            "groups": [g.to_dict() for g in self.groups[:500]],
+            "pairs_count": len(self.pairs),
+            "pairs": [p.to_dict() for p in self.pairs[:500]],
+        }
+
+
+# ---------------------------------------------------------------------------
+# MinHash signatures
+# ---------------------------------------------------------------------------
+
+# One-permutation MinHash: each shingle hash is mixed once (Fibonacci
+# hashing), its top bits pick one of NUM_HASHES bins and each bin keeps
+# its minimum.  Empty bins borrow the value of the first non-empty bin
+# in a fixed probe order of their own ("optimal densification"), so all
+# functions fill the same bin from the same source.
+_BIN_BITS = 6  # log2(NUM_HASHES)
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_EMPTY = _MASK64 + 1
+
+_rng = random.Random(73)
+_PROBES = [
+    [j] + _rng.sample([b for b in range(NUM_HASHES) if b != j], NUM_HASHES - 1)
+    for j in range(NUM_HASHES)
+]
+del _rng
+
+
+def minhash(shingles: Set[int]) -> array:
+    """MinHash signature (``NUM_HASHES`` 32-bit values) of a non-empty shingle set."""
+    bins = [_EMPTY] * NUM_HASHES
+    shift = 64 - _BIN_BITS
+    for x in shingles:
+        y = (x * _MIX) & _MASK64
+        b = y >> shift
+        if y < bins[b]:
+            bins[b] = y
+    signature = array("I", [0]) * NUM_HASHES
+    for j, probes in enumerate(_PROBES):
+        for b in probes:
+            if bins[b] != _EMPTY:
+                signature[j] = (bins[b] >> 26) & 0xFFFFFFFF
+                break
+    return signature
+
+
+def function_signatures(
+    parsed_file: ParsedFile,
+    vocabulary: List[str],
+    ids: array,
+    lines: array,
+) -> List[FunctionSignature]:
+    """Signatures of the functions of *parsed_file* with enough body tokens.
+
+    A body's tokens are sliced out of the file's duplication tokens
+    (*vocabulary*, *ids*, *lines* from :func:`tokenize_for_duplication`)
+    instead of tokenizing the body again.  Token values are hashed with
+    CRC-32, so signatures computed in different processes are comparable.
+    """
+    stable = stable_token_values(vocabulary)
+    functions = list(parsed_file.top_level_functions)
+    for cls in parsed_file.classes:
+        functions.extend(cls.methods)
+
+    signatures: List[FunctionSignature] = []
+    for fn in functions:
+        if fn.body_end - fn.body_start < MIN_TOKENS:
+            continue  # abstract, or too short to hold MIN_TOKENS tokens
+        lo, hi = _body_token_range(fn, lines)
+        if hi - lo < MIN_TOKENS:
+            continue
+        tokens = array("I", [stable[t] for t in ids[lo:hi]])
+        signatures.append(FunctionSignature(
+            class_name=fn.class_name,
+            function_name=fn.name,
+            line_start=fn.line_start,
+            line_end=fn.line_end,
+            token_count=hi - lo,
+            signature=minhash(set(rolling_hashes(tokens, SHINGLE_SIZE))),
+        ))
+    return signatures
+
+
+def _body_token_range(fn, lines: array) -> Tuple[int, int]:
+    """Index range of *fn*'s body tokens in the file's token stream.
+
+    Takes the tokens on the body's lines, then drops those on its first
+    and last line that lie outside the body (signature, braces).
+    """
+    buffer = fn.buffer
+    first_line = fn.line_start + buffer.count("\n", fn.start, fn.body_start)
+    last_line = first_line + buffer.count("\n", fn.body_start, fn.body_end)
+    lo = bisect_left(lines, first_line)
+    hi = bisect_right(lines, last_line)
+    before = buffer[buffer.rfind("\n", 0, fn.body_start) + 1:fn.body_start]
+    line_end = buffer.find("\n", fn.body_end)
+    after = buffer[fn.body_end:line_end if line_end >= 0 else len(buffer)]
+    lo += len(tokenize_for_duplication(before)[1])
+    hi -= len(tokenize_for_duplication(after)[1])
+    return lo, hi
+
+
+# ---------------------------------------------------------------------------
+# Locality-sensitive hashing
+# ---------------------------------------------------------------------------
+
+# Share of pairs exactly at the threshold that banding must surface
+_MIN_RECALL = 0.95
+
+
+def lsh_parameters(threshold: float, num_hashes: int = NUM_HASHES) -> Tuple[int, int]:
+    """``(bands, rows)`` for banding at *threshold*.
+
+    Two signatures become candidates when all rows of any band agree,
+    which for similarity *s* happens with probability
+    ``1 - (1 - s**rows) ** bands``.  The most rows (fewest spurious
+    candidates) that still give ``_MIN_RECALL`` at *threshold* win.
+    """
+    best = (num_hashes, 1)
+    for rows in range(1, num_hashes + 1):
+        bands = num_hashes // rows
+        if 1 - (1 - threshold ** rows) ** bands >= _MIN_RECALL:
+            best = (bands, rows)
+    return best
+
+
+def detect_near_duplicates(
+    parsed_files: List[ParsedFile],
+    threshold: float = THRESHOLD,
+) -> NearDuplicationResult:
+    """Find groups and pairs of functions with similar token shingle sets.
+
+    Signatures come from each file's precomputed ``facts``, or are
+    computed from the parsed file when there are none.  Functions with
+    identical signatures form one group and take part in banding once,
+    so k copies cost one entry rather than k * (k - 1) / 2 pairs.
+
+    Args:
+        parsed_files: List of parsed Dart files.
+        threshold: Minimum estimated Jaccard similarity of a pair.
+
+    Returns:
+        NearDuplicationResult with groups, largest first, and pairs,
+        most similar first.
+    """
+    bands, rows = lsh_parameters(threshold)
+    result = NearDuplicationResult(threshold=threshold, bands=bands, rows=rows)
+
+    paths: List[str] = []
+    entries: List[FunctionSignature] = []
+    for pf in parsed_files:
+        if pf.facts is not None:
+            signatures = pf.facts.function_signatures
+        else:
+            signatures = function_signatures(pf, *tokenize_for_duplication(pf.source))
+        for sig in signatures:
+            paths.append(pf.path)
+            entries.append(sig)
+    result.functions_analyzed = len(entries)
+
+    # Identical signatures: one group, represented by its first member
+    by_signature: Dict[bytes, List[int]] = {}
+    for i, sig in enumerate(entries):
+        by_signature.setdefault(sig.signature.tobytes(), []).append(i)
+    distinct = [members[0] for members in by_signature.values()]
+    for members in by_signature.values():
+        if len(members) > 1:
+            result.groups.append(NearDuplicateGroup(
+                [_function(paths[i], entries[i]) for i in members],
+            ))
+
+    # Band buckets: distinct signatures that agree on a whole band
+    candidates: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        lo, hi = band * rows, (band + 1) * rows
+        buckets: Dict[bytes, List[int]] = {}
+        for i in distinct:
+            buckets.setdefault(entries[i].signature[lo:hi].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) > MAX_BUCKET:
+                result.skipped_buckets += 1
+                continue
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    candidates.add((members[a], members[b]))
+    result.candidate_pairs = len(candidates)
+
+    # Verify candidates on the whole signature
+    for i, j in candidates:
+        sig_a, sig_b = entries[i].signature, entries[j].signature
+        similarity = sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+        if similarity >= threshold:
+            result.pairs.append(NearDuplicatePair(
+                function_a=_function(paths[i], entries[i]),
+                function_b=_function(paths[j], entries[j]),
+                similarity=similarity,
+            ))
+
+    result.groups.sort(key=lambda g: (
+        -len(g.functions),
+        -g.functions[0].token_count,
+        g.functions[0].path,
+        g.functions[0].line_start,
+    ))
+    result.pairs.sort(key=lambda p: (
+        -p.similarity,
+        -p.function_a.token_count,
+        p.function_a.path,
+        p.function_a.line_start,
+        p.function_b.path,
+        p.function_b.line_start,
+    ))
+    return result
+
+
+def _function(path: str, sig: FunctionSignature) -> NearDuplicateFunction:
+    return NearDuplicateFunction(
+        path=path,
+        class_name=sig.class_name,
+        function_name=sig.function_name,
+        line_start=sig.line_start,
+        line_end=sig.line_end,
+        token_count=sig.token_count,
+    )
@@ -5,16 +5,20 @@ to identify files that are both complex and frequently changing —
 the highest-risk refactoring candidates.
 
 Risk score = normalize(churn) × normalize(complexity)
+
+The same is done per function: every changed hunk of the git history is
+mapped onto the functions it overlaps, so the hot methods of a large
+file stand out.
 """
 
 from __future__ import annotations
 
-import os
-import subprocess
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from ..models import FileMetrics
+from ..models import FileMetrics, FunctionMetrics
+from ..package_analysis.git_analysis import ChurnIndex, read_changed_lines
 
 
 @dataclass
@@ -50,46 +54,25 @@ def get_file_churn(
     repo_root: str,
     paths: List[str],
     since: str = "2025-01-01",
+    churn_index: Optional[ChurnIndex] = None,
 ) -> Dict[str, int]:
-    """Get commit counts per file using git log.
+    """Get commit counts per file from the git history.
 
     Args:
         repo_root: Absolute path to git repository root.
         paths: List of relative file paths to check.
         since: Date string for --since.
+        churn_index: History already read for *repo_root* and *since*;
+            read from git when omitted.
 
     Returns:
         Dict of relative_path -> commit_count.
     """
     if not paths:
         return {}
-
-    try:
-        result = subprocess.run(
-            [
-                "git", "-C", repo_root,
-                "log",
-                "--format=format:",
-                "--name-only",
-                f"--since={since}",
-                "--",
-            ] + paths,
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-        if result.returncode != 0:
-            return {}
-
-        counts: Dict[str, int] = {}
-        for line in result.stdout.splitlines():
-            line = line.strip()
-            if line:
-                counts[line] = counts.get(line, 0) + 1
-        return counts
-
-    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-        return {}
+    if churn_index is None:
+        churn_index = ChurnIndex.from_git(repo_root, since)
+    return churn_index.commit_counts(paths)
 
 
 def compute_risk_hotspots(
@@ -97,6 +80,7 @@ def compute_risk_hotspots(
     repo_root: str,
     since: str = "2025-01-01",
     top_n: int = 30,
+    churn_index: Optional[ChurnIndex] = None,
 ) -> List[RiskHotspot]:
     """Compute risk hotspots = churn × complexity.
 
@@ -105,6 +89,7 @@ def compute_risk_hotspots(
         repo_root: Absolute path to git repository.
         since: Start date for git churn analysis.
         top_n: Number of top hotspots to return.
+        churn_index: History already read for *repo_root* and *since*.
 
     Returns:
         List of RiskHotspot sorted by risk_score descending.
@@ -116,7 +101,7 @@ def compute_risk_hotspots(
     all_paths = [fm.path for fm in file_metrics]
 
     # Get churn data
-    churn_map = get_file_churn(repo_root, all_paths, since=since)
+    churn_map = get_file_churn(repo_root, all_paths, since=since, churn_index=churn_index)
 
     # Build raw data: path -> (churn, complexity)
     # Complexity = CC_sum + TD_density (TD per 100 LOC)
@@ -164,3 +149,165 @@ def compute_risk_hotspots(
 
     hotspots.sort(key=lambda h: h.risk_score, reverse=True)
     return hotspots[:top_n]
+
+
+# ---------------------------------------------------------------------------
+# Function-level risk hotspots
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FunctionRiskHotspot:
+    """A function with its risk score based on churn × complexity."""
+    path: str
+    module: str
+    class_name: Optional[str]
+    function_name: str
+    line_start: int
+    line_end: int
+    churn: int              # number of commits changing the function
+    hunks: int              # number of changed hunks inside the function
+    complexity: float       # CC + MI deficit
+    risk_score: float       # normalized churn × normalized complexity (0-1)
+    cyclo: int = 0
+    mi: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "module": self.module,
+            "class_name": self.class_name,
+            "function_name": self.function_name,
+            "line_start": self.line_start,
+            "line_end": self.line_end,
+            "churn": self.churn,
+            "hunks": self.hunks,
+            "complexity": round(self.complexity, 2),
+            "risk_score": round(self.risk_score, 4),
+            "cyclo": self.cyclo,
+            "mi": round(self.mi, 2),
+        }
+
+
+class FunctionIntervals:
+    """Line ranges of one file's functions, for stabbing queries.
+
+    Functions are sorted by first line, with the running maximum of last
+    lines alongside, so the functions overlapping a range are found by a
+    bisect and a backward scan that stops as soon as no earlier function
+    can reach the range (nested functions are all reported).
+    """
+
+    def __init__(self, functions: Iterable[Tuple[int, int, int]]):
+        # (line_start, line_end, id)
+        entries = sorted(functions)
+        self.starts = [e[0] for e in entries]
+        self.ends = [e[1] for e in entries]
+        self.ids = [e[2] for e in entries]
+        self.reach: List[int] = []
+        furthest = 0
+        for end in self.ends:
+            furthest = max(furthest, end)
+            self.reach.append(furthest)
+
+    def overlapping(self, first: int, last: int) -> List[int]:
+        """Ids of the functions with ``line_start <= last`` and ``line_end >= first``."""
+        found: List[int] = []
+        i = bisect_right(self.starts, last) - 1
+        while i >= 0 and self.reach[i] >= first:
+            if self.ends[i] >= first:
+                found.append(self.ids[i])
+            i -= 1
+        return found
+
+
+def compute_function_churn(
+    function_metrics: List[FunctionMetrics],
+    repo_root: str,
+    since: str = "2025-01-01",
+) -> Tuple[List[int], List[int]]:
+    """Commits and hunks changing each function since *since*.
+
+    Returns two lists parallel to *function_metrics*.  A pure deletion
+    counts for the functions enclosing both of its neighbouring lines.
+    """
+    commits = [0] * len(function_metrics)
+    hunks = [0] * len(function_metrics)
+    by_path: Dict[str, List[Tuple[int, int, int]]] = {}
+    for i, fm in enumerate(function_metrics):
+        by_path.setdefault(fm.path, []).append((fm.line_start, fm.line_end, i))
+    intervals = {path: FunctionIntervals(fns) for path, fns in by_path.items()}
+
+    for changed in read_changed_lines(repo_root, since):
+        touched = set()
+        for path, ranges in changed.items():
+            index = intervals.get(path)
+            if index is None:
+                continue
+            for first, last in ranges:
+                for i in index.overlapping(first, last):
+                    hunks[i] += 1
+                    touched.add(i)
+        for i in touched:
+            commits[i] += 1
+    return commits, hunks
+
+
+def compute_function_risk_hotspots(
+    function_metrics: List[FunctionMetrics],
+    repo_root: str,
+    since: str = "2025-01-01",
+    top_n: int = 50,
+) -> List[FunctionRiskHotspot]:
+    """Compute function risk hotspots = churn × complexity.
+
+    Complexity is CC plus a tenth of the MI deficit (``100 - MI``), so
+    of two equally branchy functions the less maintainable ranks higher.
+
+    Args:
+        function_metrics: Function-level metrics with CC and MI.
+        repo_root: Absolute path to git repository.
+        since: Start date for git churn analysis.
+        top_n: Number of top hotspots to return.
+
+    Returns:
+        List of FunctionRiskHotspot sorted by risk_score descending.
+    """
+    if not function_metrics:
+        return []
+
+    commits, hunks = compute_function_churn(function_metrics, repo_root, since)
+
+    raw: List[Tuple[FunctionMetrics, int, int, float]] = []
+    for fm, churn, hunk_count in zip(function_metrics, commits, hunks):
+        if churn == 0:
+            continue
+        complexity = fm.cyclo + max(0.0, 100.0 - fm.mi) / 10
+        raw.append((fm, churn, hunk_count, complexity))
+
+    if not raw:
+        return []
+
+    max_churn = max(r[1] for r in raw)
+    max_complexity = max(r[3] for r in raw)
+    if max_complexity == 0:
+        return []
+
+    hotspots = [
+        FunctionRiskHotspot(
+            path=fm.path,
+            module=fm.module,
+            class_name=fm.class_name,
+            function_name=fm.function_name,
+            line_start=fm.line_start,
+            line_end=fm.line_end,
+            churn=churn,
+            hunks=hunk_count,
+            complexity=complexity,
+            risk_score=(churn / max_churn) * (complexity / max_complexity),
+            cyclo=fm.cyclo,
+            mi=fm.mi,
+        )
+        for fm, churn, hunk_count, complexity in raw
+    ]
+    hotspots.sort(key=lambda h: h.risk_score, reverse=True)
+    return hotspots[:top_n]
@@ -0,0 +1,102 @@
+"""Metrics table: the collected function, class and file records.
+
+Records are appended one file at a time and indexed as they go in, so
+per-file and per-module lookups are dict hits instead of scans over
+every function of the project.  Path and module strings are
+interned, so all records of a file share one copy of each.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from ..models import ClassMetrics, FileMetrics, FunctionMetrics
+
+
+class MetricsTable:
+    """Function, class and file metrics with group-by indexes.
+
+    ``functions``, ``classes`` and ``files`` hold the records in the
+    order they were added.  The project table keeps one child table per
+    module (see :meth:`module`) sharing the same record objects.
+    """
+
+    __slots__ = (
+        "functions",
+        "classes",
+        "files",
+        "_file_by_path",
+        "_functions_by_file",
+        "_classes_by_file",
+        "_modules",
+    )
+
+    def __init__(self):
+        self.functions: List[FunctionMetrics] = []
+        self.classes: List[ClassMetrics] = []
+        self.files: List[FileMetrics] = []
+        self._file_by_path: Dict[str, FileMetrics] = {}
+        self._functions_by_file: Dict[str, List[FunctionMetrics]] = {}
+        self._classes_by_file: Dict[str, List[ClassMetrics]] = {}
+        self._modules: Dict[str, MetricsTable] = {}
+
+    def add_file(
+        self,
+        file_metrics: FileMetrics,
+        function_metrics: Iterable[FunctionMetrics],
+        class_metrics: Iterable[ClassMetrics],
+    ) -> None:
+        """Add one file's records to this table and its module's table."""
+        path = sys.intern(file_metrics.path)
+        module = sys.intern(file_metrics.module)
+        file_metrics.path = path
+        file_metrics.module = module
+        function_metrics = list(function_metrics)
+        class_metrics = list(class_metrics)
+        for rec in function_metrics:
+            rec.path = path
+            rec.module = module
+        for rec in class_metrics:
+            rec.path = path
+            rec.module = module
+
+        # Both tables share the per-file lists
+        self._add(path, file_metrics, function_metrics, class_metrics)
+        child = self._modules.get(module)
+        if child is None:
+            child = self._modules[module] = MetricsTable()
+        child._add(path, file_metrics, function_metrics, class_metrics)
+
+    def _add(
+        self,
+        path: str,
+        file_metrics: FileMetrics,
+        function_metrics: List[FunctionMetrics],
+        class_metrics: List[ClassMetrics],
+    ) -> None:
+        self.files.append(file_metrics)
+        self.functions.extend(function_metrics)
+        self.classes.extend(class_metrics)
+        self._file_by_path[path] = file_metrics
+        self._functions_by_file[path] = function_metrics
+        self._classes_by_file[path] = class_metrics
+
+    # -- lookups ----------------------------------------------------------
+
+    def file(self, path: str) -> Optional[FileMetrics]:
+        """File record for *path*, or ``None``."""
+        return self._file_by_path.get(path)
+
+    def functions_in_file(self, path: str) -> List[FunctionMetrics]:
+        """Function and method records of the file at *path*."""
+        return self._functions_by_file.get(path, [])
+
+    def classes_in_file(self, path: str) -> List[ClassMetrics]:
+        """Class records of the file at *path*."""
+        return self._classes_by_file.get(path, [])
+
+    def module(self, name: str) -> MetricsTable:
+        """Table of the records of module *name* (empty if it has none)."""
+        child = self._modules.get(name)
+        return child if child is not None else MetricsTable()
@@ -6,10 +6,9 @@ configured threshold exceedances and weight factors.
 
 from __future__ import annotations
 
-from typing import List
-
 from ..config import Thresholds
-from ..models import ClassMetrics, FileMetrics, FunctionMetrics
+from ..models import ClassMetrics, FunctionMetrics
+from .table import MetricsTable
 
 
 def compute_function_debt(
@@ -75,34 +74,26 @@ def compute_class_debt(
 
 
 def apply_technical_debt(
-    function_metrics: List[FunctionMetrics],
-    class_metrics: List[ClassMetrics],
-    file_metrics: List[FileMetrics],
+    table: MetricsTable,
     thresholds: Thresholds,
 ) -> None:
-    """Compute and apply technical debt to all metrics in-place."""
+    """Compute and apply technical debt to all metrics of *table* in-place."""
     # Function debt
-    for fm in function_metrics:
+    for fm in table.functions:
         fm.technical_debt_minutes = round(compute_function_debt(fm, thresholds), 2)
 
     # Class debt
-    for cm in class_metrics:
+    for cm in table.classes:
         cm.technical_debt_minutes = round(compute_class_debt(cm, thresholds), 2)
 
     # File debt = sum of function debts in that file + proportion of class debts
-    file_fn_debt: dict = {}
-    for fm in function_metrics:
-        file_fn_debt.setdefault(fm.path, 0.0)
-        file_fn_debt[fm.path] += fm.technical_debt_minutes
-
-    file_cls_debt: dict = {}
-    for cm in class_metrics:
-        file_cls_debt.setdefault(cm.path, 0.0)
-        file_cls_debt[cm.path] += cm.technical_debt_minutes
-
-    for fmet in file_metrics:
-        fn_debt = file_fn_debt.get(fmet.path, 0.0)
-        cls_debt = file_cls_debt.get(fmet.path, 0.0)
+    for fmet in table.files:
+        fn_debt = sum(
+            (fm.technical_debt_minutes for fm in table.functions_in_file(fmet.path)), 0.0,
+        )
+        cls_debt = sum(
+            (cm.technical_debt_minutes for cm in table.classes_in_file(fmet.path)), 0.0,
+        )
         fmet.technical_debt_minutes = round(fn_debt + cls_debt, 2)
         # Normalized TD: minutes per 1 000 LOC
         fmet.td_per_loc = round(
@@ -18,33 +18,43 @@ Formula:
 from __future__ import annotations
 
 import math
-import re
 
 from ..config import WMFPWeights
-from ..parsers.dart_parser import strip_strings_and_comments
+from ..parsers.dart_lexer import OPERATOR, TokenStream
 
 
-# Arithmetic operators in Dart
-_RE_ARITH_OPS = re.compile(r'(?<![/])[+\-*/%]|~/')
+# Arithmetic operator characters in Dart (``++``/``--`` count twice)
+_ARITH_CHARS = frozenset("+-*/%")
 
-# Assignment operators (=, but not ==, !=, <=, >=, =>)
-_RE_ASSIGNMENTS = re.compile(r'(?<![=!<>])=(?!=|>)')
+# Integer division counts once, including its compound assignment
+_INT_DIV_OPS = frozenset({"~/", "~/="})
 
-
-def count_arithmetic_ops(body: str) -> int:
-    """Count arithmetic operators in function body."""
-    if not body:
-        return 0
-    cleaned = strip_strings_and_comments(body)
-    return len(_RE_ARITH_OPS.findall(cleaned))
+# Assignment operators (=, compound assignments; not ==, !=, <=, >=, =>)
+_ASSIGNMENT_OPS = frozenset({
+    "=", "+=", "-=", "*=", "/=", "%=", "~/=",
+    "&=", "|=", "^=", "<<=", ">>=", ">>>=", "??=",
+})
 
 
-def count_assignments(body: str) -> int:
+def count_arithmetic_ops(body: TokenStream) -> int:
+    """Count arithmetic operators in function body."""
+    count = 0
+    for kind, text in zip(body.kinds, body.texts):
+        if kind != OPERATOR:
+            continue
+        if text in _INT_DIV_OPS:
+            count += 1
+        else:
+            count += sum(1 for c in text if c in _ARITH_CHARS)
+    return count
+
+
+def count_assignments(body: TokenStream) -> int:
     """Count assignment operations in function body."""
-    if not body:
-        return 0
-    cleaned = strip_strings_and_comments(body)
-    return len(_RE_ASSIGNMENTS.findall(cleaned))
+    return sum(
+        1 for kind, text in zip(body.kinds, body.texts)
+        if kind == OPERATOR and text in _ASSIGNMENT_OPS
+    )
 
 
 def compute_wmfp(
@@ -23,7 +23,7 @@ class Module:
 # Function-level metrics
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class FunctionMetrics:
     path: str  # relative file path
     module: str
@@ -51,7 +51,7 @@ class FunctionMetrics:
 # Class-level metrics
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ClassMetrics:
     path: str
     module: str
@@ -67,6 +67,7 @@ class ClassMetrics:
     noom: int = 0
     rfc: int = 0
     tcc: float = 0.0
+    lcom4: int = 0
     woc: float = 0.0
     wmc: int = 0
     loc: int = 0
@@ -81,7 +82,7 @@ class ClassMetrics:
 # File-level metrics
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class FileMetrics:
     path: str
     module: str
@@ -106,6 +107,12 @@ class FileMetrics:
     fpy: float = 1.0
     technical_debt_minutes: float = 0.0
     td_per_loc: float = 0.0  # TD (min) per kLOC
+    # git history (package analysis): ISO author dates, distinct authors,
+    # share of the commits made by the top author
+    first_commit: str = ""
+    last_commit: str = ""
+    authors: int = 0
+    top_author_share: float = 0.0
 
     def to_dict(self) -> dict:
         d = asdict(self)
@@ -271,27 +278,48 @@ class HalsteadData:
 
 @dataclass
 class ParsedFunction:
-    """A function/method extracted from AST."""
+    """A function/method extracted from AST.
+
+    Text is not copied per function: ``full_text`` and ``body_text`` are
+    sliced on access from ``buffer``, the whole-file text the parser
+    scanned (the source, or its comment-blanked copy).
+    """
     name: str
     class_name: Optional[str]
     line_start: int
     line_end: int
-    body_text: str  # source code of the body
-    full_text: str  # full source including signature
     parameters: list = field(default_factory=list)
     is_override: bool = False
     is_static: bool = False
     is_getter: bool = False
     is_setter: bool = False
+    # Character offsets into buffer / ParsedFile.source of the full
+    # text (signature included) and of the body
+    start: int = 0
+    end: int = 0
+    body_start: int = 0
+    body_end: int = 0
+    # CC / max nesting counted on the syntax tree (tree-sitter only);
+    # None means the metrics fall back to the token stream
+    cyclo: Optional[int] = None
+    max_nesting: Optional[int] = None
+    buffer: str = field(default="", repr=False, compare=False)
+
+    @property
+    def full_text(self) -> str:
+        return self.buffer[self.start:self.end]
+
+    @property
+    def body_text(self) -> str:
+        return self.buffer[self.body_start:self.body_end]
 
 
 @dataclass
 class ParsedClass:
-    """A class extracted from AST."""
+    """A class extracted from AST; ``full_text`` is a span of ``buffer``."""
     name: str
     line_start: int
     line_end: int
-    full_text: str
     superclass: Optional[str] = None
     interfaces: list = field(default_factory=list)  # implements
     mixins: list = field(default_factory=list)  # with
@@ -300,6 +328,14 @@ class ParsedClass:
     public_methods: list = field(default_factory=list)
     public_fields: list = field(default_factory=list)
     is_abstract: bool = False
+    # Character offsets into buffer / ParsedFile.source of full_text
+    start: int = 0
+    end: int = 0
+    buffer: str = field(default="", repr=False, compare=False)
+
+    @property
+    def full_text(self) -> str:
+        return self.buffer[self.start:self.end]
 
 
 @dataclass
@@ -312,13 +348,86 @@ class ParsedImport:
     is_relative: bool = False
 
 
+@dataclass
+class FunctionSignature:
+    """MinHash signature of a function body's token shingles."""
+    class_name: Optional[str]
+    function_name: str
+    line_start: int
+    line_end: int
+    token_count: int
+    signature: object = None  # array('I') of metrics.near_duplicates.NUM_HASHES values
+
+
+@dataclass
+class SourceFacts:
+    """Compact facts derived from a file's source in the per-file phase.
+
+    Dead code, package analysis and duplication read these instead of
+    the source, so sources can be dropped once Phase 1 is done.
+    """
+    # (line, uri) of every ``import`` / ``export`` of a ``package:`` URI
+    package_directives: list = field(default_factory=list)
+    # ``_name`` identifiers in code, and those plus ``$_name`` string
+    # interpolations (what the dead code identifier index is built from)
+    private_symbols: set = field(default_factory=set)
+    private_references: set = field(default_factory=set)
+    # Duplication tokens: the file's normalized token values, each token
+    # as an index into them, and the line of each token
+    dup_vocabulary: list = field(default_factory=list)
+    dup_ids: object = field(default_factory=list)  # array('H') or list of int
+    dup_lines: object = field(default_factory=list)  # array('I') or list of int
+    # MinHash signatures of the functions with enough body tokens for
+    # near-duplicate detection
+    function_signatures: list = field(default_factory=list)  # list of FunctionSignature
+
+
 @dataclass
 class ParsedFile:
-    """Complete parsed representation of a Dart file."""
+    """Complete parsed representation of a Dart file.
+
+    ``source`` is None for files whose source was dropped after the
+    per-file phase (``memory.drop_sources``); ``facts`` then carries
+    what later phases need.
+    """
     path: str
-    source: str
+    source: Optional[str]
     classes: list = field(default_factory=list)  # list of ParsedClass
     top_level_functions: list = field(default_factory=list)  # list of ParsedFunction
     imports: list = field(default_factory=list)  # list of ParsedImport
     loc: int = 0
     sloc: int = 0
+    tokens: Optional[object] = None  # parsers.dart_lexer.TokenStream of source
+    facts: Optional[SourceFacts] = None
+
+
+# ---------------------------------------------------------------------------
+# Per-file analysis record (parallel collection)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ClassEntry:
+    """Cross-file view of a class needed by the class index."""
+    name: str
+    superclass: Optional[str]
+    method_names: list = field(default_factory=list)
+
+
+@dataclass
+class FileAnalysis:
+    """Compact per-file result of parsing + per-file metric computation.
+
+    This is what a worker process sends back instead of the full
+    ``ParsedFile``: the metric records plus the few parsed facts later
+    phases still need (imports, LOC, class index entries, source facts).
+    ``class_entries`` is parallel to ``class_metrics``.
+    """
+    path: str
+    loc: int = 0
+    sloc: int = 0
+    imports: list = field(default_factory=list)  # list of ParsedImport
+    class_entries: list = field(default_factory=list)  # list of ClassEntry
+    function_metrics: list = field(default_factory=list)  # list of FunctionMetrics
+    class_metrics: list = field(default_factory=list)  # list of ClassMetrics
+    file_metrics: Optional[FileMetrics] = None
+    facts: Optional[SourceFacts] = None
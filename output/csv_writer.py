@@ -18,6 +18,7 @@ _FILE_HEADERS = [
     "dead_code_estimate",
     "wmfp", "wmfp_density", "fpy",
     "technical_debt_minutes", "td_per_loc",
+    "first_commit", "last_commit", "authors", "top_author_share",
 ]
 
 _FUNCTION_HEADERS = [
@@ -33,7 +34,7 @@ _CLASS_HEADERS = [
     "path", "module", "class_name",
     "line_start", "line_end",
     "cbo", "dit", "noam", "noii", "nom", "noom",
-    "rfc", "tcc", "woc", "wmc", "loc",
+    "rfc", "tcc", "lcom4", "woc", "wmc", "loc",
     "fpy",
     "technical_debt_minutes",
 ]
@@ -285,6 +285,19 @@ def write_risk_hotspots_json(risk_hotspots: list, output_dir: str) -> str:
     return path
 
 
+def write_function_risk_hotspots_json(function_hotspots: list, output_dir: str) -> str:
+    """Write function-level risk hotspots (churn × complexity) to JSON."""
+    path = os.path.join(output_dir, "function_risk_hotspots.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "generated_at": _now_iso(),
+        "count": len(function_hotspots),
+        "hotspots": [h.to_dict() for h in function_hotspots],
+    }
+    _write_json(path, data)
+    return path
+
+
 def write_dsm_json(dsm_result, output_dir: str) -> str:
     """Write Design Structure Matrix to JSON."""
     path = os.path.join(output_dir, "dsm.json")
@@ -309,6 +322,30 @@ def write_duplication_json(duplication_result, output_dir: str) -> str:
     return path
 
 
+def write_near_duplicates_json(near_duplicate_result, output_dir: str) -> str:
+    """Write near-duplicate function pairs to JSON."""
+    path = os.path.join(output_dir, "near_duplicates.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "generated_at": _now_iso(),
+        **near_duplicate_result.to_dict(),
+    }
+    _write_json(path, data)
+    return path
+
+
+def write_temporal_coupling_json(temporal_coupling_result, output_dir: str) -> str:
+    """Write temporal coupling (co-change) pairs to JSON."""
+    path = os.path.join(output_dir, "temporal_coupling.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "generated_at": _now_iso(),
+        **temporal_coupling_result.to_dict(),
+    }
+    _write_json(path, data)
+    return path
+
+
 def write_delta_json(snapshot_delta, output_dir: str) -> str:
     """Write snapshot delta (diff) to JSON."""
     path = os.path.join(output_dir, "delta.json")
@@ -6,6 +6,7 @@ import os
 from datetime import datetime, timezone
 from typing import List
 
+from ..metrics.table import MetricsTable
 from ..models import (
     ClassMetrics,
     FileMetrics,
@@ -18,11 +19,13 @@ from ..models import (
 
 def write_module_summary_md(
     module_summary: ModuleSummary,
-    function_metrics: List[FunctionMetrics],
-    class_metrics: List[ClassMetrics],
+    table: MetricsTable,
     output_dir: str,
 ) -> str:
-    """Write module summary as a Markdown report."""
+    """Write module summary as a Markdown report.
+
+    *table* holds the module's metrics (``MetricsTable.module``).
+    """
     safe_name = module_summary.module.replace("/", "_").replace("\\", "_")
     path = os.path.join(output_dir, "modules", f"{safe_name}_summary.md")
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -85,7 +88,7 @@ def write_module_summary_md(
     # Top hotspots
     lines.append("## Hotspots (Top-10 by CC)\n")
     top_cyclo = sorted(
-        [f for f in function_metrics if f.module == ms.module],
+        table.functions,
         key=lambda f: f.cyclo, reverse=True,
     )[:10]
 
@@ -104,7 +107,7 @@ def write_module_summary_md(
     # Top classes by WMC
     lines.append("## Complex Classes (Top-10 by WMC)\n")
     top_wmc = sorted(
-        [c for c in class_metrics if c.module == ms.module],
+        table.classes,
         key=lambda c: c.wmc, reverse=True,
     )[:10]
 
@@ -307,12 +310,12 @@ def write_hotspots_md(
         [c for c in class_metrics if c.nom >= 2],
         key=lambda c: c.tcc,
     )[:top_n]
-    lines.append("| # | Class | Module | TCC | WOC | NOM | WMC | LOC |")
-    lines.append("|---|---|---|---|---|---|---|---|")
+    lines.append("| # | Class | Module | TCC | LCOM4 | WOC | NOM | WMC | LOC |")
+    lines.append("|---|---|---|---|---|---|---|---|---|")
     for i, c in enumerate(low_tcc, 1):
         lines.append(
-            f"| {i} | `{c.class_name}` | `{c.module}` | {c.tcc:.3f} | {c.woc:.3f} "
-            f"| {c.nom} | {c.wmc} | {c.loc} |"
+            f"| {i} | `{c.class_name}` | `{c.module}` | {c.tcc:.3f} | {c.lcom4} "
+            f"| {c.woc:.3f} | {c.nom} | {c.wmc} | {c.loc} |"
         )
     lines.append("")
 
@@ -541,6 +544,19 @@ def write_package_analysis_md(
                 lines.append(f"| `{_short_path(gh.file_path)}` | {gh.commit_count} |")
             lines.append("")
 
+        # Ownership
+        if pa.ownership and pa.ownership.files:
+            own = pa.ownership
+            lines.append("### Ownership\n")
+            lines.append(f"Bus factor: **{own.bus_factor}** "
+                         f"({own.authors} authors, {own.single_author_files} of "
+                         f"{own.files} files with a single author)\n")
+            lines.append("| Author | Files Owned | Share | Commits |")
+            lines.append("|---|---|---|---|")
+            for o in own.top_owners:
+                lines.append(f"| {o.author} | {o.files_owned} | {o.share:.0%} | {o.commits} |")
+            lines.append("")
+
         lines.append("---\n")
 
     with open(path, "w", encoding="utf-8") as fh:
@@ -667,7 +683,7 @@ def write_duplication_md(duplication_result, output_dir: str) -> str:
         f"- **Total tokens analysed:** {dr.total_tokens:,}",
         f"- **Duplicated tokens:** {dr.duplicated_tokens:,}",
         f"- **Duplication percentage:** {dr.duplication_pct:.1f}%",
-        f"- **Duplicate pairs found:** {len(dr.duplicate_pairs)}",
+        f"- **Clone classes found:** {len(dr.clone_classes)}",
         "",
     ]
 
@@ -680,18 +696,25 @@ def write_duplication_md(duplication_result, output_dir: str) -> str:
             lines.append(f"| `{fp}` | {pct:.1f}% |")
         lines.append("")
 
-    if dr.duplicate_pairs:
-        lines.append("## Top Duplicate Pairs\n")
-        lines.append("| File A | Lines A | File B | Lines B | Tokens |")
-        lines.append("|---|---|---|---|---:|")
-        for dp in dr.duplicate_pairs[:30]:
-            a = dp.block_a
-            b = dp.block_b
-            lines.append(
-                f"| `{a.path}` | {a.line_start}-{a.line_end} "
-                f"| `{b.path}` | {b.line_start}-{b.line_end} "
-                f"| {dp.token_count} |"
+    if dr.clone_classes:
+        lines.append("## Top Clone Classes\n")
+        lines.append("| # | Tokens | Lines | Locations |")
+        lines.append("|---:|---:|---:|---|")
+        for i, cc in enumerate(dr.clone_classes[:30], 1):
+            locations = "<br>".join(
+                f"`{b.path}` {b.line_start}-{b.line_end}" for b in cc.locations
             )
+            lines.append(f"| {i} | {cc.token_count} | {cc.line_count} | {locations} |")
+        lines.append("")
+
+    if any(any(row) for row in dr.clone_matrix):
+        lines.append("## Cross-Module Clone Matrix\n")
+        lines.append("Cell (row, col) = clone classes with locations in both modules; "
+                     "the diagonal counts classes within one module.\n")
+        lines.append("| Module | " + " | ".join(dr.modules) + " |")
+        lines.append("|---|" + "---:|" * len(dr.modules))
+        for name, row in zip(dr.modules, dr.clone_matrix):
+            lines.append(f"| **{name}** | " + " | ".join(str(v) if v else "·" for v in row) + " |")
         lines.append("")
 
     with open(path, "w", encoding="utf-8") as fh:
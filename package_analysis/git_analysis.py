@@ -1,15 +1,857 @@
 """Git history analysis for packages.
 
-Detects files with the most git changes (hotspots by change frequency).
+Detects files with the most git changes (hotspots by change frequency),
+and file age and ownership (:class:`OwnershipIndex`).
+
+Each kind of history is read in one pass: :meth:`ChurnIndex.from_git`
+streams a single ``git log --numstat`` over the ``--git-since`` window
+and every consumer (package hotspots, risk hotspots) queries the
+resulting index; :meth:`OwnershipIndex.from_git` does the same with
+``git log --name-status`` over the whole history.  Saved with the
+commit they were read up to, both indexes are brought up to date on
+later runs by reading only the commits added since.
 """
 
 from __future__ import annotations
 
 import os
+import pickle
 import subprocess
-from typing import List, Optional
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import FileOwner, GitHotspot, ModuleOwnership
+
+# Marks the start of a commit header in ``git log`` output (``%x01`` in --format)
+_COMMIT_MARK = "\x01"
+
+# Bump whenever the layout or the counting of a saved index changes
+_INDEX_FORMAT = 2
+
+
+@dataclass
+class FileChurn:
+    """Change history of one file since the ``--git-since`` date."""
+    commits: int = 0
+    added: int = 0  # lines added, summed over commits
+    deleted: int = 0  # lines deleted, summed over commits
+    last_commit: str = ""  # ISO author date of the newest commit
+
+
+class ChurnIndex:
+    """Per-file churn from one pass over the git history.
+
+    ``files`` maps repository paths, relative to the analyzed root, to
+    their :class:`FileChurn`, in the order git first reports them (most
+    recently changed first).  Renamed files are counted under their new
+    name.  ``commit_log`` keeps, newest first, the paths each commit
+    changed and the renames it made, for :meth:`commit_files`.  ``head``
+    is the commit the history was read up to, ``git_head`` its
+    ``(short commit hash, branch)`` as :func:`read_git_head` reports
+    them; ``new_commits`` counts the commits read from git in this run.
+    """
+
+    def __init__(self, since: str):
+        self.since = since
+        self.files: Dict[str, FileChurn] = {}
+        self.commit_log: List[Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]] = []
+        self.commits = 0
+        self.head = ""
+        self.git_head: Tuple[str, str] = ("", "")
+        self.new_commits = 0
+        self._dirty = False
+
+    @classmethod
+    def from_git(
+        cls,
+        repo_root: str,
+        since: str,
+        previous: Optional["ChurnIndex"] = None,
+    ) -> "ChurnIndex":
+        """Build the index from ``git log``; empty if *repo_root* has no git history.
+
+        *previous* (see :meth:`load`) is reused as-is when HEAD has not
+        moved, and extended with only the new commits when HEAD descends
+        from its ``head``.  After a history rewrite, a different *since*,
+        or with a relative *since* ("6 months ago", whose window moves
+        every day) the history is read in full.
+        """
+        head, short_head, branch = _git_head(repo_root)
+        if not head:
+            return cls(since)
+
+        base = None
+        if (
+            previous is not None
+            and previous.head
+            and previous.since == since
+            and _is_fixed_date(since)
+        ):
+            if previous.head == head:
+                previous.new_commits = 0
+                previous.git_head = (short_head, branch)
+                return previous
+            if _is_ancestor(repo_root, previous.head, head):
+                base = previous
+
+        index = cls(since)
+        index.head = head
+        index.git_head = (short_head, branch)
+        index._dirty = True
+        try:
+            index.add_log(_git_log_fields(repo_root, [
+                "-z", "--numstat", "-M", "--relative", f"--since={since}",
+                "--format=%x01%H%x00%aI",
+                f"{base.head}..{head}" if base is not None else head,
+            ]))
+        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+            return cls(since)
+        index.new_commits = index.commits
+        if base is not None:
+            index.add_older(base)
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ChurnIndex"]:
+        """Load an index saved by :meth:`save`; None if missing, corrupt or stale."""
+        data = _read_index(path)
+        if data is None:
+            return None
+        index = cls(data["since"])
+        index.files = data["files"]
+        index.commit_log = data["commit_log"]
+        index.commits = data["commits"]
+        index.head = data["head"]
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the index to *path* unless it was loaded from there unchanged."""
+        if not self._dirty and os.path.exists(path):
+            return
+        _write_index(path, {
+            "since": self.since,
+            "head": self.head,
+            "commits": self.commits,
+            "files": self.files,
+            "commit_log": self.commit_log,
+        })
+        self._dirty = False
+
+    def add_log(self, fields: Iterable[str]) -> None:
+        """Count the commits of a ``git log -z --numstat`` stream, newest first."""
+        date = None
+        changes: List[Tuple[str, int, int]] = []
+        renames: List[Tuple[str, str]] = []
+        fields = iter(fields)
+        for item in fields:
+            item = item.lstrip("\n")
+            if item.startswith(_COMMIT_MARK):
+                if date is not None:
+                    self.add_commit(date, changes, renames)
+                date = next(fields, "")
+                changes = []
+                renames = []
+                continue
+            parts = item.split("\t", 2)
+            if len(parts) != 3:
+                continue
+            added, deleted, path = parts
+            if not path:  # rename: source and destination paths follow
+                old_path = next(fields, "")
+                path = next(fields, "")
+                renames.append((old_path, path))
+            changes.append((path, _line_count(added), _line_count(deleted)))
+        if date is not None:
+            self.add_commit(date, changes, renames)
 
-from .models import GitHotspot
+    def add_commit(
+        self,
+        date: str,
+        changes: Iterable[Tuple[str, int, int]],
+        renames: Iterable[Tuple[str, str]] = (),
+    ) -> None:
+        """Count one commit touching *changes* ``(path, added, deleted)``
+        and renaming files ``(old path, new path)``."""
+        changes = list(changes)
+        self.commits += 1
+        self.commit_log.append((tuple(path for path, _, _ in changes), tuple(renames)))
+        for path, added, deleted in changes:
+            churn = self.files.get(path)
+            if churn is None:
+                churn = self.files[path] = FileChurn(last_commit=date)
+            churn.commits += 1
+            churn.added += added
+            churn.deleted += deleted
+
+    def add_older(self, older: "ChurnIndex") -> None:
+        """Merge in *older*, the churn of the history preceding this index's commits."""
+        for path, old in older.files.items():
+            churn = self.files.get(path)
+            if churn is None:
+                self.files[path] = FileChurn(
+                    old.commits, old.added, old.deleted, old.last_commit,
+                )
+            else:
+                churn.commits += old.commits
+                churn.added += old.added
+                churn.deleted += old.deleted
+        self.commits += older.commits
+        self.commit_log.extend(older.commit_log)
+
+    def commit_files(self) -> Iterator[List[str]]:
+        """Paths changed by each commit, newest first, as named in HEAD.
+
+        Renames are followed: a change to a file's earlier name is
+        reported under its current name, and a path's history from
+        before another file was renamed onto it is dropped.  Merge
+        commits report no paths.
+        """
+        # Past path -> its HEAD path, or None for history of another file
+        current: Dict[str, Optional[str]] = {}
+        for paths, renames in self.commit_log:
+            files = list(dict.fromkeys(
+                head_path for head_path in (current.get(path, path) for path in paths)
+                if head_path is not None
+            ))
+            yield files
+            # All at once, so that files swapping names keep their own history
+            moved = [(old_path, current.get(new_path, new_path)) for old_path, new_path in renames]
+            for _, new_path in renames:
+                current[new_path] = None  # did not exist before the rename
+            for old_path, head_path in moved:
+                current[old_path] = head_path
+
+    def commit_counts(self, paths: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """``path -> commit count`` for *paths* (default: all changed files)."""
+        if paths is None:
+            return {path: churn.commits for path, churn in self.files.items()}
+        counts: Dict[str, int] = {}
+        for path in paths:
+            churn = self.files.get(path)
+            if churn is not None:
+                counts[path] = churn.commits
+        return counts
+
+    def hotspots(self, directory: str, top_n: int, suffix: str = ".dart") -> List[GitHotspot]:
+        """Most changed files under *directory* (relative to the root)."""
+        prefix = directory.replace(os.sep, "/").rstrip("/") + "/"
+        hotspots = [
+            GitHotspot(file_path=path, commit_count=churn.commits)
+            for path, churn in self.files.items()
+            if path.startswith(prefix) and path.endswith(suffix)
+        ]
+        hotspots.sort(key=lambda h: h.commit_count, reverse=True)
+        return hotspots[:top_n]
+
+
+def _read_index(path: str) -> Optional[dict]:
+    """Contents of an index file written by :func:`_write_index`; None if
+    missing, corrupt or of another format."""
+    try:
+        with open(path, "rb") as fh:
+            data = pickle.load(fh)
+    except Exception:
+        return None
+    if not (
+        isinstance(data, dict)
+        and data.get("format") == _INDEX_FORMAT
+        and isinstance(data.get("files"), dict)
+    ):
+        return None
+    return data
+
+
+def _write_index(path: str, data: dict) -> None:
+    """Atomically pickle *data* (tagged with ``_INDEX_FORMAT``) to *path*."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        pickle.dump({"format": _INDEX_FORMAT, **data}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _line_count(value: str) -> int:
+    # numstat reports "-" for binary files
+    return int(value) if value.isdigit() else 0
+
+
+def _is_fixed_date(since: str) -> bool:
+    try:
+        datetime.fromisoformat(since)
+    except ValueError:
+        return False
+    return True
+
+
+def _git_head(repo_root: str) -> Tuple[str, str, str]:
+    """``(full hash, short hash, branch)`` of HEAD; empty strings outside a
+    repository or before the first commit.
+
+    The branch is ``"HEAD"`` for a detached HEAD, as with
+    ``git rev-parse --abbrev-ref HEAD``.
+    """
+    try:
+        r = subprocess.run(
+            ["git", "-C", repo_root, "log", "-1", "--format=%H%x00%h%x00%D"],
+            capture_output=True, text=True, timeout=5,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+        return "", "", ""
+    parts = r.stdout.strip().split("\0")
+    if r.returncode != 0 or len(parts) != 3:
+        return "", "", ""
+    head, short_head, refs = parts
+    branch = "HEAD"
+    for ref in refs.split(", "):
+        if ref.startswith("HEAD -> "):
+            branch = ref[len("HEAD -> "):]
+    return head, short_head, branch
+
+
+def _is_ancestor(repo_root: str, commit: str, head: str) -> bool:
+    try:
+        r = subprocess.run(
+            ["git", "-C", repo_root, "merge-base", "--is-ancestor", commit, head],
+            capture_output=True, timeout=30,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+        return False
+    return r.returncode == 0
+
+
+def _git_log_fields(repo_root: str, args: List[str], sep: bytes = b"\0") -> Iterator[str]:
+    """Fields of ``git log`` output split at *sep* (NUL for ``-z``, or
+    newline), read from the pipe as they arrive.
+
+    Raises ``CalledProcessError`` once the stream is exhausted if git
+    failed, so a partial history is never mistaken for a complete one.
+    """
+    cmd = ["git", "-C", repo_root, "log", *args]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    tail = b""
+    try:
+        for chunk in iter(lambda: proc.stdout.read(1 << 16), b""):
+            parts = (tail + chunk).split(sep)
+            tail = parts.pop()
+            for part in parts:
+                yield part.decode("utf-8", "surrogateescape")
+        if tail:
+            yield tail.decode("utf-8", "surrogateescape")
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+# ---------------------------------------------------------------------------
+# File age and ownership
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FileOwnership:
+    """Whole-history authorship of one file (under all its past names)."""
+    first_commit: str = ""  # ISO author date of the oldest commit
+    last_commit: str = ""  # ISO author date of the newest commit
+    commits: int = 0
+    authors: Dict[str, int] = field(default_factory=dict)  # author -> commits
+
+    @property
+    def top_author(self) -> str:
+        """Author of the most commits (ties: the alphabetically first)."""
+        if not self.authors:
+            return ""
+        return min(self.authors.items(), key=lambda kv: (-kv[1], kv[0]))[0]
+
+    @property
+    def top_author_share(self) -> float:
+        """Share of the commits made by :attr:`top_author`."""
+        if not self.commits:
+            return 0.0
+        return self.authors[self.top_author] / self.commits
+
+
+class OwnershipIndex:
+    """Age and authors of every file from one pass over the whole history.
+
+    ``files`` maps current paths, relative to the analyzed root, to their
+    :class:`FileOwnership`.  Renames are followed as with ``--follow``:
+    commits to a file's earlier names count for its current name, and
+    history of a path from before it was (re-)added or after it was
+    deleted does not.  Authors are ``%aN``, so ``.mailmap`` applies.
+    Merge commits are not counted.  ``head`` and ``new_commits`` are as
+    for :class:`ChurnIndex`.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, FileOwnership] = {}
+        self.head = ""
+        self.new_commits = 0
+        self._dirty = False
+        # Past path -> its current path, or None for history of another
+        # file; only meaningful while reading
+        self._current: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def from_git(
+        cls,
+        repo_root: str,
+        previous: Optional["OwnershipIndex"] = None,
+    ) -> "OwnershipIndex":
+        """Build the index from ``git log``; empty if *repo_root* has no git history.
+
+        *previous* (see :meth:`load`) is reused as-is when HEAD has not
+        moved, and extended with only the new commits when HEAD descends
+        from its ``head``; otherwise the history is read in full.
+        """
+        head = _git_head(repo_root)[0]
+        if not head:
+            return cls()
+
+        base = None
+        if previous is not None and previous.head:
+            if previous.head == head:
+                previous.new_commits = 0
+                return previous
+            if _is_ancestor(repo_root, previous.head, head):
+                base = previous
+
+        index = cls()
+        index.head = head
+        index._dirty = True
+        try:
+            index.add_log(_git_log_fields(repo_root, [
+                "-z", "--name-status", "-M", "--relative",
+                "--format=%x01%aI%x00%aN",
+                f"{base.head}..{head}" if base is not None else head,
+            ]))
+        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+            return cls()
+        if base is not None:
+            index.add_older(base)
+        index._current = {}
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> Optional["OwnershipIndex"]:
+        """Load an index saved by :meth:`save`; None if missing, corrupt or stale."""
+        data = _read_index(path)
+        if data is None:
+            return None
+        index = cls()
+        index.files = data["files"]
+        index.head = data["head"]
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the index to *path* unless it was loaded from there unchanged."""
+        if not self._dirty and os.path.exists(path):
+            return
+        _write_index(path, {"head": self.head, "files": self.files})
+        self._dirty = False
+
+    def add_log(self, fields: Iterable[str]) -> None:
+        """Count the commits of a ``git log -z --name-status -M`` stream, newest first."""
+        current = self._current
+        date = author = ""
+        fields = iter(fields)
+        for item in fields:
+            item = item.lstrip("\n")
+            if item.startswith(_COMMIT_MARK):
+                date = item[len(_COMMIT_MARK):]
+                author = next(fields, "")
+                self.new_commits += 1
+                continue
+            if not item:
+                continue
+            status = item[0]
+            path = next(fields, "")
+            if status in "RC":
+                new_path = next(fields, "")
+                head_path = current.get(new_path, new_path)
+                if status == "R":
+                    current[new_path] = None  # did not exist before the rename
+                    current[path] = head_path
+            elif status == "D":
+                current.setdefault(path, None)  # the deleted file is not in HEAD
+                continue
+            else:
+                head_path = current.get(path, path)
+                if status == "A":
+                    current[path] = None
+            if head_path is None:
+                continue
+            own = self.files.get(head_path)
+            if own is None:
+                own = self.files[head_path] = FileOwnership(last_commit=date)
+            own.first_commit = date
+            own.commits += 1
+            own.authors[author] = own.authors.get(author, 0) + 1
+
+    def add_older(self, older: "OwnershipIndex") -> None:
+        """Merge in *older*, the ownership at the commit this index's log started from.
+
+        Paths of *older* are carried through the renames, additions and
+        deletions just read.
+        """
+        for path, old in older.files.items():
+            head_path = self._current.get(path, path)
+            if head_path is None:
+                continue
+            own = self.files.get(head_path)
+            if own is None:
+                self.files[head_path] = FileOwnership(
+                    old.first_commit, old.last_commit, old.commits, dict(old.authors),
+                )
+                continue
+            own.first_commit = old.first_commit
+            own.commits += old.commits
+            for author, commits in old.authors.items():
+                own.authors[author] = own.authors.get(author, 0) + commits
+
+
+def summarize_ownership(
+    paths: Iterable[str],
+    owners: Dict[str, FileOwnership],
+    top_n: int = 5,
+) -> ModuleOwnership:
+    """Roll the ownership of a module's *paths* up to the module.
+
+    Each file is owned by its top author.  The bus factor is the fewest
+    authors who together own more than half of the files with history:
+    how many people could leave before most of the module has no one
+    who wrote most of it.
+    """
+    summary = ModuleOwnership()
+    authors = set()
+    owned: Dict[str, int] = {}
+    commits: Dict[str, int] = {}
+    for path in paths:
+        own = owners.get(path)
+        if own is None or not own.commits:
+            continue
+        summary.files += 1
+        authors.update(own.authors)
+        if len(own.authors) == 1:
+            summary.single_author_files += 1
+        top = own.top_author
+        owned[top] = owned.get(top, 0) + 1
+        commits[top] = commits.get(top, 0) + own.authors[top]
+    summary.authors = len(authors)
+
+    ranked = sorted(owned.items(), key=lambda kv: (-kv[1], kv[0]))
+    covered = 0
+    for author, files in ranked:
+        if covered * 2 > summary.files:
+            break
+        covered += files
+        summary.bus_factor += 1
+    summary.top_owners = [
+        FileOwner(
+            author=author,
+            files_owned=files,
+            share=files / summary.files,
+            commits=commits[author],
+        )
+        for author, files in ranked[:top_n]
+    ]
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Changed lines per commit, in HEAD's line numbers
+# ---------------------------------------------------------------------------
+
+# A line map sends line numbers of some past version of a file to line
+# numbers in HEAD: sorted, disjoint ``(first, last, offset, anchor)``
+# segments.  With ``anchor`` None, line ``n`` of a segment is line
+# ``n + offset`` in HEAD.  Lines rewritten or removed by a later commit
+# have no such counterpart; their segment's ``anchor`` is the HEAD range
+# ``(lo, hi)`` that replaced them (``(n, n - 1)``, the point before HEAD
+# line ``n``, when nothing did), so changes to them still count for the
+# code now standing in their place.  Each past path keeps
+# ``(path in HEAD, line map)``.
+_LAST_LINE = 1 << 62
+_SAME_AS_HEAD = [(1, _LAST_LINE, 0, None)]
+_NOT_IN_HEAD: Tuple[str, list] = ("", [])
+
+
+def read_changed_lines(
+    repo_root: str,
+    since: str,
+) -> Iterator[Dict[str, List[Tuple[int, int]]]]:
+    """Changed line ranges of each commit since *since*, newest first.
+
+    Streams one ``git log -p --unified=0`` along the first-parent chain
+    (a merge counts once, with its diff against the mainline) and yields
+    ``path -> [(first, last), ...]`` per commit.  Paths and ranges are
+    translated into HEAD's paths and line numbers through the renames
+    and line shifts of every newer commit, so they can be matched
+    against the current code.  Lines a newer commit rewrote are reported
+    as the HEAD lines that replaced them, so every edit of a line counts,
+    not only the last.  A pure deletion between HEAD lines ``n - 1`` and
+    ``n`` is reported as ``(n, n - 1)``.  Only ``.dart`` files are read.
+    Paths are relative to *repo_root*.  Yields nothing outside a git
+    repository.
+    """
+    lines = _git_log_fields(repo_root, [
+        "-p", "--unified=0", "-m", "--first-parent", "--relative",
+        "--no-color", "--no-ext-diff", "--no-textconv",
+        "--src-prefix=a/", "--dst-prefix=b/",
+        f"--since={since}", "--format=%x01%H",
+        "--", "*.dart",
+    ], sep=b"\n")
+    maps: Dict[str, Tuple[str, list]] = {}
+    sections: List[tuple] = []
+    section: Optional[list] = None  # [old path, new path, hunks]
+    pending_old = pending_new = 0
+    try:
+        for line in lines:
+            if pending_old or pending_new:
+                # Hunk body; counting keeps "+++ "/"--- " content apart from headers
+                if line[:1] == "-":
+                    pending_old -= 1
+                elif line[:1] == "+":
+                    pending_new -= 1
+                elif line[:1] == " ":
+                    pending_old -= 1
+                    pending_new -= 1
+                continue
+            if line.startswith("@@ ") and section is not None:
+                hunk = _parse_hunk_header(line)
+                if hunk is not None:
+                    section[2].append(hunk)
+                    pending_old, pending_new = hunk[1], hunk[3]
+            elif line.startswith(_COMMIT_MARK):
+                if sections:
+                    yield _apply_commit(sections, maps)
+                sections = []
+                section = None
+            elif line.startswith("diff --git "):
+                path = _header_path(line[len("diff --git "):])
+                section = [path, path, []]
+                sections.append(section)
+            elif section is None:
+                continue
+            elif line.startswith("new file mode "):
+                section[0] = None
+            elif line.startswith("deleted file mode "):
+                section[1] = None
+            elif line.startswith("--- "):
+                section[0] = _patch_path(line[4:], "a/")
+            elif line.startswith("+++ "):
+                section[1] = _patch_path(line[4:], "b/")
+            elif line.startswith("rename from "):
+                section[0] = line[len("rename from "):]
+            elif line.startswith("rename to "):
+                section[1] = line[len("rename to "):]
+        if sections:
+            yield _apply_commit(sections, maps)
+    except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+        return
+
+
+def _header_path(text: str) -> Optional[str]:
+    """Path of a ``diff --git a/<path> b/<path>`` header naming one path.
+
+    Empty files added or deleted get no ``---`` / ``+++`` lines, so the
+    header is all that names them.  None for renames and quoted paths,
+    which the lines that follow name.
+    """
+    half = (len(text) - 1) // 2
+    if text[half:half + 1] != " " or not text.startswith("a/"):
+        return None
+    old, new = text[2:half], text[half + 3:]
+    return old if old == new and text[half + 1:half + 3] == "b/" else None
+
+
+def _patch_path(text: str, prefix: str) -> Optional[str]:
+    """Path of a ``---`` / ``+++`` line; None for ``/dev/null``."""
+    text = text.rstrip("\t")
+    if text.startswith('"') and text.endswith('"'):
+        text = text[1:-1]
+    if text.startswith(prefix):
+        return text[len(prefix):]
+    return None
+
+
+def _parse_hunk_header(line: str) -> Optional[Tuple[int, int, int, int]]:
+    """``(old first, old count, new first, new count)`` of ``@@ -a,b +c,d @@``."""
+    parts = line.split(" ", 3)
+    if len(parts) < 3:
+        return None
+    try:
+        old_first, _, old_count = parts[1][1:].partition(",")
+        new_first, _, new_count = parts[2][1:].partition(",")
+        return (
+            int(old_first), int(old_count) if old_count else 1,
+            int(new_first), int(new_count) if new_count else 1,
+        )
+    except ValueError:
+        return None
+
+
+def _apply_commit(
+    sections: List[tuple],
+    maps: Dict[str, Tuple[str, list]],
+) -> Dict[str, List[Tuple[int, int]]]:
+    """HEAD ranges changed by one commit; moves *maps* to the commit's parent."""
+    changed: Dict[str, List[Tuple[int, int]]] = {}
+    parent_maps: List[Tuple[str, Tuple[str, list]]] = []
+    for old_path, new_path, hunks in sections:
+        if new_path is None:
+            if old_path is not None:
+                # Deleted: nothing of the parent's file survives in HEAD
+                parent_maps.append((old_path, _NOT_IN_HEAD))
+            continue
+        head_path, line_map = maps.get(new_path) or (new_path, _SAME_AS_HEAD)
+        ranges = _map_hunks(hunks, line_map)
+        if ranges:
+            changed.setdefault(head_path, []).extend(ranges)
+        if old_path != new_path:
+            parent_maps.append((new_path, _NOT_IN_HEAD))
+        if old_path is not None:
+            parent_maps.append((old_path, (head_path, _compose(hunks, line_map))))
+    # Vacated paths first, so a rename onto another renamed path wins
+    parent_maps.sort(key=lambda item: item[1] is not _NOT_IN_HEAD)
+    for path, entry in parent_maps:
+        maps[path] = entry
+    return changed
+
+
+def _map_hunks(
+    hunks: List[Tuple[int, int, int, int]],
+    line_map: list,
+) -> List[Tuple[int, int]]:
+    """HEAD ranges of the new-side lines of *hunks*."""
+    ranges: List[Tuple[int, int]] = []
+    for _, _, first, count in hunks:
+        if count:
+            ranges.extend(_map_range(first, first + count - 1, line_map))
+        else:
+            ranges.extend(_map_gap(first, line_map))
+    return ranges
+
+
+def _map_range(first: int, last: int, line_map: list) -> List[Tuple[int, int]]:
+    """HEAD ranges of lines *first*..*last*, in order, touching ranges merged."""
+    ranges: List[Tuple[int, int]] = []
+    i = max(bisect_right(line_map, (first, _LAST_LINE + 1)) - 1, 0)
+    while i < len(line_map) and line_map[i][0] <= last:
+        seg_first, seg_last, offset, anchor = line_map[i]
+        lo, hi = max(first, seg_first), min(last, seg_last)
+        if lo <= hi:
+            span = anchor if anchor is not None else (lo + offset, hi + offset)
+            if ranges and ranges[-1][0] <= span[0] <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], span[1]))
+            else:
+                ranges.append(span)
+        i += 1
+    return ranges
+
+
+def _map_gap(line: int, line_map: list) -> List[Tuple[int, int]]:
+    """HEAD ranges of a deletion after *line* (0: at the start of the file).
+
+    The point between its neighbours when both survive unchanged and
+    adjacent in HEAD; otherwise where the neighbours went.
+    """
+    if not line_map:
+        return []
+    before = _map_line(line, line_map) if line else (0, None)
+    after = _map_line(line + 1, line_map)
+    if before[1] is None and after[1] is None and after[0] == before[0] + 1:
+        return [(after[0], before[0])]
+    ranges = [before[1] or (before[0], before[0])] if line else []
+    span = after[1] or (after[0], after[0])
+    if not ranges or ranges[-1] != span:
+        ranges.append(span)
+    return ranges
+
+
+def _map_line(line: int, line_map: list) -> Tuple[int, Optional[Tuple[int, int]]]:
+    """``(HEAD line, None)`` for a line kept as-is, else ``(0, its anchor)``."""
+    i = bisect_right(line_map, (line, _LAST_LINE + 1)) - 1
+    if i >= 0:
+        first, last, offset, anchor = line_map[i]
+        if first <= line <= last:
+            return (line + offset, None) if anchor is None else (0, anchor)
+    return 0, (0, -1)  # unreachable: non-empty line maps cover every line
+
+
+def _cover(ranges: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Smallest range holding all *ranges* (points included); None if empty."""
+    if not ranges:
+        return None
+    return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+
+def _compose(
+    hunks: List[Tuple[int, int, int, int]],
+    line_map: list,
+) -> list:
+    """Line map of the parent version: the commit's own changes, then *line_map*.
+
+    Parent lines the commit kept follow *line_map* through the commit's
+    shift; parent lines it replaced or removed are anchored to the HEAD
+    range of what replaced them (or of the point where they were removed).
+    """
+    composed: list = []
+
+    def add(first: int, last: int, offset: int, anchor: Optional[Tuple[int, int]]) -> None:
+        if composed:
+            p_first, p_last, p_offset, p_anchor = composed[-1]
+            if p_last == first - 1 and p_anchor == anchor and (
+                anchor is not None or p_offset == offset
+            ):
+                composed[-1] = (p_first, last, p_offset, p_anchor)
+                return
+        composed.append((first, last, offset, anchor))
+
+    def keep(first: int, last: int, shift: int) -> None:
+        # Parent lines first..last are child lines first+shift..last+shift
+        lo, hi = first + shift, last + shift
+        j = max(bisect_right(line_map, (lo, _LAST_LINE + 1)) - 1, 0)
+        while j < len(line_map) and line_map[j][0] <= hi:
+            map_first, map_last, offset, anchor = line_map[j]
+            a, b = max(lo, map_first), min(hi, map_last)
+            if a <= b:
+                add(a - shift, b - shift, shift + offset, anchor)
+            j += 1
+
+    first, shift = 1, 0
+    for old_first, old_count, new_first, new_count in sorted(hunks):
+        if old_count == 0:
+            # Insertion after line old_first: parent lines only shift
+            if first <= old_first:
+                keep(first, old_first, shift)
+            first = max(first, old_first + 1)
+        else:
+            if first < old_first:
+                keep(first, old_first - 1, shift)
+            if new_count:
+                replaced = _map_range(new_first, new_first + new_count - 1, line_map)
+            else:
+                replaced = _map_gap(new_first, line_map)
+            anchor = _cover(replaced)
+            if anchor is not None:
+                add(old_first, old_first + old_count - 1, 0, anchor)
+            first = max(first, old_first + old_count)
+        shift += new_count - old_count
+    keep(first, _LAST_LINE, shift)
+    return composed
+
+
+def read_git_head(repo_root: str) -> Tuple[str, str]:
+    """``(short commit hash, branch)`` of HEAD; empty strings outside a repository.
+
+    The branch is ``"HEAD"`` for a detached HEAD.  :attr:`ChurnIndex.git_head`
+    holds the same pair without another git call.
+    """
+    _, commit, branch = _git_head(repo_root)
+    return commit, branch
 
 
 def get_git_hotspots(
@@ -18,6 +860,7 @@ def get_git_hotspots(
     since: str = "2025-01-01",
     top_n: int = 15,
     file_pattern: str = "*.dart",
+    churn_index: Optional[ChurnIndex] = None,
 ) -> List[GitHotspot]:
     """Find files with the most git commits since a given date.
 
@@ -27,6 +870,8 @@ def get_git_hotspots(
         since: Date string for --since flag (e.g. "2025-01-01").
         top_n: Maximum number of hotspots to return.
         file_pattern: File pattern to filter (default: *.dart).
+        churn_index: History already read for *repo_root* and *since*;
+            read from git when omitted.
 
     Returns:
         List of GitHotspot sorted by commit_count descending.
@@ -35,45 +880,11 @@ def get_git_hotspots(
     if not os.path.isdir(lib_dir):
         return []
 
-    try:
-        # Get list of changed files using git log
-        result = subprocess.run(
-            [
-                "git", "-C", repo_root,
-                "log",
-                "--format=format:",
-                "--name-only",
-                f"--since={since}",
-                "--",
-                os.path.relpath(lib_dir, repo_root),
-            ],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode != 0:
-            return []
-
-        # Count occurrences of each file
-        file_counts: dict = {}
-        for line in result.stdout.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            if not line.endswith('.dart'):
-                continue
-            file_counts[line] = file_counts.get(line, 0) + 1
-
-        # Sort and limit
-        hotspots = [
-            GitHotspot(file_path=path, commit_count=count)
-            for path, count in file_counts.items()
-        ]
-        hotspots.sort(key=lambda h: h.commit_count, reverse=True)
-        return hotspots[:top_n]
-
-    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-        return []
+    if churn_index is None:
+        churn_index = ChurnIndex.from_git(repo_root, since)
+    return churn_index.hotspots(
+        os.path.relpath(lib_dir, repo_root), top_n, suffix=file_pattern.lstrip("*"),
+    )
 
 
 def get_git_file_age(
@@ -82,7 +893,8 @@ def get_git_file_age(
 ) -> Optional[str]:
     """Get the date of the first commit for a file.
 
-    Returns ISO date string or None.
+    Returns ISO date string or None.  Runs one ``git log`` per call; for
+    many files use :class:`OwnershipIndex`, which reads the history once.
     """
     try:
         result = subprocess.run(
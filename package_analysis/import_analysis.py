@@ -8,11 +8,37 @@ from __future__ import annotations
 
 import re
 from collections import defaultdict
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 
 from ..models import ParsedFile, ParsedImport
 from .models import CrossPackageImport, ImportStatistics, ShotgunSurgeryCandidate
 
+_RE_URI = re.compile(r"['\"]([^'\"]+)['\"]")
+
+
+def find_package_directives(source: str) -> List[Tuple[int, str]]:
+    """``(line_number, uri)`` of each import/export of a ``package:`` URI.
+
+    Args:
+        source: Dart source text.
+
+    Returns:
+        Directives in source order, with 1-based line numbers.
+    """
+    directives: List[Tuple[int, str]] = []
+    for line_num, line in enumerate(source.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped.startswith(('import ', 'export ')):
+            continue
+        # Extract URI
+        m = _RE_URI.search(stripped)
+        if not m:
+            continue
+        uri = m.group(1)
+        if uri.startswith('package:'):
+            directives.append((line_num, uri))
+    return directives
+
 
 def get_cross_package_imports(
     parsed_files: List[ParsedFile],
@@ -32,18 +58,12 @@ def get_cross_package_imports(
     results: List[CrossPackageImport] = []
 
     for pf in parsed_files:
-        # We need line numbers — scan source directly
-        for line_num, line in enumerate(pf.source.splitlines(), 1):
-            stripped = line.strip()
-            if not stripped.startswith(('import ', 'export ')):
-                continue
-            # Extract URI
-            m = re.search(r"['\"]([^'\"]+)['\"]", stripped)
-            if not m:
-                continue
-            uri = m.group(1)
-            if not uri.startswith('package:'):
-                continue
+        # We need line numbers — use the per-file scan, or scan source directly
+        if pf.facts is not None:
+            directives = pf.facts.package_directives
+        else:
+            directives = find_package_directives(pf.source)
+        for line_num, uri in directives:
             # Extract package name
             pkg = uri[len('package:'):].split('/')[0]
             if pkg == module_name:
@@ -48,6 +48,42 @@ class GitHotspot:
         return asdict(self)
 
 
+@dataclass
+class FileOwner:
+    """An author who made most of the commits to some files of a module."""
+    author: str
+    files_owned: int  # files whose top author this is
+    share: float  # files_owned / files with history
+    commits: int  # commits to the owned files
+
+    def to_dict(self) -> dict:
+        return {
+            "author": self.author,
+            "files_owned": self.files_owned,
+            "share": round(self.share, 3),
+            "commits": self.commits,
+        }
+
+
+@dataclass
+class ModuleOwnership:
+    """Authorship of a module's files over the whole git history."""
+    files: int = 0  # files with history
+    authors: int = 0  # distinct authors
+    bus_factor: int = 0  # fewest top authors owning more than half of the files
+    single_author_files: int = 0
+    top_owners: List[FileOwner] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "authors": self.authors,
+            "bus_factor": self.bus_factor,
+            "single_author_files": self.single_author_files,
+            "top_owners": [o.to_dict() for o in self.top_owners],
+        }
+
+
 @dataclass
 class DirectoryInfo:
     """Directory structure information."""
@@ -69,6 +105,7 @@ class PackageAnalysisResult:
     import_statistics: List[ImportStatistics] = field(default_factory=list)
     shotgun_surgery_candidates: List[ShotgunSurgeryCandidate] = field(default_factory=list)
     git_hotspots: List[GitHotspot] = field(default_factory=list)
+    ownership: Optional[ModuleOwnership] = None
 
     def to_dict(self) -> dict:
         return {
@@ -79,4 +116,5 @@ class PackageAnalysisResult:
             "import_statistics": [i.to_dict() for i in self.import_statistics],
             "shotgun_surgery_candidates": [s.to_dict() for s in self.shotgun_surgery_candidates],
             "git_hotspots": [g.to_dict() for g in self.git_hotspots],
+            "ownership": self.ownership.to_dict() if self.ownership else None,
         }
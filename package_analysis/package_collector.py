@@ -8,7 +8,7 @@ from __future__ import annotations
 
 import os
 from collections import defaultdict
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 
 from ..config import MetricsConfig
 from ..models import Module, ParsedFile
@@ -18,7 +18,12 @@ from .import_analysis import (
     get_import_statistics,
     detect_shotgun_surgery,
 )
-from .git_analysis import get_git_hotspots
+from .git_analysis import (
+    ChurnIndex,
+    FileOwnership,
+    get_git_hotspots,
+    summarize_ownership,
+)
 
 
 def collect_package_analysis(
@@ -29,6 +34,8 @@ def collect_package_analysis(
     git_since: str = "2025-01-01",
     shotgun_top_n: int = 30,
     git_top_n: int = 15,
+    churn_index: Optional[ChurnIndex] = None,
+    file_ownership: Optional[Dict[str, FileOwnership]] = None,
 ) -> PackageAnalysisResult:
     """Collect comprehensive package analysis for a module.
 
@@ -40,6 +47,10 @@ def collect_package_analysis(
         git_since: Start date for git history analysis.
         shotgun_top_n: Max candidates for shotgun surgery detection.
         git_top_n: Max hotspots for git analysis.
+        churn_index: Git history shared by all modules; read from git
+            when omitted.
+        file_ownership: Ownership of all analyzed files (from
+            ``OwnershipIndex.files``); no ownership summary when omitted.
 
     Returns:
         PackageAnalysisResult with all package-level analysis data.
@@ -67,8 +78,16 @@ def collect_package_analysis(
         repo_root=root,
         since=git_since,
         top_n=git_top_n,
+        churn_index=churn_index,
     )
 
+    # 6. Ownership (bus factor)
+    ownership = None
+    if file_ownership is not None:
+        ownership = summarize_ownership(
+            (pf.path for pf in parsed_files), file_ownership,
+        )
+
     return PackageAnalysisResult(
         module_name=module.name,
         module_path=module.path,
@@ -77,6 +96,7 @@ def collect_package_analysis(
         import_statistics=import_stats,
         shotgun_surgery_candidates=shotgun,
         git_hotspots=git_hotspots,
+        ownership=ownership,
     )
 
 
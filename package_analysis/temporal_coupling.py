@@ -0,0 +1,203 @@
+"""Temporal coupling (co-change) analysis.
+
+Files that keep changing in the same commits depend on each other,
+whether or not one imports the other: a model and its serializer, a
+widget and its golden test data, two services sharing a wire format.
+This finds such pairs from the commits of the churn index (one streamed
+pass over the git history, shared with the hotspot analyses), following
+renames to the files' current names, and rolls them up to modules.
+
+Pairs are counted sparsely (only pairs that actually co-change get a
+counter).  Commits touching more than ``max_commit_files`` files (mass
+renames, reformatting, dependency bumps) are skipped: they say little
+about coupling and would add a quadratic number of pairs.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .git_analysis import ChurnIndex
+
+
+@dataclass
+class FileCoupling:
+    """Two files that changed together."""
+    file_a: str
+    file_b: str
+    module_a: str
+    module_b: str
+    co_changes: int       # commits changing both
+    changes_a: int        # commits changing file_a
+    changes_b: int        # commits changing file_b
+    degree: float         # co_changes / mean(changes_a, changes_b)
+
+    def to_dict(self) -> dict:
+        return {
+            "file_a": self.file_a,
+            "file_b": self.file_b,
+            "module_a": self.module_a,
+            "module_b": self.module_b,
+            "co_changes": self.co_changes,
+            "changes_a": self.changes_a,
+            "changes_b": self.changes_b,
+            "degree": round(self.degree, 3),
+        }
+
+
+@dataclass
+class ModuleCoupling:
+    """Two modules that changed together."""
+    module_a: str
+    module_b: str
+    co_changes: int
+    changes_a: int
+    changes_b: int
+    degree: float
+
+    def to_dict(self) -> dict:
+        return {
+            "module_a": self.module_a,
+            "module_b": self.module_b,
+            "co_changes": self.co_changes,
+            "changes_a": self.changes_a,
+            "changes_b": self.changes_b,
+            "degree": round(self.degree, 3),
+        }
+
+
+@dataclass
+class TemporalCouplingResult:
+    """Complete temporal coupling analysis result."""
+    since: str = ""
+    commits_analyzed: int = 0
+    commits_skipped: int = 0  # larger than max_commit_files
+    max_commit_files: int = 0
+    min_co_changes: int = 0
+    file_pairs: List[FileCoupling] = field(default_factory=list)
+    module_pairs: List[ModuleCoupling] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "since": self.since,
+            "commits_analyzed": self.commits_analyzed,
+            "commits_skipped": self.commits_skipped,
+            "max_commit_files": self.max_commit_files,
+            "min_co_changes": self.min_co_changes,
+            "file_pairs_count": len(self.file_pairs),
+            "file_pairs": [p.to_dict() for p in self.file_pairs],
+            "module_pairs": [p.to_dict() for p in self.module_pairs],
+        }
+
+
+def compute_temporal_coupling(
+    repo_root: str,
+    module_of: Dict[str, str],
+    since: str = "2025-01-01",
+    max_commit_files: int = 50,
+    min_co_changes: int = 3,
+    top_n: int = 100,
+    churn_index: Optional[ChurnIndex] = None,
+) -> TemporalCouplingResult:
+    """Find files and modules that change in the same commits.
+
+    Args:
+        repo_root: Root of the git repository.
+        module_of: Analyzed files (relative to *repo_root*) -> module name;
+            other paths in the history are ignored.
+        since: Start date for git history analysis.
+        max_commit_files: Commits changing more files are skipped.
+        min_co_changes: Minimum shared commits of a reported file pair.
+        top_n: Maximum number of file pairs to report.
+        churn_index: History already read for *repo_root* and *since*;
+            read from git when omitted.
+
+    Returns:
+        TemporalCouplingResult with file pairs by degree and module pairs
+        by shared commits.
+    """
+    result = TemporalCouplingResult(
+        since=since,
+        max_commit_files=max_commit_files,
+        min_co_changes=min_co_changes,
+    )
+
+    # Files get dense ids; a pair (a, b), a < b, is the key a << 32 | b
+    file_ids: Dict[str, int] = {}
+    paths: List[str] = []
+    file_changes: List[int] = []
+    pair_counts: Dict[int, int] = {}
+    module_changes: Dict[str, int] = {}
+    module_pair_counts: Dict[tuple, int] = {}
+
+    if churn_index is None:
+        churn_index = ChurnIndex.from_git(repo_root, since)
+
+    for files in churn_index.commit_files():
+        if not files:
+            continue  # merge commit
+        if len(files) > max_commit_files:
+            result.commits_skipped += 1
+            continue
+        result.commits_analyzed += 1
+
+        ids = []
+        modules = set()
+        for path in files:
+            module = module_of.get(path)
+            if module is None:
+                continue
+            fid = file_ids.get(path)
+            if fid is None:
+                fid = file_ids[path] = len(paths)
+                paths.append(path)
+                file_changes.append(0)
+            file_changes[fid] += 1
+            ids.append(fid)
+            modules.add(module)
+
+        ids.sort()
+        for i, a in enumerate(ids):
+            high = a << 32
+            for b in ids[i + 1:]:
+                key = high | b
+                pair_counts[key] = pair_counts.get(key, 0) + 1
+
+        modules = sorted(modules)
+        for i, ma in enumerate(modules):
+            module_changes[ma] = module_changes.get(ma, 0) + 1
+            for mb in modules[i + 1:]:
+                module_pair_counts[(ma, mb)] = module_pair_counts.get((ma, mb), 0) + 1
+
+    for key, shared in pair_counts.items():
+        if shared < min_co_changes:
+            continue
+        a, b = key >> 32, key & 0xFFFFFFFF
+        path_a, path_b = paths[a], paths[b]
+        if path_b < path_a:
+            a, b, path_a, path_b = b, a, path_b, path_a
+        result.file_pairs.append(FileCoupling(
+            file_a=path_a,
+            file_b=path_b,
+            module_a=module_of[path_a],
+            module_b=module_of[path_b],
+            co_changes=shared,
+            changes_a=file_changes[a],
+            changes_b=file_changes[b],
+            degree=shared / ((file_changes[a] + file_changes[b]) / 2),
+        ))
+    result.file_pairs.sort(key=lambda p: (-p.degree, -p.co_changes, p.file_a, p.file_b))
+    del result.file_pairs[top_n:]
+
+    for (ma, mb), shared in module_pair_counts.items():
+        result.module_pairs.append(ModuleCoupling(
+            module_a=ma,
+            module_b=mb,
+            co_changes=shared,
+            changes_a=module_changes[ma],
+            changes_b=module_changes[mb],
+            degree=shared / ((module_changes[ma] + module_changes[mb]) / 2),
+        ))
+    result.module_pairs.sort(key=lambda p: (-p.co_changes, -p.degree, p.module_a, p.module_b))
+    return result
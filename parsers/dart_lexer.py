@@ -0,0 +1,235 @@
+"""Single-pass Dart lexer.
+
+Turns a source file into a flat token stream (kind, text, offsets, line)
+once per file.  Metrics then work on slices of that stream instead of
+re-stripping strings and comments from every function, class and file
+text they look at.
+
+String literals containing ``${...}`` interpolation are split into
+several STRING tokens around the interpolated code, which is lexed as
+ordinary code, so identifiers and operators inside ``${...}`` count as
+code.  Simple ``$name`` interpolation stays part of the string.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Dict, List, Set
+
+# ---------------------------------------------------------------------------
+# Token kinds
+# ---------------------------------------------------------------------------
+
+IDENTIFIER = 0
+KEYWORD = 1
+OPERATOR = 2
+PUNCTUATION = 3  # { } ( ) [ ] ; , @ #
+NUMBER = 4
+STRING = 5
+COMMENT = 6
+OTHER = 7
+
+# Kinds that carry code (everything that survives string/comment stripping)
+CODE_KINDS = frozenset({IDENTIFIER, KEYWORD, OPERATOR, PUNCTUATION, NUMBER, OTHER})
+WORD_KINDS = frozenset({IDENTIFIER, KEYWORD})
+
+DART_KEYWORDS = frozenset({
+    "abstract", "as", "assert", "async", "await", "base", "break", "case",
+    "catch", "class", "const", "continue", "covariant", "default", "deferred",
+    "do", "dynamic", "else", "enum", "export", "extends", "extension",
+    "external", "factory", "false", "final", "finally", "for", "get", "hide",
+    "if", "implements", "import", "in", "interface", "is", "late", "library",
+    "mixin", "new", "null", "of", "on", "operator", "part", "required",
+    "rethrow", "return", "sealed", "set", "show", "static", "super", "switch",
+    "sync", "this", "throw", "true", "try", "typedef", "var", "void", "when",
+    "while", "with", "yield",
+})
+
+# Multi-character operators, longest first (same set Halstead counts)
+_MULTI_CHAR_OPS = sorted([
+    ">>>=", "<<=", ">>=", "~/=",
+    ">>>", "??=", "...",
+    "~/", "<<", ">>", "==", "!=", ">=", "<=",
+    "&&", "||", "??", "?.", "!.", "..",
+    "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=",
+    "=>",
+], key=len, reverse=True)
+
+_RE_CODE = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?P<lcomment>//[^\n]*)"
+    r"|(?P<bcomment>/\*.*?(?:\*/|\Z))"
+    r"|(?P<raw>r(?:'''.*?(?:'''|\Z)|\"\"\".*?(?:\"\"\"|\Z)|'[^']*(?:'|\Z)|\"[^\"]*(?:\"|\Z)))"
+    r"|(?P<quote>'''|\"\"\"|'|\")"
+    r"|(?P<number>0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z_$][\w$]*)"
+    r"|(?P<op>" + "|".join(re.escape(op) for op in _MULTI_CHAR_OPS) + r"|[+\-*/%=<>!&|^~?:.])"
+    r"|(?P<punct>[{}()\[\];,@#])"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+
+# String body up to the closing quote or the next ``${``
+_RE_STRING_BODY: Dict[str, re.Pattern] = {
+    "'": re.compile(r"(?:[^'\\$]|\\.|\$(?!\{))*", re.DOTALL),
+    '"': re.compile(r'(?:[^"\\$]|\\.|\$(?!\{))*', re.DOTALL),
+    "'''": re.compile(r"(?:[^'\\$]|\\.|\$(?!\{)|'(?!''))*", re.DOTALL),
+    '"""': re.compile(r'(?:[^"\\$]|\\.|\$(?!\{)|"(?!""))*', re.DOTALL),
+}
+
+_GROUP_KINDS = {
+    "lcomment": COMMENT,
+    "bcomment": COMMENT,
+    "raw": STRING,
+    "number": NUMBER,
+    "op": OPERATOR,
+    "punct": PUNCTUATION,
+    "other": OTHER,
+}
+
+
+class TokenStream:
+    """Tokens of a source text as parallel lists.
+
+    ``starts``/``ends`` are character offsets into ``source`` and
+    ``lines`` holds the 1-based line each token starts on.  Slices share
+    ``source`` with the stream they were taken from.
+    """
+
+    __slots__ = ("source", "kinds", "texts", "starts", "ends", "lines")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.kinds: List[int] = []
+        self.texts: List[str] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.lines: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def slice(self, start: int, end: int) -> "TokenStream":
+        """Tokens starting within the character range ``[start, end)``."""
+        lo = bisect_left(self.starts, start)
+        hi = bisect_left(self.starts, end, lo)
+        sub = TokenStream(self.source)
+        sub.kinds = self.kinds[lo:hi]
+        sub.texts = self.texts[lo:hi]
+        sub.starts = self.starts[lo:hi]
+        sub.ends = self.ends[lo:hi]
+        sub.lines = self.lines[lo:hi]
+        return sub
+
+    def code_lines(self, include_strings: bool = False) -> Set[int]:
+        """Lines holding code, i.e. anything but comments and whitespace.
+
+        With *include_strings* string literals count as code too (only
+        their non-blank lines, for multi-line literals).
+        """
+        lines: Set[int] = set()
+        for kind, text, line in zip(self.kinds, self.texts, self.lines):
+            if kind == COMMENT:
+                continue
+            if kind == STRING:
+                if not include_strings:
+                    continue
+                if '\n' in text:
+                    for i, part in enumerate(text.split('\n')):
+                        if part.strip():
+                            lines.add(line + i)
+                    continue
+            lines.add(line)
+        return lines
+
+
+def tokenize(source: str) -> TokenStream:
+    """Lex *source* into a :class:`TokenStream` in a single pass."""
+    ts = TokenStream(source)
+    kinds, texts, starts, ends, lines = ts.kinds, ts.texts, ts.starts, ts.ends, ts.lines
+
+    # One entry per open ``${``: brace depth inside it and the quote of
+    # the string to resume once it closes.
+    interp_depth: List[int] = []
+    interp_quote: List[str] = []
+
+    pos = 0
+    line = 1
+    n = len(source)
+    match_code = _RE_CODE.match
+
+    while pos < n:
+        m = match_code(source, pos)
+        group = m.lastgroup
+        end = m.end()
+
+        if group == "ws":
+            line += source.count('\n', pos, end)
+            pos = end
+            continue
+
+        text = m.group()
+        string_quote = None
+
+        if group == "quote":
+            string_quote = text
+            body_start = end
+        elif group == "punct" and interp_depth:
+            if text == '{':
+                interp_depth[-1] += 1
+            elif text == '}':
+                interp_depth[-1] -= 1
+                if interp_depth[-1] == 0:
+                    # Closing brace of ``${...}``: back inside the string
+                    interp_depth.pop()
+                    string_quote = interp_quote.pop()
+                    body_start = end
+
+        if string_quote is not None:
+            body_end = _RE_STRING_BODY[string_quote].match(source, body_start).end()
+            if source.startswith(string_quote, body_end):
+                end = body_end + len(string_quote)
+            elif source.startswith('${', body_end):
+                end = body_end + 2
+                interp_depth.append(1)
+                interp_quote.append(string_quote)
+            else:
+                end = n  # unterminated
+            text = source[pos:end]
+            kind = STRING
+        elif group == "word":
+            kind = KEYWORD if text in DART_KEYWORDS else IDENTIFIER
+        else:
+            kind = _GROUP_KINDS[group]
+
+        kinds.append(kind)
+        texts.append(text)
+        starts.append(pos)
+        ends.append(end)
+        lines.append(line)
+        if kind == STRING or kind == COMMENT:
+            line += text.count('\n')
+        pos = end
+
+    return ts
+
+
+def blank_comments(ts: TokenStream) -> str:
+    """Source text with comments replaced by spaces.
+
+    Newlines are kept, so offsets and line numbers match the original.
+    """
+    source = ts.source
+    parts: List[str] = []
+    pos = 0
+    for kind, text, start, end in zip(ts.kinds, ts.texts, ts.starts, ts.ends):
+        if kind != COMMENT:
+            continue
+        parts.append(source[pos:start])
+        parts.append(re.sub(r'[^\n]', ' ', text))
+        pos = end
+    if not parts:
+        return source
+    parts.append(source[pos:])
+    return ''.join(parts)
@@ -7,17 +7,19 @@ Optionally uses tree-sitter when available for higher accuracy.
 from __future__ import annotations
 
 import re
-from enum import Enum, auto
-from functools import lru_cache
-from typing import List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
 
 from ..models import ParsedClass, ParsedFile, ParsedFunction, ParsedImport
+from .dart_lexer import PUNCTUATION, STRING, TokenStream, blank_comments, tokenize
 
 # ---------------------------------------------------------------------------
 # Try to load tree-sitter
 # ---------------------------------------------------------------------------
 _TREE_SITTER_AVAILABLE = False
 _DART_LANGUAGE = None
+_TSQuery = None
+_TSQueryCursor = None
 
 try:
     import tree_sitter_dart as tsdart
@@ -28,663 +30,442 @@ try:
 except ImportError:
     pass
 
+if _TREE_SITTER_AVAILABLE:
+    try:
+        from tree_sitter import Query as _TSQuery
+    except ImportError:
+        pass
+    try:
+        # py-tree-sitter >= 0.25 runs queries through a cursor
+        from tree_sitter import QueryCursor as _TSQueryCursor
+    except ImportError:
+        pass
+
 
 # =====================================================================
-# STATE-MACHINE TOKENIZER
+# PUBLIC INTERFACE
 # =====================================================================
 
-class _TokState(Enum):
-    CODE = auto()
-    LINE_COMMENT = auto()
-    BLOCK_COMMENT = auto()
-    STRING_SQ = auto()        # single-quoted  '...'
-    STRING_DQ = auto()        # double-quoted  "..."
-    STRING_TSQ = auto()       # triple single  '''...'''
-    STRING_TDQ = auto()       # triple double  """..."""
-    RAW_SQ = auto()
-    RAW_DQ = auto()
-    RAW_TSQ = auto()
-    RAW_TDQ = auto()
-
-
-def _is_escaped(src: str, pos: int) -> bool:
-    n = 0
-    p = pos - 1
-    while p >= 0 and src[p] == '\\':
-        n += 1
-        p -= 1
-    return n % 2 == 1
-
-
-# --------------- generic state-machine walker ---------------
-
-def _walk_source(
-    source: str,
-    *,
-    on_code: object = None,
-    on_comment: object = None,
-    on_string: object = None,
-    keep_newlines_in_comments: bool = True,
-) -> str:
-    """Walk *source* through a state machine; for every character call the
-    appropriate callback (or drop it) to build a new string.
-
-    Each callback is ``(char, state) -> str | None``.  If *None* the char is
-    kept as-is.  If a callback is not given the char is kept.
-    """
-    result: list[str] = []
-    i = 0
-    n = len(source)
-    state = _TokState.CODE
-    # stack of brace-depths for ${} interpolation
-    interp_stack: list[int] = []
-    # the string state to return to after interpolation finishes
-    interp_return_state: list[_TokState] = []
-
-    def _emit_code(ch: str):
-        if on_code is not None:
-            r = on_code(ch, state)
-            if r is not None:
-                result.append(r)
-                return
-        result.append(ch)
-
-    def _emit_comment(ch: str):
-        if on_comment is not None:
-            r = on_comment(ch, state)
-            if r is not None:
-                result.append(r)
-                return
-        result.append(ch)
-
-    def _emit_string(ch: str):
-        if on_string is not None:
-            r = on_string(ch, state)
-            if r is not None:
-                result.append(r)
-                return
-        result.append(ch)
-
-    while i < n:
-        c = source[i]
-
-        # --- interpolation brace tracking (we are in CODE inside ${...}) ---
-        if interp_stack and state == _TokState.CODE:
-            if c == '{':
-                interp_stack[-1] += 1
-                _emit_code(c); i += 1; continue
-            elif c == '}':
-                interp_stack[-1] -= 1
-                if interp_stack[-1] == 0:
-                    interp_stack.pop()
-                    state = interp_return_state.pop()
-                    _emit_string(c); i += 1; continue
-                _emit_code(c); i += 1; continue
-
-        # ============ CODE ============
-        if state == _TokState.CODE:
-            # line comment
-            if c == '/' and i + 1 < n and source[i + 1] == '/':
-                state = _TokState.LINE_COMMENT; i += 2; continue
-            # block comment
-            if c == '/' and i + 1 < n and source[i + 1] == '*':
-                state = _TokState.BLOCK_COMMENT; i += 2; continue
-            # raw strings
-            if c == 'r' and i + 1 < n and source[i + 1] in ('"', "'"):
-                q = source[i + 1]
-                if i + 3 < n and source[i+1:i+4] == q * 3:
-                    state = _TokState.RAW_TSQ if q == "'" else _TokState.RAW_TDQ
-                    _emit_string(source[i:i+4]); i += 4; continue
-                state = _TokState.RAW_SQ if q == "'" else _TokState.RAW_DQ
-                _emit_string(source[i:i+2]); i += 2; continue
-            # triple-quoted strings
-            if c in ('"', "'") and i + 2 < n and source[i:i+3] == c * 3:
-                state = _TokState.STRING_TSQ if c == "'" else _TokState.STRING_TDQ
-                _emit_string(c * 3); i += 3; continue
-            # simple strings
-            if c in ('"', "'"):
-                state = _TokState.STRING_SQ if c == "'" else _TokState.STRING_DQ
-                _emit_string(c); i += 1; continue
-            _emit_code(c); i += 1; continue
-
-        # ============ LINE COMMENT ============
-        if state == _TokState.LINE_COMMENT:
-            if c == '\n':
-                state = _TokState.CODE
-                if keep_newlines_in_comments:
-                    _emit_comment('\n')
-            else:
-                _emit_comment(c)
-            i += 1; continue
-
-        # ============ BLOCK COMMENT ============
-        if state == _TokState.BLOCK_COMMENT:
-            if c == '*' and i + 1 < n and source[i + 1] == '/':
-                state = _TokState.CODE; i += 2; continue
-            if c == '\n' and keep_newlines_in_comments:
-                _emit_comment('\n')
-            else:
-                _emit_comment(c)
-            i += 1; continue
-
-        # ============ RAW STRINGS (no escape, no interpolation) ============
-        if state == _TokState.RAW_TSQ:
-            if source[i:i+3] == "'''":
-                _emit_string("'''"); state = _TokState.CODE; i += 3; continue
-            _emit_string(c); i += 1; continue
-        if state == _TokState.RAW_TDQ:
-            if source[i:i+3] == '"""':
-                _emit_string('"""'); state = _TokState.CODE; i += 3; continue
-            _emit_string(c); i += 1; continue
-        if state == _TokState.RAW_SQ:
-            if c == "'":
-                _emit_string(c); state = _TokState.CODE
-            else:
-                _emit_string(c)
-            i += 1; continue
-        if state == _TokState.RAW_DQ:
-            if c == '"':
-                _emit_string(c); state = _TokState.CODE
-            else:
-                _emit_string(c)
-            i += 1; continue
-
-        # ============ REGULAR STRINGS (escape + interpolation) ============
-        # triple-quoted
-        if state in (_TokState.STRING_TSQ, _TokState.STRING_TDQ):
-            end_q = "'''" if state == _TokState.STRING_TSQ else '"""'
-            if source[i:i+3] == end_q and not _is_escaped(source, i):
-                _emit_string(end_q); state = _TokState.CODE; i += 3; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1)
-                interp_return_state.append(state)
-                _emit_string('${'); state = _TokState.CODE; i += 2; continue
-            _emit_string(c); i += 1; continue
-
-        # single-char quoted
-        if state == _TokState.STRING_SQ:
-            if c == "'" and not _is_escaped(source, i):
-                _emit_string(c); state = _TokState.CODE; i += 1; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1)
-                interp_return_state.append(state)
-                _emit_string('${'); state = _TokState.CODE; i += 2; continue
-            _emit_string(c); i += 1; continue
-
-        if state == _TokState.STRING_DQ:
-            if c == '"' and not _is_escaped(source, i):
-                _emit_string(c); state = _TokState.CODE; i += 1; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1)
-                interp_return_state.append(state)
-                _emit_string('${'); state = _TokState.CODE; i += 2; continue
-            _emit_string(c); i += 1; continue
-
-        # fallback — should not happen
-        result.append(c); i += 1
-
-    return ''.join(result)
-
-
-# --------------- public helpers built on the walker ---------------
-
-@lru_cache(maxsize=4096)
-def strip_comments(source: str) -> str:
-    """Remove comments, preserving strings and newlines."""
-    return _walk_source(
-        source,
-        on_comment=lambda ch, _st: '\n' if ch == '\n' else '',
-    )
+def parse_file(path: str, source: Optional[str] = None) -> ParsedFile:
+    if source is None:
+        with open(path, 'r', encoding='utf-8') as fh:
+            source = fh.read()
 
+    tokens = tokenize(source)
+    loc = len(source.splitlines())
+    sloc = len(tokens.code_lines())
 
-@lru_cache(maxsize=4096)
-def strip_strings_and_comments(source: str) -> str:
-    """Remove comments AND string contents — fast inline implementation.
+    if _TREE_SITTER_AVAILABLE:
+        pf = _parse_with_tree_sitter(path, source, loc, sloc)
+    else:
+        pf = _parse_with_regex(path, source, loc, sloc, tokens)
+    pf.tokens = tokens
+    return pf
 
-    Preserves newlines so line numbers stay correct.
-    Avoids the generic _walk_source callback overhead.
-    """
-    result: list[str] = []
-    i = 0
-    n = len(source)
-    state = 0  # 0=CODE, 1=LINECOMMENT, 2=BLOCKCOMMENT, 3+ = string states
-    # string states: 3=SQ, 4=DQ, 5=TSQ, 6=TDQ, 7=RSQ, 8=RDQ, 9=RTSQ, 10=RTDQ
-    interp_stack: list[int] = []
-    interp_ret: list[int] = []
-
-    while i < n:
-        c = source[i]
-
-        # interpolation tracking
-        if interp_stack and state == 0:
-            if c == '{':
-                interp_stack[-1] += 1; i += 1; continue
-            if c == '}':
-                interp_stack[-1] -= 1
-                if interp_stack[-1] == 0:
-                    interp_stack.pop()
-                    state = interp_ret.pop()
-                    i += 1; continue
-                i += 1; continue
-
-        if state == 0:  # CODE
-            if c == '/' and i + 1 < n:
-                c2 = source[i + 1]
-                if c2 == '/':
-                    state = 1; i += 2; continue
-                if c2 == '*':
-                    state = 2; i += 2; continue
-            if c == 'r' and i + 1 < n and source[i + 1] in ("'", '"'):
-                q = source[i + 1]
-                if i + 3 < n and source[i + 1:i + 4] == q * 3:
-                    state = 9 if q == "'" else 10; i += 4; continue
-                state = 7 if q == "'" else 8; i += 2; continue
-            if c in ("'", '"'):
-                if i + 2 < n and source[i:i + 3] == c * 3:
-                    state = 5 if c == "'" else 6; i += 3; continue
-                state = 3 if c == "'" else 4; i += 1; continue
-            result.append(c); i += 1; continue
-
-        if state == 1:  # LINE COMMENT
-            if c == '\n':
-                state = 0; result.append('\n')
-            i += 1; continue
-
-        if state == 2:  # BLOCK COMMENT
-            if c == '*' and i + 1 < n and source[i + 1] == '/':
-                state = 0; i += 2; continue
-            if c == '\n':
-                result.append('\n')
-            i += 1; continue
-
-        # RAW strings — no escape, no interpolation
-        if state == 9:  # RAW_TSQ
-            if source[i:i + 3] == "'''":
-                state = 0; i += 3; continue
-            i += 1; continue
-        if state == 10:  # RAW_TDQ
-            if source[i:i + 3] == '"""':
-                state = 0; i += 3; continue
-            i += 1; continue
-        if state == 7:  # RAW_SQ
-            if c == "'":
-                state = 0
-            i += 1; continue
-        if state == 8:  # RAW_DQ
-            if c == '"':
-                state = 0
-            i += 1; continue
-
-        # Regular strings: check for end-quote and interpolation
-        if state == 5:  # TSQ '''
-            if source[i:i + 3] == "'''" and not _is_escaped(source, i):
-                state = 0; i += 3; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_ret.append(state)
-                state = 0; i += 2; continue
-            i += 1; continue
-        if state == 6:  # TDQ """
-            if source[i:i + 3] == '"""' and not _is_escaped(source, i):
-                state = 0; i += 3; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_ret.append(state)
-                state = 0; i += 2; continue
-            i += 1; continue
-        if state == 3:  # SQ '
-            if c == "'" and not _is_escaped(source, i):
-                state = 0; i += 1; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_ret.append(state)
-                state = 0; i += 2; continue
-            i += 1; continue
-        if state == 4:  # DQ "
-            if c == '"' and not _is_escaped(source, i):
-                state = 0; i += 1; continue
-            if c == '$' and i + 1 < n and source[i + 1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_ret.append(state)
-                state = 0; i += 2; continue
-            i += 1; continue
-
-        i += 1
 
-    return ''.join(result)
+def is_tree_sitter_available() -> bool:
+    return _TREE_SITTER_AVAILABLE
 
 
 # =====================================================================
-# SLOC counting
+# TREE-SITTER PARSER
 # =====================================================================
 
-def _count_sloc(source: str) -> int:
-    cleaned = strip_strings_and_comments(source)
-    return sum(1 for line in cleaned.splitlines() if line.strip())
+# Node types that declare a function, method, getter or setter
+_TS_SIGNATURE_TYPES = ('method_signature', 'function_signature',
+                       'getter_signature', 'setter_signature')
+
+# Everything the parser needs from a file, captured in one native
+# traversal of the tree.  Captures come back per name in document order;
+# members, fields, supertypes and parameters are then assigned to the
+# class / function whose byte range contains them.
+#
+# Every pattern starts at most _TS_MAX_START_DEPTH levels below the root
+# (a method's ``function_signature`` sits at depth 4), which lets
+# tree-sitter skip function bodies entirely.
+_TS_QUERY_PATTERNS = (
+    "(program (import_or_export) @import)",
+    "(program (class_definition) @class)",
+    "(program [(function_signature) (getter_signature) (setter_signature)] @function)",
+    "(class_body [(method_signature) (function_signature)"
+    " (getter_signature) (setter_signature)] @member)",
+    "(class_body (declaration [(function_signature) (getter_signature)"
+    " (setter_signature)] @member))",
+    "(class_body (declaration) @field)",
+    "(superclass (type_identifier) @superclass)",
+    "(interfaces (type_identifier) @interface)",
+    "(mixins (type_identifier) @mixin)",
+    "(function_signature (formal_parameter_list (formal_parameter) @param))",
+    "(function_signature (formal_parameter_list"
+    " (optional_formal_parameters (formal_parameter) @param)))",
+    "(setter_signature (formal_parameter_list (formal_parameter) @param))",
+)
+_TS_MAX_START_DEPTH = 4
+
+# Nodes that add a branch (CC) and control-flow nodes that nest (MNL).
+# ``do`` counts once, not once for ``do`` and once for its ``while``.
+_TS_DECISION_TYPES = (
+    'if_statement', 'if_element', 'for_statement', 'for_element',
+    'while_statement', 'do_statement', 'switch_statement_case',
+    'switch_expression_case', 'catch_clause', 'conditional_expression',
+    'logical_and_operator', 'logical_or_operator',
+)
+_TS_DECISION_TOKENS = ('??', '??=')
+_TS_NESTING_TYPES = (
+    'if_statement', 'for_statement', 'while_statement', 'do_statement',
+    'switch_statement', 'try_statement',
+)
 
+# Second traversal, through function bodies, for CC and MNL
+_TS_FLOW_PATTERNS = tuple(
+    f"({t}) @decision" for t in _TS_DECISION_TYPES
+) + tuple(
+    f'"{t}" @decision' for t in _TS_DECISION_TOKENS
+) + tuple(
+    f"({t}) @nesting" for t in _TS_NESTING_TYPES
+)
 
-# =====================================================================
-# BRACE MATCHING
-# =====================================================================
+# Created on first use, once per process (i.e. once per --jobs worker)
+_TS_PARSER = None
+_TS_QUERY = None
+_TS_FLOW_QUERY = None
+
+_RE_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+_RE_ELSE_BEFORE = re.compile(rb'\belse\s*\Z')
+
+
+def _ts_parser():
+    """The process-wide tree-sitter parser, declaration and control-flow queries."""
+    global _TS_PARSER, _TS_QUERY, _TS_FLOW_QUERY
+    if _TS_PARSER is None:
+        _TS_PARSER = TSParser(_DART_LANGUAGE)
+        _TS_QUERY = _ts_build_query(_TS_QUERY_PATTERNS)
+        if _TSQueryCursor is None and hasattr(_TS_QUERY, 'set_max_start_depth'):
+            _TS_QUERY.set_max_start_depth(_TS_MAX_START_DEPTH)
+        _TS_FLOW_QUERY = _ts_build_query(_TS_FLOW_PATTERNS)
+    return _TS_PARSER, _TS_QUERY, _TS_FLOW_QUERY
+
+
+def _ts_compile_query(source: str):
+    if _TSQuery is not None:
+        try:
+            return _TSQuery(_DART_LANGUAGE, source)
+        except TypeError:
+            pass
+    return _DART_LANGUAGE.query(source)
+
+
+def _ts_build_query(all_patterns: Tuple[str, ...]):
+    try:
+        return _ts_compile_query('\n'.join(all_patterns))
+    except Exception:
+        pass
+    # A pattern naming a node type this grammar version lacks fails the
+    # whole query, so drop such patterns individually.
+    patterns = []
+    for pattern in all_patterns:
+        try:
+            _ts_compile_query(pattern)
+        except Exception:
+            continue
+        patterns.append(pattern)
+    return _ts_compile_query('\n'.join(patterns))
 
-def _find_brace_block(source: str, start: int) -> Tuple[str, int]:
-    """Find matching ``}`` for ``{`` at *start*.
 
-    Returns ``(body_between_braces, position_after_close_brace)``.
-    Handles strings, comments, ``${}`` interpolation correctly.
-    """
-    if start >= len(source) or source[start] != '{':
-        return '', start
+def _ts_captures(query, node, max_start_depth: Optional[int] = None) -> Dict[str, list]:
+    """``{capture name: [nodes in document order]}`` across py-tree-sitter versions."""
+    if _TSQueryCursor is not None:
+        cursor = _TSQueryCursor(query)
+        if max_start_depth is not None:
+            cursor.set_max_start_depth(max_start_depth)
+        captures = cursor.captures(node)
+    else:
+        captures = query.captures(node)
+    return {name: sorted(nodes, key=_ts_start_byte) for name, nodes in captures.items()}
 
-    depth = 0
-    i = start
-    n = len(source)
-    state = _TokState.CODE
-    interp_stack: list[int] = []
-    interp_return: list[_TokState] = []
-
-    while i < n:
-        c = source[i]
-
-        # interpolation tracking
-        if interp_stack and state == _TokState.CODE:
-            if c == '{':
-                interp_stack[-1] += 1; i += 1; continue
-            if c == '}':
-                interp_stack[-1] -= 1
-                if interp_stack[-1] == 0:
-                    interp_stack.pop()
-                    state = interp_return.pop()
-                    i += 1; continue
-                i += 1; continue
-
-        if state == _TokState.CODE:
-            if c == '/' and i + 1 < n:
-                if source[i+1] == '/':
-                    state = _TokState.LINE_COMMENT; i += 2; continue
-                if source[i+1] == '*':
-                    state = _TokState.BLOCK_COMMENT; i += 2; continue
-            if c == 'r' and i + 1 < n and source[i+1] in ('"', "'"):
-                q = source[i+1]
-                if i + 3 < n and source[i+1:i+4] == q * 3:
-                    state = _TokState.RAW_TSQ if q == "'" else _TokState.RAW_TDQ; i += 4; continue
-                state = _TokState.RAW_SQ if q == "'" else _TokState.RAW_DQ; i += 2; continue
-            if c in ('"', "'") and i + 2 < n and source[i:i+3] == c * 3:
-                state = _TokState.STRING_TSQ if c == "'" else _TokState.STRING_TDQ; i += 3; continue
-            if c in ('"', "'"):
-                state = _TokState.STRING_SQ if c == "'" else _TokState.STRING_DQ; i += 1; continue
-            if c == '{':
-                depth += 1; i += 1; continue
-            if c == '}':
-                depth -= 1
-                if depth == 0:
-                    return source[start + 1:i], i + 1
-                i += 1; continue
-            i += 1; continue
-
-        if state == _TokState.LINE_COMMENT:
-            if c == '\n': state = _TokState.CODE
-            i += 1; continue
-
-        if state == _TokState.BLOCK_COMMENT:
-            if c == '*' and i + 1 < n and source[i+1] == '/':
-                state = _TokState.CODE; i += 2; continue
-            i += 1; continue
-
-        if state == _TokState.RAW_TSQ:
-            if source[i:i+3] == "'''": state = _TokState.CODE; i += 3; continue
-            i += 1; continue
-        if state == _TokState.RAW_TDQ:
-            if source[i:i+3] == '"""': state = _TokState.CODE; i += 3; continue
-            i += 1; continue
-        if state == _TokState.RAW_SQ:
-            if c == "'": state = _TokState.CODE
-            i += 1; continue
-        if state == _TokState.RAW_DQ:
-            if c == '"': state = _TokState.CODE
-            i += 1; continue
-
-        if state in (_TokState.STRING_TSQ, _TokState.STRING_TDQ):
-            end_q = "'''" if state == _TokState.STRING_TSQ else '"""'
-            if source[i:i+3] == end_q and not _is_escaped(source, i):
-                state = _TokState.CODE; i += 3; continue
-            if c == '$' and i + 1 < n and source[i+1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_return.append(state)
-                state = _TokState.CODE; i += 2; continue
-            i += 1; continue
-
-        if state == _TokState.STRING_SQ:
-            if c == "'" and not _is_escaped(source, i):
-                state = _TokState.CODE; i += 1; continue
-            if c == '$' and i + 1 < n and source[i+1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_return.append(state)
-                state = _TokState.CODE; i += 2; continue
-            i += 1; continue
-
-        if state == _TokState.STRING_DQ:
-            if c == '"' and not _is_escaped(source, i):
-                state = _TokState.CODE; i += 1; continue
-            if c == '$' and i + 1 < n and source[i+1] == '{' and not _is_escaped(source, i):
-                interp_stack.append(1); interp_return.append(state)
-                state = _TokState.CODE; i += 2; continue
-            i += 1; continue
-
-        i += 1
-
-    return source[start + 1:], len(source)
 
+def _ts_start_byte(node) -> int:
+    return node.start_byte
 
-# =====================================================================
-# PUBLIC INTERFACE
-# =====================================================================
 
-def parse_file(path: str, source: Optional[str] = None) -> ParsedFile:
-    if source is None:
-        with open(path, 'r', encoding='utf-8') as fh:
-            source = fh.read()
+def _ts_group_by_owner(owners: list, nodes: list) -> List[list]:
+    """Distribute *nodes* over the non-overlapping *owners* containing them.
 
-    loc = len(source.splitlines())
-    sloc = _count_sloc(source)
+    Both lists are in document order, so a single merge pass does it.
+    Nodes outside every owner are dropped.
+    """
+    groups: List[list] = [[] for _ in owners]
+    i = 0
+    n = len(owners)
+    for node in nodes:
+        start = node.start_byte
+        while i < n and owners[i].end_byte <= start:
+            i += 1
+        if i == n:
+            break
+        if owners[i].start_byte <= start:
+            groups[i].append(node)
+    return groups
 
-    if _TREE_SITTER_AVAILABLE:
-        return _parse_with_tree_sitter(path, source, loc, sloc)
-    return _parse_with_regex(path, source, loc, sloc)
 
+class _TSSource:
+    """UTF-8 buffer handed to tree-sitter, with node text and offsets.
 
-def is_tree_sitter_available() -> bool:
-    return _TREE_SITTER_AVAILABLE
+    Node text is decoded straight from the byte slice.  Byte offsets are
+    converted to character offsets (what ``TokenStream`` and the parsed
+    model's spans use) through the positions of multi-byte characters;
+    ASCII files map 1:1.
+    """
 
+    __slots__ = ('source', 'src', 'char_ends', 'char_extra')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.src = source.encode('utf-8')
+        # Byte offset just past each multi-byte character, and the extra
+        # bytes accumulated up to and including it.
+        self.char_ends: List[int] = []
+        self.char_extra: List[int] = []
+        if len(self.src) != len(source):
+            extra = 0
+            for m in _RE_NON_ASCII.finditer(source):
+                extra += len(m.group().encode('utf-8')) - 1
+                self.char_ends.append(m.end() + extra)
+                self.char_extra.append(extra)
+
+    def text(self, node) -> str:
+        return self.src[node.start_byte:node.end_byte].decode('utf-8', 'replace')
+
+    def char(self, byte_offset: int) -> int:
+        if not self.char_ends:
+            return byte_offset
+        i = bisect_right(self.char_ends, byte_offset) - 1
+        return byte_offset - self.char_extra[i] if i >= 0 else byte_offset
+
+
+class _TSControlFlow:
+    """Decision and nesting nodes of a file, looked up by byte range.
+
+    CC of a body is one plus the decision nodes starting inside it, MNL
+    the deepest chain of nested control-flow nodes inside it.  An
+    ``else if`` continues its enclosing ``if`` rather than nesting in it.
+    """
+
+    __slots__ = ('decision_starts', 'nesting', 'nesting_starts')
+
+    def __init__(self, caps: Dict[str, list], src: bytes):
+        self.decision_starts = [n.start_byte for n in caps.get('decision', ())]
+        # (start, end, is ``else if``)
+        self.nesting = [
+            (n.start_byte, n.end_byte, n.type == 'if_statement' and _ts_is_else_if(src, n.start_byte))
+            for n in caps.get('nesting', ())
+        ]
+        self.nesting_starts = [start for start, _, _ in self.nesting]
+
+    def cyclomatic(self, start: int, end: int) -> int:
+        starts = self.decision_starts
+        return 1 + bisect_left(starts, end) - bisect_left(starts, start)
+
+    def max_nesting(self, start: int, end: int) -> int:
+        lo = bisect_left(self.nesting_starts, start)
+        hi = bisect_left(self.nesting_starts, end, lo)
+        open_ends: List[int] = []
+        max_depth = 0
+        for node_start, node_end, else_if in self.nesting[lo:hi]:
+            while open_ends and open_ends[-1] <= node_start:
+                open_ends.pop()
+            if else_if:
+                continue
+            open_ends.append(node_end)
+            if len(open_ends) > max_depth:
+                max_depth = len(open_ends)
+        return max_depth
+
+
+def _ts_is_else_if(src: bytes, if_start: int) -> bool:
+    """Whether the ``if`` at *if_start* directly follows an ``else``."""
+    return _RE_ELSE_BEFORE.search(src, max(0, if_start - 64), if_start) is not None
 
-# =====================================================================
-# TREE-SITTER PARSER
-# =====================================================================
 
 def _parse_with_tree_sitter(path: str, source: str, loc: int, sloc: int) -> ParsedFile:
-    parser = TSParser(_DART_LANGUAGE)
-    tree = parser.parse(source.encode('utf-8'))
-    root = tree.root_node
+    parser, query, flow_query = _ts_parser()
+    ts = _TSSource(source)
+    root = parser.parse(ts.src).root_node
+    caps = _ts_captures(query, root, _TS_MAX_START_DEPTH)
+    flow = _TSControlFlow(_ts_captures(flow_query, root), ts.src)
+
+    imports: list[ParsedImport] = []
+    for node in caps.get('import', ()):
+        uri = _extract_import_uri(ts.text(node))
+        if uri:
+            imports.append(_classify_import(uri))
+
+    # Parameters belong to the signature that contains them
+    signatures = sorted(caps.get('member', []) + caps.get('function', []),
+                        key=_ts_start_byte)
+    params_by_sig = {
+        sig.start_byte: group
+        for sig, group in zip(signatures, _ts_group_by_owner(signatures, caps.get('param', [])))
+    }
+
+    class_nodes = caps.get('class', [])
+    per_class = zip(
+        class_nodes,
+        _ts_group_by_owner(class_nodes, caps.get('member', [])),
+        _ts_group_by_owner(class_nodes, caps.get('field', [])),
+        _ts_group_by_owner(class_nodes, caps.get('superclass', [])),
+        _ts_group_by_owner(class_nodes, caps.get('interface', [])),
+        _ts_group_by_owner(class_nodes, caps.get('mixin', [])),
+    )
+    classes: list[ParsedClass] = []
+    for node, members, field_nodes, supers, interfaces, mixins in per_class:
+        cls = _ts_parse_class(node, ts, members, field_nodes, supers,
+                              interfaces, mixins, params_by_sig, flow)
+        if cls:
+            classes.append(cls)
 
-    imports = _ts_extract_imports(root, source)
-    classes = _ts_extract_classes(root, source)
-    top_fns = _ts_extract_top_level_functions(root, source)
+    top_fns: list[ParsedFunction] = []
+    for node in caps.get('function', ()):
+        fn = _ts_parse_function(node, ts, flow, None,
+                                params_by_sig.get(node.start_byte, ()))
+        if fn:
+            top_fns.append(fn)
 
     return ParsedFile(path=path, source=source, classes=classes,
                       top_level_functions=top_fns, imports=imports,
                       loc=loc, sloc=sloc)
 
 
-def _ts_extract_imports(root, source: str) -> List[ParsedImport]:
-    out: list[ParsedImport] = []
-    for node in root.children:
-        if node.type == 'import_or_export':
-            text = _node_text(node, source)
-            uri = _extract_import_uri(text)
-            if uri:
-                out.append(_classify_import(uri))
-    return out
-
-
-def _ts_extract_classes(root, source: str) -> List[ParsedClass]:
-    out: list[ParsedClass] = []
-    for node in root.children:
-        if node.type == 'class_definition':
-            cls = _ts_parse_class(node, source)
-            if cls:
-                out.append(cls)
-    return out
-
-
-def _ts_extract_top_level_functions(root, source: str) -> List[ParsedFunction]:
-    out: list[ParsedFunction] = []
-    for node in root.children:
-        if node.type in ('function_signature', 'function_definition',
-                         'method_signature', 'getter_signature', 'setter_signature'):
-            fn = _ts_parse_function(node, source, class_name=None)
-            if fn:
-                out.append(fn)
-    return out
-
-
-def _ts_parse_class(node, source: str) -> Optional[ParsedClass]:
-    name = superclass = None
-    interfaces: list[str] = []
-    mixins: list[str] = []
-    is_abstract = False
-    text = _node_text(node, source)
-    if text.startswith('abstract'):
-        is_abstract = True
+def _ts_parse_class(node, ts: _TSSource, members: list, field_nodes: list,
+                    supers: list, interfaces: list, mixins: list,
+                    params_by_sig: Dict[int, list],
+                    flow: _TSControlFlow) -> Optional[ParsedClass]:
+    name = None
+    for child in node.children:
+        if child.type == 'identifier':
+            name = ts.text(child)
+            break
+    if name is None:
+        return None
 
+    text = ts.text(node)
     methods: list[ParsedFunction] = []
-    fields: list[str] = []
     pub_m: list[ParsedFunction] = []
-    pub_f: list[str] = []
-
-    for child in node.children:
-        if child.type == 'identifier' and name is None:
-            name = _node_text(child, source)
-        elif child.type == 'superclass':
-            for sub in child.children:
-                if sub.type == 'type_identifier':
-                    superclass = _node_text(sub, source); break
-        elif child.type == 'interfaces':
-            for sub in _walk_tree(child):
-                if sub.type == 'type_identifier':
-                    interfaces.append(_node_text(sub, source))
-        elif child.type == 'mixins':
-            for sub in _walk_tree(child):
-                if sub.type == 'type_identifier':
-                    mixins.append(_node_text(sub, source))
-        elif child.type == 'class_body':
-            methods, fields, pub_m, pub_f = _ts_parse_class_body(child, source, name or '')
+    for member in members:
+        fn = _ts_parse_function(member, ts, flow, name,
+                                params_by_sig.get(member.start_byte, ()))
+        if fn:
+            methods.append(fn)
+            if not fn.name.startswith('_'):
+                pub_m.append(fn)
 
-    if name is None:
-        return None
+    fields: list[str] = []
+    pub_f: list[str] = []
+    for decl in field_nodes:
+        if any(c.type in _TS_SIGNATURE_TYPES for c in decl.named_children):
+            continue  # abstract method, captured as a member
+        ident = _ts_first_identifier(decl)
+        if ident is None:
+            continue
+        field = ts.text(ident)
+        if field and (field[0].islower() or field.startswith('_')):
+            fields.append(field)
+            if not field.startswith('_'):
+                pub_f.append(field)
 
     return ParsedClass(
         name=name, line_start=node.start_point[0] + 1, line_end=node.end_point[0] + 1,
-        full_text=text, superclass=superclass, interfaces=interfaces, mixins=mixins,
+        superclass=ts.text(supers[0]) if supers else None,
+        interfaces=[ts.text(n) for n in interfaces],
+        mixins=[ts.text(n) for n in mixins],
         methods=methods, fields=fields, public_methods=pub_m, public_fields=pub_f,
-        is_abstract=is_abstract)
+        is_abstract=text.startswith('abstract'),
+        start=ts.char(node.start_byte), end=ts.char(node.end_byte), buffer=ts.source)
 
 
-def _ts_parse_class_body(node, source: str, class_name: str):
-    methods: list[ParsedFunction] = []
-    fields: list[str] = []
-    pub_m: list[ParsedFunction] = []
-    pub_f: list[str] = []
-    for child in node.children:
-        if child.type in ('method_signature', 'function_definition',
-                          'getter_signature', 'setter_signature', 'function_signature'):
-            fn = _ts_parse_function(child, source, class_name=class_name)
-            if fn:
-                methods.append(fn)
-                if not fn.name.startswith('_'):
-                    pub_m.append(fn)
-        elif child.type in ('declaration', 'initialized_variable_definition',
-                            'variable_declaration', 'final_builtin'):
-            _ts_extract_fields(child, source, fields, pub_f)
-    return methods, fields, pub_m, pub_f
-
-
-def _ts_extract_fields(node, source: str, fields: list, pub_f: list):
-    for sub in _walk_tree(node):
-        if sub.type == 'identifier':
-            name = _node_text(sub, source)
-            if name and (name[0].islower() or name.startswith('_')):
-                fields.append(name)
-                if not name.startswith('_'):
-                    pub_f.append(name)
-            break
+def _ts_first_identifier(node):
+    """First ``identifier`` node under *node*, in document order."""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.type == 'identifier':
+            return current
+        stack.extend(reversed(current.children))
+    return None
 
 
-def _ts_parse_function(node, source: str, class_name: Optional[str]) -> Optional[ParsedFunction]:
+def _ts_parse_function(node, ts: _TSSource, flow: _TSControlFlow,
+                       class_name: Optional[str], param_nodes) -> Optional[ParsedFunction]:
     name = None
-    parameters: list[str] = []
-    is_override = is_static = is_getter = is_setter = False
-    text = _node_text(node, source)
+    is_override = is_static = False
+    sig_text = ts.text(node)
 
     prev = node.prev_named_sibling
     while prev:
-        pt = _node_text(prev, source)
-        if pt.strip().startswith('@override'):
+        pt = ts.text(prev).strip()
+        if pt.startswith('@override'):
             is_override = True
-        if pt.strip().startswith('@'):
+        if pt.startswith('@'):
             prev = prev.prev_named_sibling; continue
         break
 
-    sig = text.split('{')[0] if '{' in text else text
+    sig = sig_text.split('{')[0] if '{' in sig_text else sig_text
     if '@override' in sig:
         is_override = True
     if 'static ' in (sig.split('(')[0] if '(' in sig else ''):
         is_static = True
-    if node.type == 'getter_signature':
-        is_getter = True
-    elif node.type == 'setter_signature':
-        is_setter = True
-
-    for child in node.children:
-        if child.type == 'identifier' and name is None:
-            name = _node_text(child, source)
-        elif child.type == 'formal_parameter_list':
-            parameters = _ts_extract_parameters(child, source)
 
+    # ``method_signature`` wraps the actual function/getter/setter signature
+    sig_node = node
+    if node.type == 'method_signature':
+        for child in node.named_children:
+            if child.type in _TS_SIGNATURE_TYPES:
+                sig_node = child
+                break
+    is_getter = sig_node.type == 'getter_signature'
+    is_setter = sig_node.type == 'setter_signature'
+
+    for child in sig_node.children:
+        if child.type == 'identifier':
+            name = ts.text(child)
+            break
     if name is None:
-        m = re.search(r'(\w+)\s*[(<]', text)
+        m = re.search(r'(\w+)\s*[(<]', sig_text)
         if m:
             name = m.group(1)
     if name is None:
         return None
 
-    body_text = ''
-    for child in _walk_tree(node):
-        if child.type in ('block', 'function_body'):
-            body_text = _node_text(child, source); break
-    if not body_text and '=>' in text:
-        idx = text.index('=>')
-        body_text = text[idx:]
+    # The body follows the signature as a sibling node
+    body = node.next_named_sibling
+    if body is None or body.type != 'function_body':
+        body = None
+        for child in node.children:
+            if child.type in ('block', 'function_body'):
+                body = child
+                break
+
+    end_node = node
+    if body is not None:
+        body_bytes = (body.start_byte, body.end_byte)
+        if body.end_byte > node.end_byte:
+            end_node = body
+    else:
+        body_bytes = (node.end_byte, node.end_byte)
+        if '=>' in sig_text:
+            idx = sig_text.index('=>')
+            body_bytes = (node.start_byte + len(sig_text[:idx].encode('utf-8')), node.end_byte)
 
     return ParsedFunction(
         name=name, class_name=class_name,
-        line_start=node.start_point[0] + 1, line_end=node.end_point[0] + 1,
-        body_text=body_text, full_text=text, parameters=parameters,
+        line_start=node.start_point[0] + 1, line_end=end_node.end_point[0] + 1,
+        parameters=[ts.text(p) for p in param_nodes],
         is_override=is_override, is_static=is_static,
-        is_getter=is_getter, is_setter=is_setter)
-
-
-def _ts_extract_parameters(node, source: str) -> list:
-    params: list[str] = []
-    for child in _walk_tree(node):
-        if child.type in ('formal_parameter', 'simple_formal_parameter',
-                          'default_formal_parameter', 'field_formal_parameter',
-                          'function_typed_formal_parameter'):
-            params.append(_node_text(child, source))
-    return params
-
-
-def _walk_tree(node):
-    for child in node.children:
-        yield child
-        yield from _walk_tree(child)
-
-
-def _node_text(node, source: str) -> str:
-    return source[node.start_byte:node.end_byte]
+        is_getter=is_getter, is_setter=is_setter,
+        start=ts.char(node.start_byte), end=ts.char(end_node.end_byte),
+        body_start=ts.char(body_bytes[0]), body_end=ts.char(body_bytes[1]),
+        cyclo=flow.cyclomatic(*body_bytes), max_nesting=flow.max_nesting(*body_bytes),
+        buffer=ts.source)
 
 
 # =====================================================================
@@ -694,46 +475,34 @@ def _node_text(node, source: str) -> str:
 _RE_IMPORT = re.compile(r"^\s*import\s+['\"](.+?)['\"]", re.MULTILINE)
 
 # ---- class-like declarations ----
-# Matches: [abstract|sealed|base|final|interface] [mixin] class Name<T> extends/with/implements ...
-_RE_CLASS = re.compile(
-    r'^(?:(?:abstract|sealed|base|final|interface)\s+)*'
+# One alternation, so declarations are found in a single scan:
+#   class:    [abstract|sealed|base|final|interface] [mixin] class Name<T> extends/with/implements ...
+#   mixin:    standalone mixin (not "mixin class")
+#   enum:     enum with body
+#   ext_type: extension type (Dart 3.3)
+#   ext:      extension
+_RE_CLASS_LIKE = re.compile(
+    r'(?P<class>^(?:(?:abstract|sealed|base|final|interface)\s+)*'
     r'(?:mixin\s+)?class\s+'
-    r'(\w+)(?:<[^{]*?>)?'
-    r'((?:\s+(?:extends|with|implements)\s+[^{]+?)*)'
-    r'\s*\{',
-    re.MULTILINE,
-)
-
-# standalone mixin (not "mixin class")
-_RE_MIXIN = re.compile(
-    r'^(?:base\s+)?mixin\s+(?!class\b)'
-    r'(\w+)(?:<[^{]*?>)?'
-    r'((?:\s+(?:on|implements)\s+[^{]+?)*)'
-    r'\s*\{',
+    r'(?P<class_name>\w+)(?:<[^{]*?>)?'
+    r'(?P<class_clauses>(?:\s+(?:extends|with|implements)\s+[^{]+?)*)'
+    r'\s*\{)'
+    r'|(?P<mixin>^(?:base\s+)?mixin\s+(?!class\b)'
+    r'(?P<mixin_name>\w+)(?:<[^{]*?>)?'
+    r'(?P<mixin_clauses>(?:\s+(?:on|implements)\s+[^{]+?)*)'
+    r'\s*\{)'
+    r'|(?P<enum>^enum\s+(?P<enum_name>\w+)(?:<[^{]*?>)?'
+    r'(?P<enum_clauses>(?:\s+(?:with|implements)\s+[^{]+?)*)'
+    r'\s*\{)'
+    r'|(?P<ext_type>^extension\s+type\s+(?P<ext_type_name>\w+)(?:<[^{]*?>)?\s*\([^)]*\)'
+    r'(?P<ext_type_clauses>(?:\s+implements\s+[^{]+?)*)'
+    r'\s*\{)'
+    r'|(?P<ext>^extension\s+(?P<ext_name>\w+)(?:<[^{]*?>)?\s+on\s+[\w<>,?\s]+?\s*\{)',
     re.MULTILINE,
 )
 
-# enum with body
-_RE_ENUM = re.compile(
-    r'^enum\s+(\w+)(?:<[^{]*?>)?'
-    r'((?:\s+(?:with|implements)\s+[^{]+?)*)'
-    r'\s*\{',
-    re.MULTILINE,
-)
-
-# extension
-_RE_EXTENSION = re.compile(
-    r'^extension\s+(\w+)(?:<[^{]*?>)?\s+on\s+([\w<>,?\s]+?)\s*\{',
-    re.MULTILINE,
-)
-
-# extension type (Dart 3.3)
-_RE_EXTENSION_TYPE = re.compile(
-    r'^extension\s+type\s+(\w+)(?:<[^{]*?>)?\s*\([^)]*\)'
-    r'((?:\s+implements\s+[^{]+?)*)'
-    r'\s*\{',
-    re.MULTILINE,
-)
+# Declarations are reported grouped by kind, in this order
+_CLASS_LIKE_KINDS = ('class', 'mixin', 'enum', 'ext', 'ext_type')
 
 # ---- functions / methods ----
 # Params are REQUIRED (not optional) to avoid false positives.
@@ -779,14 +548,71 @@ _KEYWORDS = frozenset({
     'when', 'async', 'await', 'yield', 'sync', 'on',
 })
 
+# ---- structural index ----
+
+class _SourceIndex:
+    """Line and brace lookups over one (comment-blanked) source text.
+
+    Built in one pass over the newline positions and the token stream:
+    ``line_at`` is a bisect over newline offsets and ``block`` a lookup
+    in the matching-brace table, instead of re-counting newlines or
+    re-scanning for the closing brace on every declaration.
+    """
+
+    def __init__(self, text: str, tokens: TokenStream):
+        self.text = text
+        self.newlines = [m.start() for m in _RE_NEWLINE.finditer(text)]
+        # offset of each code '{' -> offset of its '}' (len(text) if unclosed)
+        self.brace_match: Dict[int, int] = {}
+        stack: List[int] = []
+        for kind, tok, start in zip(tokens.kinds, tokens.texts, tokens.starts):
+            if kind != PUNCTUATION:
+                continue
+            if tok == '{':
+                stack.append(start)
+            elif tok == '}' and stack:
+                self.brace_match[stack.pop()] = start
+        for start in stack:
+            self.brace_match[start] = len(text)
+
+    def line_at(self, pos: int) -> int:
+        """1-based line of offset *pos*."""
+        return bisect_left(self.newlines, pos) + 1
+
+    def block(self, start: int) -> Optional[Tuple[str, int]]:
+        """Body and end offset of the ``{ ... }`` block opening at *start*.
+
+        Returns ``(body_between_braces, position_after_close_brace)``, or
+        ``None`` when *start* is not a code brace (e.g. inside a string).
+        """
+        close = self.brace_match.get(start)
+        if close is None:
+            return None
+        return self.text[start + 1:close], min(close + 1, len(self.text))
+
+    def block_span(self, start: int) -> Optional[Tuple[int, int]]:
+        """Like :meth:`block`, but ``(body_start, body_end)`` offsets only."""
+        close = self.brace_match.get(start)
+        if close is None:
+            return None
+        return start + 1, close
+
+
+_RE_NEWLINE = re.compile(r'\n')
+
+
 # ---- regex entry point ----
 
-def _parse_with_regex(path: str, source: str, loc: int, sloc: int) -> ParsedFile:
-    cleaned = strip_comments(source)
+def _parse_with_regex(path: str, source: str, loc: int, sloc: int,
+                      tokens: TokenStream) -> ParsedFile:
+    # Comments blanked out rather than removed, so that offsets into
+    # *cleaned* are offsets into *source* as well.
+    cleaned = blank_comments(tokens)
+    index = _SourceIndex(cleaned, tokens)
 
     imports = _regex_extract_imports(source)
-    classes = _regex_extract_all_class_like(cleaned)
-    top_fns = _regex_extract_top_level_functions(cleaned, classes)
+    classes = _regex_extract_all_class_like(cleaned, index, tokens)
+    top_fns = _regex_extract_top_level_functions(cleaned, classes, index)
 
     return ParsedFile(path=path, source=source, classes=classes,
                       top_level_functions=top_fns, imports=imports,
@@ -797,57 +623,42 @@ def _regex_extract_imports(source: str) -> List[ParsedImport]:
     return [_classify_import(m.group(1)) for m in _RE_IMPORT.finditer(source)]
 
 
-def _regex_extract_all_class_like(cleaned: str) -> List[ParsedClass]:
-    classes: list[ParsedClass] = []
-
-    # regular classes
-    for m in _RE_CLASS.finditer(cleaned):
-        name = m.group(1)
-        clauses = m.group(2) or ''
-        modifier_area = cleaned[m.start():m.start() + m.group(0).index('class')]
-        is_abstract = 'abstract' in modifier_area or 'sealed' in modifier_area
-        superclass, interfaces, mixins = _parse_clauses(clauses)
-        cls = _build_class(cleaned, m, name, superclass, interfaces, mixins, is_abstract)
+def _regex_extract_all_class_like(cleaned: str, index: _SourceIndex,
+                                  tokens: TokenStream) -> List[ParsedClass]:
+    by_kind: Dict[str, List[ParsedClass]] = {kind: [] for kind in _CLASS_LIKE_KINDS}
+
+    for m in _RE_CLASS_LIKE.finditer(cleaned):
+        kind = m.lastgroup
+        name = m.group(kind + '_name')
+
+        if kind == 'class':
+            clauses = m.group('class_clauses') or ''
+            modifier_area = cleaned[m.start():m.start() + m.group(0).index('class')]
+            is_abstract = 'abstract' in modifier_area or 'sealed' in modifier_area
+            superclass, interfaces, mixins = _parse_clauses(clauses)
+        elif kind == 'mixin':
+            clauses = m.group('mixin_clauses') or ''
+            _, interfaces, _ = _parse_clauses(clauses)
+            on_m = re.search(r'on\s+([\w<>,\s]+?)(?:\s+implements|\s*$)', clauses)
+            mixins = [t.strip() for t in on_m.group(1).split(',') if t.strip()] if on_m else []
+            superclass, is_abstract = None, True
+        elif kind == 'enum':
+            clauses = m.group('enum_clauses') or ''
+            _, interfaces, mixins = _parse_clauses(clauses)
+            superclass, is_abstract = None, False
+        elif kind == 'ext_type':
+            clauses = m.group('ext_type_clauses') or ''
+            _, interfaces, _ = _parse_clauses(clauses)
+            superclass, mixins, is_abstract = None, [], False
+        else:  # ext
+            superclass, interfaces, mixins, is_abstract = None, [], [], False
+
+        cls = _build_class(cleaned, index, tokens, m, name,
+                           superclass, interfaces, mixins, is_abstract)
         if cls:
-            classes.append(cls)
+            by_kind[kind].append(cls)
 
-    # standalone mixins
-    for m in _RE_MIXIN.finditer(cleaned):
-        name = m.group(1)
-        clauses = m.group(2) or ''
-        _, interfaces, _ = _parse_clauses(clauses)
-        on_m = re.search(r'on\s+([\w<>,\s]+?)(?:\s+implements|\s*$)', clauses)
-        on_types = [t.strip() for t in on_m.group(1).split(',') if t.strip()] if on_m else []
-        cls = _build_class(cleaned, m, name, None, interfaces, on_types, True)
-        if cls:
-            classes.append(cls)
-
-    # enums
-    for m in _RE_ENUM.finditer(cleaned):
-        name = m.group(1)
-        clauses = m.group(2) or ''
-        _, interfaces, mixins = _parse_clauses(clauses)
-        cls = _build_class(cleaned, m, name, None, interfaces, mixins, False)
-        if cls:
-            classes.append(cls)
-
-    # extensions
-    for m in _RE_EXTENSION.finditer(cleaned):
-        name = m.group(1)
-        cls = _build_class(cleaned, m, name, None, [], [], False)
-        if cls:
-            classes.append(cls)
-
-    # extension types
-    for m in _RE_EXTENSION_TYPE.finditer(cleaned):
-        name = m.group(1)
-        clauses = m.group(2) or ''
-        _, interfaces, _ = _parse_clauses(clauses)
-        cls = _build_class(cleaned, m, name, None, interfaces, [], False)
-        if cls:
-            classes.append(cls)
-
-    return classes
+    return [cls for kind in _CLASS_LIKE_KINDS for cls in by_kind[kind]]
 
 
 def _parse_clauses(text: str):
@@ -872,36 +683,51 @@ def _parse_clauses(text: str):
     return superclass, interfaces, mixins
 
 
-def _build_class(cleaned: str, match, name: str,
-                 superclass, interfaces: list, mixins: list,
+def _build_class(cleaned: str, index: _SourceIndex, tokens: TokenStream,
+                 match, name: str, superclass, interfaces: list, mixins: list,
                  is_abstract: bool) -> Optional[ParsedClass]:
     brace_pos = match.end() - 1
-    body, end_pos = _find_brace_block(cleaned, brace_pos)
+    block = index.block(brace_pos)
+    if block is None:
+        return None
+    body, end_pos = block
 
-    line_start = cleaned[:match.start()].count('\n') + 1
-    line_end = cleaned[:end_pos].count('\n') + 1
-    full_text = cleaned[match.start():end_pos]
+    line_start = index.line_at(match.start())
+    line_end = index.line_at(end_pos)
 
-    methods = _regex_extract_methods(body, name, line_start)
-    fields = _regex_extract_class_fields_safe(body, methods)
+    methods = _regex_extract_methods(body, name, brace_pos + 1, index)
+    fields = _regex_extract_class_fields_safe(
+        cleaned, tokens.slice(brace_pos + 1, brace_pos + 1 + len(body)), index)
     pub_m = [m for m in methods if not m.name.startswith('_')]
     pub_f = [f for f in fields if not f.startswith('_')]
 
     return ParsedClass(
         name=name, line_start=line_start, line_end=line_end,
-        full_text=full_text, superclass=superclass,
+        superclass=superclass,
         interfaces=interfaces, mixins=mixins,
         methods=methods, fields=fields,
         public_methods=pub_m, public_fields=pub_f,
-        is_abstract=is_abstract)
+        is_abstract=is_abstract, start=match.start(), end=end_pos, buffer=cleaned)
 
 
 # ---- top-level functions ----
 
 def _regex_extract_top_level_functions(
-    cleaned: str, classes: List[ParsedClass],
+    cleaned: str, classes: List[ParsedClass], index: _SourceIndex,
 ) -> List[ParsedFunction]:
-    class_regions = [(c.line_start, c.line_end) for c in classes]
+    # Merged class line ranges, for a bisect "inside a class?" check
+    regions: list[list[int]] = []
+    for s, e in sorted((c.line_start, c.line_end) for c in classes):
+        if regions and s <= regions[-1][1]:
+            regions[-1][1] = max(regions[-1][1], e)
+        else:
+            regions.append([s, e])
+    region_starts = [s for s, _ in regions]
+
+    def in_class(line: int) -> bool:
+        i = bisect_right(region_starts, line) - 1
+        return i >= 0 and line <= regions[i][1]
+
     functions: list[ParsedFunction] = []
     seen_lines: set[int] = set()
 
@@ -912,14 +738,14 @@ def _regex_extract_top_level_functions(
         if '.' in name:
             continue
 
-        line = cleaned[:match.start()].count('\n') + 1
-        if any(s <= line <= e for s, e in class_regions):
+        line = index.line_at(match.start())
+        if in_class(line):
             continue
         if line in seen_lines:
             continue
         seen_lines.add(line)
 
-        fn = _build_function(cleaned, match, name, class_name=None, base_line=0)
+        fn = _build_function(cleaned, match, name, None, 0, index)
         if fn:
             functions.append(fn)
 
@@ -927,14 +753,14 @@ def _regex_extract_top_level_functions(
         name = match.group(1)
         if name in _KEYWORDS:
             continue
-        line = cleaned[:match.start()].count('\n') + 1
-        if any(s <= line <= e for s, e in class_regions):
+        line = index.line_at(match.start())
+        if in_class(line):
             continue
         if line in seen_lines:
             continue
         seen_lines.add(line)
 
-        fn = _build_getter_fn(cleaned, match, name, class_name=None, base_line=0)
+        fn = _build_getter_fn(cleaned, match, name, None, 0, index)
         if fn:
             functions.append(fn)
 
@@ -943,8 +769,8 @@ def _regex_extract_top_level_functions(
 
 # ---- methods inside class body ----
 
-def _regex_extract_methods(body: str, class_name: str,
-                           class_start_line: int) -> List[ParsedFunction]:
+def _regex_extract_methods(body: str, class_name: str, body_offset: int,
+                           index: _SourceIndex) -> List[ParsedFunction]:
     methods: list[ParsedFunction] = []
     seen_lines: set[int] = set()
 
@@ -957,12 +783,12 @@ def _regex_extract_methods(body: str, class_name: str,
         if bare == class_name:
             continue
 
-        line = body[:match.start()].count('\n') + 1
+        line = index.line_at(body_offset + match.start())
         if line in seen_lines:
             continue
         seen_lines.add(line)
 
-        fn = _build_function(body, match, name, class_name, class_start_line - 1)
+        fn = _build_function(body, match, name, class_name, body_offset, index)
         if fn:
             methods.append(fn)
 
@@ -970,12 +796,12 @@ def _regex_extract_methods(body: str, class_name: str,
         name = match.group(1)
         if name in _KEYWORDS or name == class_name:
             continue
-        line = body[:match.start()].count('\n') + 1
+        line = index.line_at(body_offset + match.start())
         if line in seen_lines:
             continue
         seen_lines.add(line)
 
-        fn = _build_getter_fn(body, match, name, class_name, class_start_line - 1)
+        fn = _build_getter_fn(body, match, name, class_name, body_offset, index)
         if fn:
             methods.append(fn)
 
@@ -983,12 +809,15 @@ def _regex_extract_methods(body: str, class_name: str,
 
 
 # ---- build function helpers ----
+# *text* is either the whole cleaned source or a class body starting at
+# *base_offset*; line and brace lookups go through the file-wide index,
+# and the returned spans are offsets into its text.
 
-def _build_function(text: str, match, name: str,
-                    class_name: Optional[str], base_line: int) -> Optional[ParsedFunction]:
+def _build_function(text: str, match, name: str, class_name: Optional[str],
+                    base_offset: int, index: _SourceIndex) -> Optional[ParsedFunction]:
     params_str = match.group(2) or ''
     params = _parse_params(params_str)
-    line = text[:match.start()].count('\n') + 1 + base_line
+    line = index.line_at(base_offset + match.start())
 
     is_override = _check_override_before(text, match.start())
 
@@ -998,67 +827,76 @@ def _build_function(text: str, match, name: str,
     is_setter = bool(re.search(r'\bset\s+\w+\s*$', preceding + name))
 
     end_char = text[match.end() - 1] if match.end() > 0 else ''
-    body = ''
     line_end = line
+    body_start = body_end = end = match.end()
 
     if end_char == '{':
-        body, end_idx = _find_brace_block(text, match.end() - 1)
-        line_end = text[:end_idx].count('\n') + 1 + base_line
+        span = index.block_span(base_offset + match.end() - 1)
+        if span is None:
+            return None
+        body_end = end = span[1] - base_offset
+        line_end = index.line_at(min(span[1] + 1, len(index.text)))
     elif end_char == '>':  # =>
         semi = text.find(';', match.end())
         if semi >= 0:
-            body = '=> ' + text[match.end():semi]
-            line_end = text[:semi].count('\n') + 1 + base_line
-    elif end_char == ';':
-        body = ''  # abstract / external
-
-    full_text = text[match.start():match.end() + len(body)]
+            line_end = index.line_at(base_offset + semi)
+            body_start, body_end = match.end() - 2, semi
+            end = min(len(text), semi + 3)
+    # ';': abstract / external, no body
 
     return ParsedFunction(
         name=name, class_name=class_name,
         line_start=line, line_end=line_end,
-        body_text=body, full_text=full_text,
         parameters=params, is_override=is_override,
-        is_static=is_static, is_getter=is_getter, is_setter=is_setter)
+        is_static=is_static, is_getter=is_getter, is_setter=is_setter,
+        start=base_offset + match.start(), end=base_offset + end,
+        body_start=base_offset + body_start, body_end=base_offset + body_end,
+        buffer=index.text)
 
 
-def _build_getter_fn(text: str, match, name: str,
-                     class_name: Optional[str], base_line: int) -> Optional[ParsedFunction]:
-    line = text[:match.start()].count('\n') + 1 + base_line
+def _build_getter_fn(text: str, match, name: str, class_name: Optional[str],
+                     base_offset: int, index: _SourceIndex) -> Optional[ParsedFunction]:
+    line = index.line_at(base_offset + match.start())
     is_override = _check_override_before(text, match.start())
 
     preceding = text[max(0, match.start() - 80):match.start()]
     is_static = bool(re.search(r'\bstatic\s', preceding))
 
     end_char = text[match.end() - 1] if match.end() > 0 else ''
-    body = ''
     line_end = line
+    body_start = end = match.end()
     if end_char == '{':
-        body, end_idx = _find_brace_block(text, match.end() - 1)
-        line_end = text[:end_idx].count('\n') + 1 + base_line
+        span = index.block_span(base_offset + match.end() - 1)
+        if span is None:
+            return None
+        end = span[1] - base_offset
+        line_end = index.line_at(min(span[1] + 1, len(index.text)))
     elif end_char == '>':
         semi = text.find(';', match.end())
         if semi >= 0:
-            body = text[match.end():semi]
-            line_end = text[:semi].count('\n') + 1 + base_line
+            end = semi
+            line_end = index.line_at(base_offset + semi)
 
     return ParsedFunction(
         name=name, class_name=class_name,
         line_start=line, line_end=line_end,
-        body_text=body, full_text=text[match.start():match.end() + len(body)],
         parameters=[], is_override=is_override,
-        is_static=is_static, is_getter=True)
+        is_static=is_static, is_getter=True,
+        start=base_offset + match.start(), end=base_offset + end,
+        body_start=base_offset + body_start, body_end=base_offset + end,
+        buffer=index.text)
 
 
 # ---- fields (safe) ----
 
-def _regex_extract_class_fields_safe(body: str, methods: List[ParsedFunction]) -> List[str]:
+def _regex_extract_class_fields_safe(cleaned: str, body_tokens: TokenStream,
+                                     index: _SourceIndex) -> List[str]:
     """Extract fields from class body, excluding method bodies.
 
     Remove all brace-delimited blocks from the top level of the body,
     then scan what remains (class-level declarations only).
     """
-    top_level = _strip_nested_blocks(body)
+    top_level = _strip_nested_blocks(cleaned, body_tokens, index)
 
     fields: list[str] = []
     for match in _RE_FIELD.finditer(top_level):
@@ -1069,71 +907,33 @@ def _regex_extract_class_fields_safe(body: str, methods: List[ParsedFunction]) -
     return fields
 
 
-def _strip_nested_blocks(body: str) -> str:
-    """Remove brace-delimited blocks from the top level of *body*.
+def _strip_nested_blocks(cleaned: str, body_tokens: TokenStream,
+                         index: _SourceIndex) -> str:
+    """Text of a class body with string literals and nested blocks removed.
 
-    This leaves only class-level declarations (fields, signatures)
-    and strips method/getter/setter bodies.
+    Each top-level ``{ ... }`` block is replaced by ``;``, leaving only
+    class-level declarations (fields, signatures) and dropping
+    method/getter/setter bodies.
     """
+    if not len(body_tokens):
+        return ''
     result: list[str] = []
-    i = 0
-    n = len(body)
-    state = _TokState.CODE
-    depth = 0
-
-    while i < n:
-        c = body[i]
-
-        if state == _TokState.CODE:
-            if c == '/' and i + 1 < n and body[i+1] == '/':
-                # skip line comment
-                j = body.find('\n', i)
-                if j < 0: j = n
-                result.append('\n')
-                i = j + 1; continue
-            if c == '/' and i + 1 < n and body[i+1] == '*':
-                j = body.find('*/', i + 2)
-                if j < 0: j = n - 2
-                i = j + 2; continue
-            if c == 'r' and i + 1 < n and body[i+1] in ('"', "'"):
-                q = body[i+1]
-                if i + 3 < n and body[i+1:i+4] == q * 3:
-                    end_q = q * 3
-                    j = body.find(end_q, i + 4)
-                    if j < 0: j = n - 3
-                    i = j + 3; continue
-                j = body.find(q, i + 2)
-                if j < 0: j = n - 1
-                i = j + 1; continue
-            if c in ('"', "'"):
-                if i + 2 < n and body[i:i+3] == c * 3:
-                    end_q = c * 3
-                    j = i + 3
-                    while j < n:
-                        if body[j:j+3] == end_q and not _is_escaped(body, j):
-                            break
-                        j += 1
-                    i = j + 3 if j < n else n; continue
-                j = i + 1
-                while j < n:
-                    if body[j] == c and not _is_escaped(body, j):
-                        break
-                    j += 1
-                i = j + 1 if j < n else n; continue
-            if c == '{':
-                depth += 1
-                if depth == 1:
-                    # This is a method/getter body — skip it
-                    _, end_idx = _find_brace_block(body, i)
-                    result.append(';')  # placeholder
-                    i = end_idx
-                    depth = 0
-                    continue
-            result.append(c)
-            i += 1; continue
-
-        i += 1
+    pos = body_tokens.starts[0]
+    skip_until = -1
 
+    for kind, tok, start, end in zip(body_tokens.kinds, body_tokens.texts,
+                                     body_tokens.starts, body_tokens.ends):
+        if start < skip_until:
+            continue
+        if kind == STRING:
+            result.append(cleaned[pos:start])
+            pos = end
+        elif kind == PUNCTUATION and tok == '{':
+            result.append(cleaned[pos:start])
+            result.append(';')  # placeholder
+            pos = skip_until = index.brace_match[start] + 1
+
+    result.append(cleaned[pos:body_tokens.ends[-1]])
     return ''.join(result)
 
 
@@ -5,30 +5,166 @@ parses the JSON output to extract accurate function-level metrics:
 CYCLO, HALVOL, MI, MNL, NOP, SLOC.
 
 These values override the built-in tree-sitter / regex calculations.
+
+All modules are analyzed concurrently in a bounded pool, started before
+parsing so DCM runs while cmc parses.  Each module's normalized output
+is cached, keyed by a hash of its Dart sources, its analysis options and
+pubspec, the DCM command and the DCM version.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import subprocess
 import shutil
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from ..config import DCMConfig
 
+# Subdirectory of the cache directory holding one JSON file per module
+DCM_CACHE_DIR = "dcm"
+
+# Module files besides the sources that change what DCM reports
+_MODULE_CONFIG_FILES = ("pubspec.yaml", "pubspec.lock")
+_ANALYSIS_OPTIONS = "analysis_options.yaml"
+
 
 def is_dcm_available(dcm_config: DCMConfig) -> bool:
     """Check if DCM CLI is available on PATH."""
     return shutil.which(dcm_config.executable) is not None
 
 
-def run_dcm_analyze(module_path: str, dcm_config: DCMConfig) -> Optional[Dict]:
+def sources_digest(sources: Iterable[Tuple[str, str]]) -> str:
+    """Hash of a module's Dart sources, given as ``(path, content key)`` pairs
+    (see ``cache.content_key``)."""
+    h = hashlib.sha256()
+    for path, key in sorted(sources):
+        h.update(path.encode("utf-8"))
+        h.update(b"\0")
+        h.update(key.encode("ascii"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def start_dcm_analyze(
+    module_paths: Dict[str, str],
+    dcm_config: DCMConfig,
+    jobs: int,
+    cache_dir: Optional[str] = None,
+    digests: Optional[Dict[str, str]] = None,
+) -> Dict[str, Future]:
+    """Start :func:`run_dcm_analyze` for every module, at most *jobs* at a time.
+
+    *module_paths* maps module names to their directories; with
+    *cache_dir*, a module whose digest (see :func:`sources_digest`) is in
+    *digests* reuses or stores its output there.  Returns module name ->
+    future of the result; the pool does not block the caller.
+    """
+    digests = digests or {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(jobs, len(module_paths))))
+    futures: Dict[str, Future] = {}
+    for name, path in module_paths.items():
+        cache_path = None
+        if cache_dir is not None and name in digests:
+            cache_path = os.path.join(cache_dir, _cache_file_name(name))
+        futures[name] = pool.submit(
+            run_dcm_analyze, path, dcm_config, cache_path, digests.get(name),
+        )
+    pool.shutdown(wait=False)
+    return futures
+
+
+def _cache_file_name(module_name: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in module_name)
+    return safe + ".json"
+
+
+def _cache_key(digest: str, dcm_config: DCMConfig, module_path: str) -> str:
+    """Key of a module's DCM output: sources, configuration and command."""
+    h = hashlib.sha256()
+    for part in (
+        digest, dcm_config.executable, *dcm_config.extra_args,
+        _dcm_version(dcm_config.executable),
+    ):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    options = _find_analysis_options(module_path)
+    for path in (
+        options, *(os.path.join(module_path, name) for name in _MODULE_CONFIG_FILES),
+    ):
+        h.update(_file_digest(path).encode("ascii"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _find_analysis_options(module_path: str) -> Optional[str]:
+    """The ``analysis_options.yaml`` in effect for a module: its own or the
+    nearest in a parent directory, as the analyzer resolves it."""
+    path = os.path.abspath(module_path)
+    while True:
+        candidate = os.path.join(path, _ANALYSIS_OPTIONS)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _file_digest(path: Optional[str]) -> str:
+    """SHA-256 of a file's content; ``"-"`` if it is missing or unreadable."""
+    if path is None:
+        return "-"
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+    except OSError:
+        return "-"
+
+
+@lru_cache(maxsize=None)
+def _dcm_version(executable: str) -> str:
+    """Output of ``dcm --version``, read once per run; empty if it fails."""
+    try:
+        result = subprocess.run(
+            [executable, "--version"],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def run_dcm_analyze(
+    module_path: str,
+    dcm_config: DCMConfig,
+    cache_path: Optional[str] = None,
+    digest: Optional[str] = None,
+) -> Optional[Dict]:
     """Run DCM on a module and return parsed JSON output.
 
     Returns a dict mapping file_path -> list of metric records,
-    or None if DCM is not available or fails.
+    or None if DCM is not available or fails.  With *cache_path* and
+    the module's source *digest*, a cached result for the same sources,
+    analysis options, pubspec, command and DCM version is returned
+    without running DCM, and a fresh one is stored.
     """
+    key = _cache_key(digest, dcm_config, module_path) if cache_path and digest else None
+    if key is not None:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as fh:
+                cached = json.load(fh)
+            if isinstance(cached, dict) and cached.get("key") == key:
+                return cached.get("records")
+        except (OSError, ValueError):
+            pass
+
     if not is_dcm_available(dcm_config):
         return None
 
@@ -55,10 +191,21 @@ def run_dcm_analyze(module_path: str, dcm_config: DCMConfig) -> Optional[Dict]:
         if result.returncode != 0 and not result.stdout.strip():
             return None
         data = json.loads(result.stdout)
-        return _normalize_dcm_output(data)
+        records = _normalize_dcm_output(data)
     except (subprocess.TimeoutExpired, json.JSONDecodeError, FileNotFoundError):
         return None
 
+    if key is not None:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({"key": key, "records": records}, fh)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return records
+
 
 def _normalize_dcm_output(data) -> Dict[str, List[dict]]:
     """Normalize raw DCM JSON to a dict of file -> metric records.
@@ -108,34 +255,62 @@ def _normalize_dcm_output(data) -> Dict[str, List[dict]]:
     return result
 
 
+# DCM metric keys (either spelling) -> our keys
+_DCM_KEYS = {
+    "cyclomatic_complexity": "cyclo",
+    "cyclomatic-complexity": "cyclo",
+    "halstead_volume": "halvol",
+    "halstead-volume": "halvol",
+    "maintainability_index": "mi",
+    "maintainability-index": "mi",
+    "maximum_nesting_level": "mnl",
+    "maximum-nesting-level": "mnl",
+    "number_of_parameters": "nop",
+    "number-of-parameters": "nop",
+    "source_lines_of_code": "sloc",
+    "source-lines-of-code": "sloc",
+}
+
+
+class DCMRecordIndex:
+    """The DCM records of one file, indexed by function name and by line.
+
+    Only records carrying at least one known metric are indexed; each
+    name and line keeps its first such record, so a lookup is two dict
+    reads.
+    """
+
+    def __init__(self, records: List[dict]):
+        self.by_function: Dict[object, Tuple[int, dict]] = {}
+        self.by_line: Dict[object, Tuple[int, dict]] = {}
+        for i, rec in enumerate(records):
+            values = {
+                our_key: rec[dcm_key]
+                for dcm_key, our_key in _DCM_KEYS.items()
+                if dcm_key in rec
+            }
+            if not values:
+                continue
+            self.by_function.setdefault(rec.get("function"), (i, values))
+            self.by_line.setdefault(rec.get("line"), (i, values))
+
+
+def index_dcm_records(records: List[dict]) -> DCMRecordIndex:
+    return DCMRecordIndex(records)
+
+
 def merge_dcm_metrics(function_name: str, line: int,
-                      dcm_records: List[dict]) -> Optional[dict]:
+                      dcm_records: DCMRecordIndex) -> Optional[dict]:
     """Find matching DCM record for a given function.
 
+    The first record (in DCM's order) whose function name or line
+    matches wins.
+
     Returns dict with keys: cyclo, halvol, mi, mnl, nop, sloc
     or None if no match found.
     """
-    for rec in dcm_records:
-        if rec.get("function") == function_name or rec.get("line") == line:
-            result = {}
-            # Map DCM keys to our keys
-            mapping = {
-                "cyclomatic_complexity": "cyclo",
-                "cyclomatic-complexity": "cyclo",
-                "halstead_volume": "halvol",
-                "halstead-volume": "halvol",
-                "maintainability_index": "mi",
-                "maintainability-index": "mi",
-                "maximum_nesting_level": "mnl",
-                "maximum-nesting-level": "mnl",
-                "number_of_parameters": "nop",
-                "number-of-parameters": "nop",
-                "source_lines_of_code": "sloc",
-                "source-lines-of-code": "sloc",
-            }
-            for dcm_key, our_key in mapping.items():
-                if dcm_key in rec:
-                    result[our_key] = rec[dcm_key]
-            if result:
-                return result
-    return None
+    by_name = dcm_records.by_function.get(function_name)
+    by_line = dcm_records.by_line.get(line)
+    if by_name is None or (by_line is not None and by_line[0] < by_name[0]):
+        by_name = by_line
+    return dict(by_name[1]) if by_name is not None else None
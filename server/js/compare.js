@@ -45,14 +45,24 @@ async function renderCompareModule(el, idA, idB, mod) {
 // ── Helper: module duplication filter ──
 
 function modDupFilter(mod) {
-  return function (p) {
-    return p.block_a.path.startsWith(mod + '/') || p.block_a.path.includes('/' + mod + '/') ||
-      p.block_b.path.startsWith(mod + '/') || p.block_b.path.includes('/' + mod + '/');
+  return function (c) {
+    return c.locations.some(function (b) { return inModulePath(b.path, mod); });
   };
 }
 
-function dupPairKey(p) {
-  return p.block_a.path + ':' + p.block_a.line_start + '-' + p.block_b.path + ':' + p.block_b.line_start;
+function cloneClassKey(c) {
+  return c.token_count + '@' + c.locations.map(function (b) { return b.path + ':' + b.line_start; }).join(',');
+}
+
+// Snapshots from before clone classes have no `clone_classes`: diffing
+// against an empty list would report every class as new or removed
+function cloneFormatChanged(dupA, dupB) {
+  return !Array.isArray(dupA.clone_classes) || !Array.isArray(dupB.clone_classes);
+}
+
+function cloneFormatNote() {
+  return '<div class="section-subtitle">Duplication format changed between these snapshots: ' +
+    'one of them has no clone classes, so they cannot be compared class by class.</div>';
 }
 
 // ══════════════════════════
@@ -338,32 +348,34 @@ async function cmpProjectDuplication(el, idA, idB) {
   html += diffCard('Total Tokens', dupA.total_tokens, dupB.total_tokens, 'neutral');
   html += diffCard('Duplicated Tokens', dupA.duplicated_tokens, dupB.duplicated_tokens, 'lower');
   html += diffCard('Duplication %', dupA.duplication_pct, dupB.duplication_pct, 'lower');
-  html += diffCard('Duplicate Pairs', dupA.duplicate_pairs_count, dupB.duplicate_pairs_count, 'lower');
+  if (dupA.clone_classes_count != null && dupB.clone_classes_count != null)
+    html += diffCard('Clone Classes', dupA.clone_classes_count, dupB.clone_classes_count, 'lower');
   if (dupA.files_with_duplicates != null && dupB.files_with_duplicates != null)
     html += diffCard('Files with Dups', dupA.files_with_duplicates, dupB.files_with_duplicates, 'lower');
   html += '</div>';
 
-  if (dupA.duplicate_pairs && dupB.duplicate_pairs) {
-    var setA = {}; dupA.duplicate_pairs.forEach(function (p) { setA[dupPairKey(p)] = p; });
-    var setB = {}; dupB.duplicate_pairs.forEach(function (p) { setB[dupPairKey(p)] = p; });
-    var newPairs = dupB.duplicate_pairs.filter(function (p) { return !setA[dupPairKey(p)]; });
-    var removedPairs = dupA.duplicate_pairs.filter(function (p) { return !setB[dupPairKey(p)]; });
+  if (cloneFormatChanged(dupA, dupB)) { el.innerHTML = html + cloneFormatNote(); return; }
 
-    if (newPairs.length) {
-      html += '<div class="section"><div class="section-title"><span class="icon">🆕</span>New Duplicate Pairs <span class="badge badge-red">' + newPairs.length + '</span></div>';
-      html += dupPairTable(newPairs.slice(0, 50));
-      if (newPairs.length > 50) html += '<div class="section-subtitle">Showing 50 of ' + newPairs.length + '</div>';
-      html += '</div>';
-    }
-    if (removedPairs.length) {
-      html += '<div class="section"><div class="section-title"><span class="icon">✅</span>Removed Duplicate Pairs <span class="badge badge-green">' + removedPairs.length + '</span></div>';
-      html += dupPairTable(removedPairs.slice(0, 50));
-      if (removedPairs.length > 50) html += '<div class="section-subtitle">Showing 50 of ' + removedPairs.length + '</div>';
-      html += '</div>';
-    }
-    if (!newPairs.length && !removedPairs.length)
-      html += '<div class="section-subtitle">No duplicate pair changes between snapshots.</div>';
+  var classesA = dupA.clone_classes, classesB = dupB.clone_classes;
+  var setA = {}; classesA.forEach(function (c) { setA[cloneClassKey(c)] = 1; });
+  var setB = {}; classesB.forEach(function (c) { setB[cloneClassKey(c)] = 1; });
+  var newClasses = classesB.filter(function (c) { return !setA[cloneClassKey(c)]; });
+  var removedClasses = classesA.filter(function (c) { return !setB[cloneClassKey(c)]; });
+
+  if (newClasses.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🆕</span>New Clone Classes <span class="badge badge-red">' + newClasses.length + '</span></div>';
+    html += cloneClassTable(newClasses.slice(0, 50));
+    if (newClasses.length > 50) html += '<div class="section-subtitle">Showing 50 of ' + newClasses.length + '</div>';
+    html += '</div>';
+  }
+  if (removedClasses.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">✅</span>Removed Clone Classes <span class="badge badge-green">' + removedClasses.length + '</span></div>';
+    html += cloneClassTable(removedClasses.slice(0, 50));
+    if (removedClasses.length > 50) html += '<div class="section-subtitle">Showing 50 of ' + removedClasses.length + '</div>';
+    html += '</div>';
   }
+  if (!newClasses.length && !removedClasses.length)
+    html += '<div class="section-subtitle">No clone class changes between snapshots.</div>';
   el.innerHTML = html;
 }
 
@@ -670,24 +682,25 @@ async function cmpModuleDuplication(el, idA, idB, mod) {
   var dupA = r[0], dupB = r[1];
   if (!dupA || !dupB) { el.innerHTML = noData(); return; }
   var html = compareHeader(idA, idB);
+  if (cloneFormatChanged(dupA, dupB)) { el.innerHTML = html + cloneFormatNote(); return; }
 
   var filter = modDupFilter(mod);
-  var pairsA = (dupA.duplicate_pairs || []).filter(filter);
-  var pairsB = (dupB.duplicate_pairs || []).filter(filter);
-  var tokA = pairsA.reduce(function (s, p) { return s + p.token_count; }, 0);
-  var tokB = pairsB.reduce(function (s, p) { return s + p.token_count; }, 0);
+  var classesA = dupA.clone_classes.filter(filter);
+  var classesB = dupB.clone_classes.filter(filter);
+  var tokA = classesA.reduce(function (s, c) { return s + c.token_count; }, 0);
+  var tokB = classesB.reduce(function (s, c) { return s + c.token_count; }, 0);
 
   html += '<div class="diff-grid">';
-  html += diffCard('Module Dup Pairs', pairsA.length, pairsB.length, 'lower');
+  html += diffCard('Module Clone Classes', classesA.length, classesB.length, 'lower');
   html += diffCard('Duplicated Tokens', tokA, tokB, 'lower');
   html += '</div>';
 
-  var setA = {}; pairsA.forEach(function (p) { setA[dupPairKey(p)] = 1; });
-  var setB = {}; pairsB.forEach(function (p) { setB[dupPairKey(p)] = 1; });
-  var newP = pairsB.filter(function (p) { return !setA[dupPairKey(p)]; });
-  var remP = pairsA.filter(function (p) { return !setB[dupPairKey(p)]; });
-  if (newP.length) html += '<div class="section"><div class="section-title"><span class="icon">🆕</span>New Pairs <span class="badge badge-red">' + newP.length + '</span></div>' + dupPairTable(newP.slice(0, 30)) + '</div>';
-  if (remP.length) html += '<div class="section"><div class="section-title"><span class="icon">✅</span>Removed Pairs <span class="badge badge-green">' + remP.length + '</span></div>' + dupPairTable(remP.slice(0, 30)) + '</div>';
-  if (!newP.length && !remP.length) html += '<div class="section-subtitle">No duplication changes for this module.</div>';
+  var setA = {}; classesA.forEach(function (c) { setA[cloneClassKey(c)] = 1; });
+  var setB = {}; classesB.forEach(function (c) { setB[cloneClassKey(c)] = 1; });
+  var newC = classesB.filter(function (c) { return !setA[cloneClassKey(c)]; });
+  var remC = classesA.filter(function (c) { return !setB[cloneClassKey(c)]; });
+  if (newC.length) html += '<div class="section"><div class="section-title"><span class="icon">🆕</span>New Clone Classes <span class="badge badge-red">' + newC.length + '</span></div>' + cloneClassTable(newC.slice(0, 30)) + '</div>';
+  if (remC.length) html += '<div class="section"><div class="section-title"><span class="icon">✅</span>Removed Clone Classes <span class="badge badge-green">' + remC.length + '</span></div>' + cloneClassTable(remC.slice(0, 30)) + '</div>';
+  if (!newC.length && !remC.length) html += '<div class="section-subtitle">No duplication changes for this module.</div>';
   el.innerHTML = html;
 }
@@ -7,7 +7,7 @@
 const METRIC_LABELS_FULL = {
   cyclo: 'Cyclomatic Complexity', halvol: 'Halstead Volume', mi: 'Maintainability Index',
   mnl: 'Max Nesting Level', nop: 'Parameters', cbo: 'CBO', dit: 'DIT', nom: 'NOM',
-  rfc: 'RFC', tcc: 'TCC', wmc: 'WMC', woc: 'WOC', noi: 'Imports', noei: 'External Imports',
+  rfc: 'RFC', tcc: 'TCC', lcom4: 'LCOM4', wmc: 'WMC', woc: 'WOC', noi: 'Imports', noei: 'External Imports',
   loc_function: 'Func LOC', sloc_function: 'Func SLOC', wmfp: 'WMFP', fpy_function: 'FPY (Function)',
   noam: 'Accessors (NOAM)', noii: 'Inherited Interfaces (NOII)', noom: 'Overridden Methods (NOOM)',
   fpy_class: 'FPY (Class)', wmfp_file: 'WMFP (File)', wmfp_density: 'WMFP Density', fpy_file: 'FPY (File)',
@@ -16,7 +16,7 @@ const METRIC_LABELS_FULL = {
 const METRIC_LABELS_SHORT = {
   cyclo: 'CC', halvol: 'Halstead Vol', mi: 'MI', mnl: 'Max Nesting', nop: 'Params',
   loc_function: 'Func LOC', sloc_function: 'Func SLOC', wmfp: 'WMFP', fpy_function: 'FPY(Func)',
-  cbo: 'CBO', dit: 'DIT', nom: 'NOM', rfc: 'RFC', tcc: 'TCC', wmc: 'WMC', woc: 'WOC',
+  cbo: 'CBO', dit: 'DIT', nom: 'NOM', rfc: 'RFC', tcc: 'TCC', lcom4: 'LCOM4', wmc: 'WMC', woc: 'WOC',
   noi: 'Imports', noei: 'Ext Imports',
   noam: 'NOAM', noii: 'NOII', noom: 'NOOM',
   fpy_class: 'FPY(Class)', wmfp_file: 'WMFP(File)', wmfp_density: 'WMFP Dens', fpy_file: 'FPY(File)',
@@ -25,7 +25,7 @@ const METRIC_LABELS_SHORT = {
 const COL_LABELS = {
   cyclo: 'CC', mi: 'MI', loc: 'LOC', sloc: 'SLOC', halstead_volume: 'H.Vol',
   wmfp: 'WMFP', fpy: 'FPY', technical_debt_minutes: 'TD(min)', cbo: 'CBO', wmc: 'WMC',
-  tcc: 'TCC', rfc: 'RFC', nom: 'NOM', dit: 'DIT', woc: 'WOC', td_per_loc: 'TD/LOC',
+  tcc: 'TCC', lcom4: 'LCOM4', rfc: 'RFC', nom: 'NOM', dit: 'DIT', woc: 'WOC', td_per_loc: 'TD/LOC',
   cyclo_sum: 'CC Σ', cyclo_avg: 'CC Avg', mi_avg: 'MI Avg',
   number_of_parameters: 'Params', max_nesting_level: 'Nest',
   noam: 'NOAM', noii: 'NOII', noom: 'NOOM',
@@ -138,21 +138,104 @@ function fileTable(items, showModLink) {
   return h + '</tbody></table></div>';
 }
 
-function dupPairTable(pairs) {
+function cloneClassTable(classes) {
   var h = '<div class="table-wrap scroll-y"><table><thead><tr>' +
-    '<th>#</th><th>File A</th><th>Lines A</th><th>File B</th><th>Lines B</th><th>Tokens</th><th>Lines</th>' +
+    '<th>#</th><th>Tokens</th><th>Lines</th><th>Locations</th>' +
     '</tr></thead><tbody>';
+  classes.forEach(function (c, i) {
+    var locs = c.locations.map(function (b) {
+      return '<span title="' + b.path + '">' + shortPath(b.path) + '</span>:' + b.line_start + '-' + b.line_end;
+    });
+    h += '<tr><td>' + (i + 1) + '</td><td>' + c.token_count + '</td><td>' + c.line_count +
+      '</td><td>' + locs.join('<br>') + '</td></tr>';
+  });
+  return h + '</tbody></table></div>';
+}
+
+function nearDupTable(pairs) {
+  var h = '<div class="table-wrap scroll-y"><table><thead><tr>' +
+    '<th>#</th><th>Function A</th><th>Lines A</th><th>Function B</th><th>Lines B</th><th>Similarity</th><th>Tokens</th>' +
+    '</tr></thead><tbody>';
+  function fnCell(f) {
+    var name = f.class_name ? f.class_name + '.' + f.function_name : f.function_name;
+    return '<td title="' + f.path + '">' + name + '<br><span style="color:var(--text-dim)">' + shortPath(f.path) + '</span></td>';
+  }
   pairs.forEach(function (p, i) {
     h += '<tr><td>' + (i + 1) + '</td>' +
-      '<td title="' + p.block_a.path + '">' + shortPath(p.block_a.path) + '</td>' +
-      '<td>' + p.block_a.line_start + '-' + p.block_a.line_end + '</td>' +
-      '<td title="' + p.block_b.path + '">' + shortPath(p.block_b.path) + '</td>' +
-      '<td>' + p.block_b.line_start + '-' + p.block_b.line_end + '</td>' +
-      '<td>' + p.token_count + '</td><td>' + p.line_count + '</td></tr>';
+      fnCell(p.function_a) + '<td>' + p.function_a.line_start + '-' + p.function_a.line_end + '</td>' +
+      fnCell(p.function_b) + '<td>' + p.function_b.line_start + '-' + p.function_b.line_end + '</td>' +
+      '<td>' + (p.similarity * 100).toFixed(0) + '%</td>' +
+      '<td>' + p.function_a.token_count + ' / ' + p.function_b.token_count + '</td></tr>';
+  });
+  return h + '</tbody></table></div>';
+}
+
+function nearDupGroupTable(groups) {
+  var h = '<div class="table-wrap scroll-y"><table><thead><tr>' +
+    '<th>#</th><th>Copies</th><th>Tokens</th><th>Functions</th>' +
+    '</tr></thead><tbody>';
+  groups.forEach(function (g, i) {
+    var names = g.functions.slice(0, 10).map(function (f) {
+      var name = f.class_name ? f.class_name + '.' + f.function_name : f.function_name;
+      return '<span title="' + f.path + ':' + f.line_start + '">' + name + ' <span style="color:var(--text-dim)">' + shortPath(f.path) + ':' + f.line_start + '</span></span>';
+    });
+    if (g.functions.length > 10) names.push('<span style="color:var(--text-dim)">+' + (g.functions.length - 10) + ' more</span>');
+    h += '<tr><td>' + (i + 1) + '</td><td>' + g.size + '</td><td>' + g.functions[0].token_count + '</td><td>' + names.join('<br>') + '</td></tr>';
+  });
+  return h + '</tbody></table></div>';
+}
+
+function cloneMatrixTable(cm) {
+  var h = '<div class="dsm-wrap"><table class="dsm-table"><thead><tr><th></th>';
+  cm.modules.forEach(function (m) { h += '<th title="' + m + '" style="writing-mode:vertical-lr;transform:rotate(180deg);max-width:30px">' + m.substring(0, 12) + '</th>'; });
+  h += '</tr></thead><tbody>';
+  cm.modules.forEach(function (m, i) {
+    h += '<tr><th style="text-align:right">' + m + '</th>';
+    cm.matrix[i].forEach(function (v, j) {
+      if (v > 0) {
+        var heat = Math.min(v / 20, 1);
+        var title = i === j ? m + ': ' + v + ' clone classes' : m + ' ↔ ' + cm.modules[j] + ': ' + v + ' clone classes';
+        h += '<td class="dsm-val" style="background:rgba(248,81,73,' + (0.1 + heat * 0.7) + ')" title="' + title + '">' + v + '</td>';
+      } else h += '<td class="dsm-val" style="color:var(--text-dim)">·</td>';
+    });
+    h += '</tr>';
   });
   return h + '</tbody></table></div>';
 }
 
+// Co-change pairs; with `mod`, only pairs involving that module
+function temporalCouplingSection(tc, mod) {
+  function involves(p) { return !mod || p.module_a === mod || p.module_b === mod; }
+  var modulePairs = (tc.module_pairs || []).filter(involves);
+  var filePairs = (tc.file_pairs || []).filter(involves);
+  if (!modulePairs.length && !filePairs.length) return '';
+  var h = '<div class="section"><div class="section-title"><span class="icon">🧲</span>Temporal Coupling <span class="badge">' + fmt(tc.commits_analyzed) + ' commits</span></div>';
+  h += '<div class="section-subtitle">Changed in the same commits since ' + tc.since + ' — dependencies the import graph may not show. ' +
+    fmt(tc.commits_skipped) + ' commits with more than ' + tc.max_commit_files + ' files skipped.</div>';
+  function degree(p) { return (p.degree * 100).toFixed(0) + '%'; }
+  if (modulePairs.length) {
+    h += '<div class="table-wrap scroll-y"><table><thead><tr><th>#</th><th>Module A</th><th>Module B</th><th>Co-changes</th><th>Commits A / B</th><th>Degree</th></tr></thead><tbody>';
+    modulePairs.forEach(function (p, i) {
+      h += '<tr><td>' + (i + 1) + '</td><td>' + p.module_a + '</td><td>' + p.module_b + '</td><td>' + fmt(p.co_changes) +
+        '</td><td>' + fmt(p.changes_a) + ' / ' + fmt(p.changes_b) + '</td><td>' + degree(p) + '</td></tr>';
+    });
+    h += '</tbody></table></div>';
+  }
+  if (filePairs.length) {
+    h += '<div class="table-wrap scroll-y"><table><thead><tr><th>#</th><th>File A</th><th>File B</th><th>Co-changes</th><th>Commits A / B</th><th>Degree</th></tr></thead><tbody>';
+    filePairs.forEach(function (p, i) {
+      h += '<tr><td>' + (i + 1) + '</td><td title="' + p.file_a + '">' + shortPath(p.file_a) + '</td><td title="' + p.file_b + '">' + shortPath(p.file_b) +
+        '</td><td>' + fmt(p.co_changes) + '</td><td>' + fmt(p.changes_a) + ' / ' + fmt(p.changes_b) + '</td><td>' + degree(p) + '</td></tr>';
+    });
+    h += '</tbody></table></div>';
+  }
+  return h + '</div>';
+}
+
+function inModulePath(path, mod) {
+  return path.startsWith(mod + '/') || path.includes('/' + mod + '/');
+}
+
 // ── Metrics summary table (used in overview & compare) ──
 
 function metricsSummaryTable(ms, labelMap) {
@@ -111,6 +111,13 @@ var METRICS_REFERENCE = [
         formula: 'TCC = NDC / NP\nwhere NDC = number of directly connected method pairs,\n      NP = N × (N − 1) / 2 (total possible pairs),\n      N = number of visible methods.',
         range: '0.5–1.0: Good cohesion | 0.33–0.5: Moderate | <0.33: Low — consider splitting the class'
       },
+      {
+        name: 'Lack of Cohesion of Methods',
+        abbr: 'LCOM4',
+        desc: 'Number of connected groups of instance methods, where two methods are linked when they access a common instance variable or one calls the other. Each group is a candidate class of its own.',
+        formula: 'LCOM4 = number of connected components of the graph\nwhose nodes are the instance methods and whose edges are\nshared instance variables and method calls.',
+        range: '1: Cohesive | 2+: The class can be split into that many parts | 0: No instance methods'
+      },
       {
         name: 'Depth of Inheritance Tree',
         abbr: 'DIT',
@@ -262,6 +269,13 @@ var METRICS_REFERENCE = [
         formula: 'Risk Score = normalize(churn) × normalize(complexity)\nwhere complexity = CC_max × td_minutes / LOC.',
         range: 'Higher risk scores need more attention. Top items are prime refactoring targets.'
       },
+      {
+        name: 'Temporal Coupling',
+        abbr: 'Co-change',
+        desc: 'Pairs of files (and modules) that change in the same commits. Frequent co-change reveals dependencies the import graph does not show: shared formats, duplicated logic, parallel hierarchies.',
+        formula: 'Degree = co_changes / ((commits_A + commits_B) / 2)\nCommits touching more than max_commit_files files are skipped.',
+        range: 'Degree near 100% with several co-changes: the files effectively change as one unit — consider merging or decoupling them.'
+      },
       {
         name: 'Shotgun Surgery Candidates',
         abbr: 'SSC',
@@ -290,17 +304,31 @@ var METRICS_REFERENCE = [
         range: '0–3%: Good | 3–5%: Acceptable | 5–10%: High | >10%: Critical'
       },
       {
-        name: 'Duplicate Pairs',
-        abbr: 'Pairs',
-        desc: 'Number of detected code block pairs that are syntactically identical or near-identical.',
-        formula: 'Count of (block_a, block_b) pairs where token sequences match above the configured threshold.',
-        range: '0 is ideal. Each pair is a refactoring opportunity.'
+        name: 'Clone Classes',
+        abbr: 'Classes',
+        desc: 'Number of detected clone classes: maximal token sequences (after normalizing names and literals) shared by two or more code locations.',
+        formula: 'Identical 50-token windows are merged and extended while all locations keep matching; each resulting sequence with ≥ 2 non-overlapping locations is one class.',
+        range: '0 is ideal. Each class is a refactoring opportunity.'
+      },
+      {
+        name: 'Cross-Module Clone Matrix',
+        abbr: 'Clone Matrix',
+        desc: 'Module × module matrix of clone classes. Off-diagonal cells count classes with locations in both modules; the diagonal counts classes with two or more locations inside one module.',
+        formula: 'M[i][j] = |{class : class has locations in module i and module j}|',
+        range: 'Off-diagonal clones usually belong in a shared package.'
+      },
+      {
+        name: 'Near-Duplicate Functions',
+        abbr: 'Near Dups',
+        desc: 'Pairs of functions whose bodies are mostly, but not exactly, the same (copy-paste-and-tweak). Each body is the set of its 5-token shingles over normalized tokens.',
+        formula: 'J(A, B) = |A ∩ B| / |A ∪ B|, estimated from 64-value MinHash signatures; candidates come from LSH banding and are reported when J ≥ threshold (default 0.8).',
+        range: 'Functions with at least 50 body tokens are compared. Each pair is a candidate for extracting shared code.'
       },
       {
         name: 'Files with Duplicates',
         abbr: 'Files w/ Dups',
         desc: 'Number of unique files that contain at least one duplicated code block.',
-        formula: 'Count of distinct files appearing in any duplicate pair.',
+        formula: 'Count of distinct files appearing in any clone class.',
         range: 'Lower is better.'
       },
     ]
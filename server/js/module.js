@@ -191,6 +191,9 @@ async function renderModuleDependencies(el, mod) {
     }
   }
 
+  var coupling = await load('temporal_coupling', 'temporal_coupling.json');
+  if (coupling) html += temporalCouplingSection(coupling, mod);
+
   if (pkg.import_statistics && pkg.import_statistics.length) {
     html += '<div class="section"><div class="section-title"><span class="icon">📊</span>Import Statistics</div>';
     html += '<div class="table-wrap scroll-y"><table><thead><tr><th>#</th><th>Package</th><th>Import Count</th></tr></thead><tbody>';
@@ -235,27 +238,49 @@ async function renderModuleDependencies(el, mod) {
 }
 
 async function renderModuleDuplication(el, mod) {
-  var dup = await load('duplication', 'duplication.json');
-  if (!dup || !dup.duplicate_pairs) { el.innerHTML = noData(); return; }
-  var modPairs = dup.duplicate_pairs.filter(function (p) {
-    return p.block_a.path.startsWith(mod + '/') || p.block_a.path.includes('/' + mod + '/') ||
-      p.block_b.path.startsWith(mod + '/') || p.block_b.path.includes('/' + mod + '/');
+  var results = await Promise.all([load('duplication', 'duplication.json'), load('near_duplicates', 'near_duplicates.json')]);
+  var dup = results[0], near = results[1];
+  if (!dup || !dup.clone_classes) { el.innerHTML = noData(); return; }
+  var modClasses = dup.clone_classes.filter(function (c) {
+    return c.locations.some(function (b) { return inModulePath(b.path, mod); });
   });
 
   var html = '<div class="kpi-grid">';
-  html += kpi('Module Dup Pairs', fmt(modPairs.length), '🔗');
-  var totalTokens = modPairs.reduce(function (s, p) { return s + p.token_count; }, 0);
+  html += kpi('Module Clone Classes', fmt(modClasses.length), '🔗');
+  var totalTokens = modClasses.reduce(function (s, c) {
+    return s + c.token_count * c.locations.filter(function (b) { return inModulePath(b.path, mod); }).length;
+  }, 0);
   html += kpi('Duplicated Tokens', fmt(totalTokens), '📋');
   html += '</div>';
 
-  if (modPairs.length) {
-    html += '<div class="section"><div class="section-title"><span class="icon">📋</span>Duplicate Pairs</div>';
-    html += dupPairTable(modPairs.slice(0, 100));
-    if (modPairs.length > 100) html += '<div class="section-subtitle">Showing 100 of ' + modPairs.length + '</div>';
+  if (modClasses.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">📋</span>Clone Classes</div>';
+    html += cloneClassTable(modClasses.slice(0, 100));
+    if (modClasses.length > 100) html += '<div class="section-subtitle">Showing 100 of ' + modClasses.length + '</div>';
     html += '</div>';
   } else {
     html += '<div class="empty-state"><div class="icon">✅</div><p>No duplicates in this module</p></div>';
   }
+
+  var modNear = ((near && near.pairs) || []).filter(function (p) {
+    return inModulePath(p.function_a.path, mod) || inModulePath(p.function_b.path, mod);
+  });
+  if (modNear.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🧬</span>Near-Duplicate Functions <span class="badge">' + modNear.length + '</span></div>';
+    html += nearDupTable(modNear.slice(0, 100));
+    if (modNear.length > 100) html += '<div class="section-subtitle">Showing 100 of ' + modNear.length + '</div>';
+    html += '</div>';
+  }
+
+  var modGroups = ((near && near.groups) || []).filter(function (g) {
+    return g.functions.some(function (f) { return inModulePath(f.path, mod); });
+  });
+  if (modGroups.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🧬</span>Identical Function Bodies <span class="badge">' + modGroups.length + '</span></div>';
+    html += nearDupGroupTable(modGroups.slice(0, 100));
+    if (modGroups.length > 100) html += '<div class="section-subtitle">Showing 100 of ' + modGroups.length + '</div>';
+    html += '</div>';
+  }
   el.innerHTML = html;
 }
 
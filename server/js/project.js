@@ -158,9 +158,13 @@ async function renderProjectDistributions(el) {
 }
 
 async function renderProjectDependencies(el) {
-  var results = await Promise.all([load('dsm', 'dsm.json'), load('graph_import', 'graph_import.json')]);
-  var dsm = results[0], graph = results[1];
-  if (!dsm && !graph) { el.innerHTML = noData(); return; }
+  var results = await Promise.all([
+    load('dsm', 'dsm.json'),
+    load('graph_import', 'graph_import.json'),
+    load('temporal_coupling', 'temporal_coupling.json'),
+  ]);
+  var dsm = results[0], graph = results[1], coupling = results[2];
+  if (!dsm && !graph && !coupling) { el.innerHTML = noData(); return; }
   var html = '';
 
   if (dsm && dsm.matrix) {
@@ -202,11 +206,14 @@ async function renderProjectDependencies(el) {
     edges.forEach(function (e) { html += '<tr><td>' + e.from_node + '</td><td>' + e.to_node + '</td><td>' + (e.weight || 1) + '</td><td>' + (e.edge_type || '—') + '</td></tr>'; });
     html += '</tbody></table></div></div>';
   }
+
+  if (coupling) html += temporalCouplingSection(coupling);
   el.innerHTML = html;
 }
 
 async function renderProjectDuplication(el) {
-  var dup = await load('duplication', 'duplication.json');
+  var results = await Promise.all([load('duplication', 'duplication.json'), load('near_duplicates', 'near_duplicates.json')]);
+  var dup = results[0], near = results[1];
   if (!dup) { el.innerHTML = noData(); return; }
 
   var html = '<div class="kpi-grid">';
@@ -214,16 +221,45 @@ async function renderProjectDuplication(el) {
   html += kpi('Total Tokens', fmt(dup.total_tokens), '🔤');
   html += kpi('Duplicated Tokens', fmt(dup.duplicated_tokens), '📋');
   html += kpi('Duplication %', dup.duplication_pct.toFixed(2) + '%', '📊');
-  html += kpi('Duplicate Pairs', fmt(dup.duplicate_pairs_count), '🔗');
+  html += kpi('Clone Classes', fmt(dup.clone_classes_count || 0), '🔗');
   if (dup.files_with_duplicates != null)
     html += kpi('Files with Dups', fmt(dup.files_with_duplicates), '📁');
   html += '</div>';
 
-  if (dup.duplicate_pairs && dup.duplicate_pairs.length) {
-    html += '<div class="section"><div class="section-title"><span class="icon">📋</span>Duplicate Pairs</div>';
-    html += dupPairTable(dup.duplicate_pairs.slice(0, 100));
-    if (dup.duplicate_pairs.length > 100)
-      html += '<div class="section-subtitle">Showing 100 of ' + dup.duplicate_pairs.length + ' pairs</div>';
+  var classes = dup.clone_classes || [];
+  if (classes.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">📋</span>Clone Classes</div>';
+    html += '<div class="section-subtitle">Each class is one token sequence shared by all of its locations</div>';
+    html += cloneClassTable(classes.slice(0, 100));
+    if (classes.length > 100)
+      html += '<div class="section-subtitle">Showing 100 of ' + classes.length + ' classes</div>';
+    html += '</div>';
+  }
+
+  var cm = dup.clone_matrix;
+  if (cm && cm.modules && cm.modules.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🔲</span>Cross-Module Clone Matrix</div>';
+    html += '<div class="section-subtitle">Cell (row, col) = clone classes with locations in both modules; diagonal = classes within one module</div>';
+    html += cloneMatrixTable(cm);
+    html += '</div>';
+  }
+
+  if (near && near.groups && near.groups.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🧬</span>Identical Function Bodies <span class="badge">' + fmt(near.groups_count) + '</span></div>';
+    html += '<div class="section-subtitle">Groups of functions with the same signature (copies up to renaming)</div>';
+    html += nearDupGroupTable(near.groups.slice(0, 100));
+    if (near.groups.length > 100)
+      html += '<div class="section-subtitle">Showing 100 of ' + fmt(near.groups_count) + ' groups</div>';
+    html += '</div>';
+  }
+
+  if (near && near.pairs && near.pairs.length) {
+    html += '<div class="section"><div class="section-title"><span class="icon">🧬</span>Near-Duplicate Functions <span class="badge">' + fmt(near.pairs_count) + '</span></div>';
+    html += '<div class="section-subtitle">Function bodies with estimated Jaccard similarity ≥ ' + (near.threshold * 100).toFixed(0) +
+      '% over ' + near.shingle_size + '-token shingles (' + fmt(near.functions_analyzed) + ' functions compared)</div>';
+    html += nearDupTable(near.pairs.slice(0, 100));
+    if (near.pairs.length > 100)
+      html += '<div class="section-subtitle">Showing 100 of ' + fmt(near.pairs_count) + ' pairs</div>';
     html += '</div>';
   }
   el.innerHTML = html;
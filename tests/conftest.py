@@ -0,0 +1,22 @@
+"""Make the package importable as ``cmc`` when it is not installed.
+
+The distribution maps ``cmc`` to the repository root (see
+``[tool.setuptools.package-dir]``), so a plain checkout has no ``cmc``
+directory on ``sys.path``.
+"""
+
+import importlib.util
+import os
+import sys
+
+try:
+    import cmc  # noqa: F401
+except ImportError:
+    _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _spec = importlib.util.spec_from_file_location(
+        "cmc", os.path.join(_ROOT, "__init__.py"),
+        submodule_search_locations=[_ROOT],
+    )
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["cmc"] = _module
+    _spec.loader.exec_module(_module)
@@ -0,0 +1,87 @@
+import subprocess
+
+import pytest
+
+from cmc.models import FunctionMetrics
+from cmc.metrics.risk_hotspots import compute_function_churn
+from cmc.package_analysis.git_analysis import ChurnIndex, read_changed_lines
+
+COLD = "int cold() {\n  return 0;\n}\n\n"
+
+
+def _git(repo, *args, date=None):
+    env = None
+    if date is not None:
+        env = {
+            "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date,
+            "PATH": "/usr/bin:/bin", "HOME": str(repo),
+        }
+    subprocess.run(
+        ["git", "-C", str(repo), *args],
+        check=True, capture_output=True, env=env,
+    )
+
+
+def _commit(repo, text, day, path="lib.dart"):
+    (repo / path).write_text(text)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", f"day {day}", date=f"2025-06-{day:02d}T12:00:00")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "Dev")
+    return tmp_path
+
+
+def test_repeated_edits_to_one_line_all_count(repo):
+    _commit(repo, COLD + "int hot() {\n  return 0;\n}\n", 1)
+    for day in range(2, 6):
+        _commit(repo, COLD + f"int hot() {{\n  return {day};\n}}\n", day)
+    _commit(repo, COLD + "int hot() {\n  var x = 1;\n  return x;\n}\n", 6)
+
+    changed = list(read_changed_lines(str(repo), "2025-01-01"))
+    assert len(changed) == 6
+    # Each edit of hot()'s body lands on the lines that replaced it in HEAD
+    for ranges in changed[:5]:
+        assert ranges == {"lib.dart": [(6, 7)]}
+
+    functions = [
+        FunctionMetrics("lib.dart", "lib", None, "cold", 1, 3),
+        FunctionMetrics("lib.dart", "lib", None, "hot", 5, 8),
+    ]
+    commits, hunks = compute_function_churn(functions, str(repo), "2025-01-01")
+    assert commits == [1, 6]
+    assert hunks == [1, 6]
+
+
+def test_deleted_lines_count_at_their_neighbours(repo):
+    _commit(repo, COLD + "int hot() {\n  a();\n  b();\n  c();\n}\n", 1)
+    _commit(repo, COLD + "int hot() {\n  a();\n  c();\n}\n", 2)
+    _commit(repo, COLD + "int hot() {\n  c();\n}\n", 3)
+
+    changed = list(read_changed_lines(str(repo), "2025-01-01"))
+    assert changed[0] == {"lib.dart": [(6, 5)]}
+    # b()'s neighbours: a(), removed in the newest commit, and c()
+    assert changed[1] == {"lib.dart": [(6, 5), (6, 6)]}
+
+
+def test_commit_files_follow_renames(repo):
+    body = "".join(f"line {i}\n" for i in range(20))
+    _commit(repo, body, 1, "a.dart")
+    _commit(repo, "b\n", 2, "b.dart")
+    _commit(repo, body + "more\n", 3, "a.dart")
+    _git(repo, "mv", "a.dart", "c.dart")
+    _commit(repo, body + "more\nstill more\n", 4, "c.dart")
+    _commit(repo, "b\nb\n", 5, "b.dart")
+
+    index = ChurnIndex.from_git(str(repo), "2025-01-01")
+    assert list(index.commit_files()) == [
+        ["b.dart"],
+        ["c.dart"],
+        ["c.dart"],
+        ["b.dart"],
+        ["c.dart"],
+    ]